@@ -12,6 +12,7 @@ from .serializers import (
 )
 from .models import UserWarning
 from .permissions import get_user_role, assign_user_role, CanManageUsers
+from search.autocomplete import autocomplete
 
 User = get_user_model()
 
@@ -141,11 +142,9 @@ class UserViewSet(viewsets.ModelViewSet):
         if not query:
             return Response([])
         
-        users = self.get_queryset().filter(
-            Q(username__icontains=query) |
-            Q(first_name__icontains=query) |
-            Q(last_name__icontains=query)
-        )[:20]
+        # Prefix matches ranked by the autocomplete index, then loaded in that order
+        ids = [match['id'] for match in autocomplete(query, ['user'], limit=20)['user']]
+        users = sorted(self.get_queryset().filter(pk__in=ids), key=lambda user: ids.index(user.pk))
         
         serializer = UserSearchSerializer(users, many=True, context={'request': request})
         return Response(serializer.data)
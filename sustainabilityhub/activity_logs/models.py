@@ -78,22 +78,26 @@ class ActivityLog(models.Model):
     
     @classmethod
     def log_activity(cls, user, action_type, description='', content_object=None, metadata=None, request=None):
-        """Helper method to log activities"""
+        """Helper method to log activities; the row is written by a background task"""
+        from sustainabilityhub.dispatch import enqueue
+        from .tasks import record_activity
+        
         log_data = {
-            'user': user,
+            'user_id': user.pk,
             'action_type': action_type,
             'description': description,
             'metadata': metadata or {},
         }
         
         if content_object:
-            log_data['content_object'] = content_object
+            log_data['content_type_id'] = ContentType.objects.get_for_model(content_object).pk
+            log_data['object_id'] = content_object.pk
         
         if request:
             log_data['ip_address'] = cls.get_client_ip(request)
             log_data['user_agent'] = request.META.get('HTTP_USER_AGENT', '')
         
-        return cls.objects.create(**log_data)
+        enqueue(record_activity, log_data)
     
     @staticmethod
     def get_client_ip(request):
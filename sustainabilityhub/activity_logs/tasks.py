@@ -0,0 +1,9 @@
+from celery import shared_task
+from sustainabilityhub.dispatch import IdempotentTask
+from .models import ActivityLog
+
+
+@shared_task(base=IdempotentTask)
+def record_activity(log_data):
+    """Write an activity log row prepared by ActivityLog.log_activity"""
+    ActivityLog.objects.create(**log_data)
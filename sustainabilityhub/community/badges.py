@@ -0,0 +1,200 @@
+"""
+Badge engine: awards SustainabilityBadge rows whose criteria a user meets.
+
+``SustainabilityBadge.criteria`` maps metric names to the minimum value a
+user needs on each of them, e.g. ``{"impact_total": 100, "posts": 10}``.
+Every key must be met. Available metrics:
+
+* ``impact_total`` / ``impact_actions`` - summed from the daily impact rollups
+* ``impact:<impact_type>`` - the rollup total of one impact type
+* ``challenges_joined`` / ``challenges_completed``
+* ``posts``, ``comments``, ``followers`` - read from the UserStats counters
+
+Criteria are compiled once into (metric, threshold) predicates and indexed
+by metric. When something happens to a user (community.signals), only the
+badges that read one of the metrics it changed are re-evaluated, and only for
+that user. ``backfill_badges`` evaluates every badge for the whole user base
+in parallel chunks.
+"""
+import logging
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count, Sum
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'badges:criteria:version'
+
+
+class BadgeCriteriaError(ValueError):
+    pass
+
+
+def _rollup_sum(field, impact_type=None):
+    def compute(user_ids):
+        from .sustainability_features import ImpactDailyRollup
+        rows = ImpactDailyRollup.objects.filter(user_id__in=user_ids)
+        if impact_type:
+            rows = rows.filter(impact_type=impact_type)
+        return dict(rows.values('user').annotate(value=Sum(field)).values_list('user', 'value'))
+    return compute
+
+
+def _user_stat(field):
+    def compute(user_ids):
+        from .models import UserStats
+        return dict(UserStats.objects.filter(pk__in=user_ids).values_list('pk', field))
+    return compute
+
+
+def _count(model_path, user_field, **filters):
+    def compute(user_ids):
+        from django.apps import apps
+        model = apps.get_model(model_path)
+        return dict(
+            model.objects.filter(**{f'{user_field}__in': user_ids}, **filters).order_by()
+            .values(user_field).annotate(value=Count('pk')).values_list(user_field, 'value')
+        )
+    return compute
+
+
+METRICS = {
+    'impact_total': _rollup_sum('total'),
+    'impact_actions': _rollup_sum('actions'),
+    'challenges_joined': _count('community.ChallengeParticipation', 'user'),
+    'challenges_completed': _count('community.ChallengeParticipation', 'user', completed=True),
+    'posts': _user_stat('post_count'),
+    'comments': _user_stat('comment_count'),
+    'followers': _user_stat('follower_count'),
+}
+IMPACT_PREFIX = 'impact:'
+
+
+def metric_function(name):
+    if name.startswith(IMPACT_PREFIX):
+        return _rollup_sum('total', name[len(IMPACT_PREFIX):])
+    return METRICS[name]
+
+
+def compile_criteria(criteria):
+    """[(metric, threshold)] for a badge's criteria; raises BadgeCriteriaError if malformed"""
+    if not isinstance(criteria, dict) or not criteria:
+        raise BadgeCriteriaError('Criteria must be a non-empty object of metric thresholds')
+    predicates = []
+    for metric, threshold in sorted(criteria.items()):
+        if metric not in METRICS and not (metric.startswith(IMPACT_PREFIX) and len(metric) > len(IMPACT_PREFIX)):
+            raise BadgeCriteriaError(f'Unknown badge metric: {metric}')
+        if isinstance(threshold, bool) or not isinstance(threshold, (int, float)):
+            raise BadgeCriteriaError(f'Threshold of {metric} must be a number')
+        predicates.append((metric, threshold))
+    return predicates
+
+
+def _version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Seed from the clock so a lost version never matches an old compilation
+        cache.add(VERSION_KEY, time.time_ns() // 1000, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate():
+    """Recompile criteria on next use, e.g. after a badge was edited"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns() // 1000, None)
+
+
+_compiled = {'version': None, 'badges': {}, 'by_metric': {}}
+
+
+def compiled_badges():
+    """({badge_id: predicates}, {metric: {badge_id, ...}}), recompiled when badges change"""
+    version = _version()
+    if _compiled['version'] != version:
+        from .sustainability_features import SustainabilityBadge
+        badges, by_metric = {}, {}
+        for badge in SustainabilityBadge.objects.only('id', 'criteria'):
+            try:
+                badges[badge.pk] = compile_criteria(badge.criteria)
+            except BadgeCriteriaError as exc:
+                logger.warning('Skipping badge %s: %s', badge.pk, exc)
+                continue
+            for metric, _ in badges[badge.pk]:
+                by_metric.setdefault(metric, set()).add(badge.pk)
+        _compiled.update(version=version, badges=badges, by_metric=by_metric)
+    return _compiled['badges'], _compiled['by_metric']
+
+
+def evaluate(user_ids, metrics=None, badge_ids=None):
+    """
+    Award the badges reading any of ``metrics`` (default: every badge, or
+    ``badge_ids``) that ``user_ids`` now qualify for. Returns the
+    (user_id, badge_id) pairs awarded.
+    """
+    from .sustainability_features import UserBadge
+
+    badges, by_metric = compiled_badges()
+    if metrics is None:
+        candidates = set(badges)
+    else:
+        candidates = set().union(*(by_metric.get(metric, set()) for metric in metrics))
+    if badge_ids is not None:
+        candidates &= set(badge_ids)
+    user_ids = list(user_ids)
+    if not candidates or not user_ids:
+        return []
+
+    earned = set(
+        UserBadge.objects.filter(user_id__in=user_ids, badge_id__in=candidates).values_list('user_id', 'badge_id')
+    )
+    needed = {metric for badge_id in candidates for metric, _ in badges[badge_id]}
+    values = {metric: metric_function(metric)(user_ids) for metric in sorted(needed)}
+
+    awarded = [
+        (user_id, badge_id)
+        for user_id in user_ids
+        for badge_id in sorted(candidates)
+        if (user_id, badge_id) not in earned
+        and all((values[metric].get(user_id) or 0) >= threshold for metric, threshold in badges[badge_id])
+    ]
+    if awarded:
+        UserBadge.objects.bulk_create(
+            [UserBadge(user_id=user_id, badge_id=badge_id) for user_id, badge_id in awarded],
+            ignore_conflicts=True,
+        )
+        _announce(awarded)
+    return awarded
+
+
+def _announce(awarded):
+    from notifications.utils import notify_many
+    from .sustainability_features import SustainabilityBadge
+
+    by_badge = {}
+    for user_id, badge_id in awarded:
+        by_badge.setdefault(badge_id, []).append(user_id)
+    for badge in SustainabilityBadge.objects.filter(pk__in=by_badge):
+        notify_many(
+            by_badge[badge.pk], 'other', 'Badge earned', f'You earned the {badge.icon} {badge.name} badge!',
+            content_object=badge, idempotency_key=f'badge:{badge.pk}:{min(by_badge[badge.pk])}',
+        )
+
+
+def backfill_badges(badge_ids=None, chunk_size=500):
+    """
+    Evaluate ``badge_ids`` (default: all) for every active user as a group of
+    parallel chunk tasks; returns the number of chunks.
+    """
+    from celery import group
+    from .tasks import evaluate_badges
+
+    user_ids = list(get_user_model().objects.filter(is_active=True).order_by('pk').values_list('pk', flat=True))
+    chunks = [user_ids[start:start + chunk_size] for start in range(0, len(user_ids), chunk_size)]
+    if chunks:
+        group(evaluate_badges.s(chunk, None, badge_ids) for chunk in chunks).apply_async()
+    return len(chunks)
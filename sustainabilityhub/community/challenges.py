@@ -0,0 +1,93 @@
+"""
+Challenge participation and the counters it drives.
+
+A challenge post carries ``participants_count``, ``completed_count`` and
+``total_impact_achieved``. Each is moved with a relative ``F()`` update in
+the transaction that writes the ChallengeParticipation row, and only when
+that write actually changed something (a new participant, a first
+completion), so concurrent joins never lose an update and never rewrite the
+rest of the post. ``reconcile_challenge_stats`` recomputes the counters from
+the participation rows.
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .counters import _count_subquery, _reconcile
+
+STAT_FIELDS = ['participants_count', 'completed_count', 'total_impact_achieved']
+
+
+def _models():
+    from .models import ChallengeParticipation, Post
+    return Post, ChallengeParticipation
+
+
+def join(post, user):
+    """
+    Add ``user`` to the challenge ``post``. Returns True for a new participant;
+    ``post``'s counters are refreshed in place either way.
+    """
+    Post, ChallengeParticipation = _models()
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                ChallengeParticipation.objects.create(user=user, challenge_post=post)
+            joined = True
+        except IntegrityError:
+            joined = False
+        if joined:
+            Post.objects.filter(pk=post.pk).update(participants_count=F('participants_count') + 1)
+        post.refresh_from_db(fields=STAT_FIELDS)
+    return joined
+
+
+def complete(post, user, impact_achieved=None):
+    """
+    Mark ``user``'s participation in ``post`` completed with ``impact_achieved``.
+    A first completion counts towards ``completed_count``; resubmitting only
+    moves ``total_impact_achieved`` by the difference. Returns True for a first
+    completion; raises ChallengeParticipation.DoesNotExist for non-participants
+    and ValueError (or decimal.InvalidOperation) for an invalid impact.
+    """
+    Post, ChallengeParticipation = _models()
+    impact = Decimal(str(impact_achieved)) if impact_achieved not in (None, '') else None
+    if impact is not None and (not impact.is_finite() or impact < 0):
+        raise ValueError(f'Invalid impact: {impact_achieved}')
+    with transaction.atomic():
+        participation = ChallengeParticipation.objects.select_for_update().get(user=user, challenge_post=post)
+        first = not participation.completed
+        delta = (impact or 0) - ((participation.impact_achieved or 0) if not first else 0)
+        participation.completed = True
+        participation.impact_achieved = impact
+        participation.save(update_fields=['completed', 'impact_achieved'])
+
+        changes = {}
+        if first:
+            changes['completed_count'] = F('completed_count') + 1
+        if delta:
+            changes['total_impact_achieved'] = F('total_impact_achieved') + delta
+        if changes:
+            Post.objects.filter(pk=post.pk).update(**changes)
+        post.refresh_from_db(fields=STAT_FIELDS)
+    return first
+
+
+def _impact_subquery(participation_model):
+    totals = participation_model.objects.filter(
+        challenge_post=OuterRef('pk'), completed=True
+    ).order_by().values('challenge_post').annotate(total=Sum('impact_achieved')).values('total')
+    output = DecimalField(max_digits=12, decimal_places=2)
+    return Coalesce(Subquery(totals, output_field=output), Value(Decimal('0')), output_field=output)
+
+
+def reconcile_challenge_stats(batch_size=500):
+    """Recompute the challenge counters of every post; returns the number of posts repaired"""
+    Post, ChallengeParticipation = _models()
+    return _reconcile(Post, {
+        'participants_count': _count_subquery(ChallengeParticipation, 'challenge_post'),
+        'completed_count': _count_subquery(ChallengeParticipation, 'challenge_post', completed=True),
+        'total_impact_achieved': _impact_subquery(ChallengeParticipation),
+    }, batch_size)
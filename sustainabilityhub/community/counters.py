@@ -0,0 +1,163 @@
+"""
+Denormalized engagement counters for community posts, comments and hashtags.
+
+Post and Comment carry a total reaction count, one column per reaction type
+and (for posts) a comment count; HashTag carries its number of posts and
+UserStats a user's posts, comments and followers. The signal handlers in community.signals keep them current with relative
+``F()`` updates, and the toggle helpers below run the reaction write and the
+counter update in one transaction so readers never see them disagree.
+``reconcile_counters`` recomputes everything from the source rows and
+repairs drift.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _shift(model, pk, add=(), remove=()):
+    """Apply +1 to the ``add`` columns and -1 to the ``remove`` columns of one row"""
+    changes = {}
+    for field in add:
+        changes[field] = changes.get(field, 0) + 1
+    for field in remove:
+        changes[field] = changes.get(field, 0) - 1
+    updates = {field: F(field) + delta for field, delta in changes.items() if delta}
+    if updates:
+        model.objects.filter(pk=pk).update(**updates)
+
+
+def reaction_added(model, pk, reaction_type):
+    _shift(model, pk, add=('reaction_count', f'{reaction_type}_count'))
+
+
+def reaction_removed(model, pk, reaction_type):
+    _shift(model, pk, remove=('reaction_count', f'{reaction_type}_count'))
+
+
+def reaction_changed(model, pk, old_type, new_type):
+    if old_type != new_type:
+        _shift(model, pk, add=(f'{new_type}_count',), remove=(f'{old_type}_count',))
+
+
+def comment_added(post_id):
+    _shift(_post_model(), post_id, add=('comment_count',))
+
+
+def comment_removed(post_id):
+    _shift(_post_model(), post_id, remove=('comment_count',))
+
+
+def _post_model():
+    from .models import Post
+    return Post
+
+
+def user_stat_changed(user_id, field, delta):
+    """Move one of ``user_id``'s UserStats counters by ``delta``, creating the row on the first increment"""
+    from .models import UserStats
+    if UserStats.objects.filter(pk=user_id).update(**{field: F(field) + delta}) or delta < 0:
+        # A missing row on a decrement means the user is being deleted
+        return
+    try:
+        with transaction.atomic():
+            UserStats.objects.create(user_id=user_id, **{field: delta})
+    except IntegrityError:
+        # Another transaction created the row first
+        UserStats.objects.filter(pk=user_id).update(**{field: F(field) + delta})
+
+
+def toggle_reaction(reaction_model, target_field, target, user, reaction_type):
+    """
+    Add, switch or remove ``user``'s reaction on ``target``.
+
+    Returns ``(action, reaction)``; the target's counters are refreshed in
+    place from the row that was just updated. Raises ValueError for a
+    reaction type ``reaction_model`` does not have.
+    """
+    if reaction_type not in _reaction_types(reaction_model):
+        raise ValueError(f'Unknown reaction type: {reaction_type}')
+    with transaction.atomic():
+        reaction, created = reaction_model.objects.select_for_update().get_or_create(
+            user=user, defaults={'reaction_type': reaction_type}, **{target_field: target}
+        )
+        if created:
+            action = 'added'
+        elif reaction.reaction_type == reaction_type:
+            reaction.delete()
+            action = 'removed'
+        else:
+            reaction.reaction_type = reaction_type
+            reaction.save(update_fields=['reaction_type'])
+            action = 'updated'
+        target.refresh_from_db(fields=['reaction_count'] + [
+            f'{choice}_count' for choice in _reaction_types(reaction_model)
+        ])
+    return action, reaction
+
+
+def _reaction_types(reaction_model):
+    return [choice for choice, _ in reaction_model._meta.get_field('reaction_type').choices]
+
+
+def _count_subquery(model, fk, **filters):
+    counts = model.objects.filter(**{fk: OuterRef('pk')}, **filters).order_by().values(fk).annotate(
+        total=Count('*')
+    ).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def _reconcile(model, expected, batch_size):
+    """Compare stored counters with recomputed ones and rewrite rows that differ"""
+    fields = list(expected)
+    annotated = model.objects.annotate(**{f'expected_{field}': expr for field, expr in expected.items()})
+    drift = Q()
+    for field in fields:
+        drift |= ~Q(**{field: F(f'expected_{field}')})
+
+    stale = []
+    for row in annotated.filter(drift).only('pk', *fields).iterator(chunk_size=batch_size):
+        for field in fields:
+            setattr(row, field, getattr(row, f'expected_{field}'))
+        stale.append(row)
+    for start in range(0, len(stale), batch_size):
+        model.objects.bulk_update(stale[start:start + batch_size], fields)
+    return len(stale)
+
+
+def reconcile_counters(batch_size=500):
+    """Recompute every community counter; returns the number of rows repaired per model"""
+    from django.contrib.auth import get_user_model
+    from profiles.models import Follow
+    from .models import Post, PostReaction, Comment, CommentReaction, HashTag, UserStats
+
+    post_expected = {
+        'reaction_count': _count_subquery(PostReaction, 'post'),
+        'comment_count': _count_subquery(Comment, 'post'),
+    }
+    for reaction_type in _reaction_types(PostReaction):
+        post_expected[f'{reaction_type}_count'] = _count_subquery(PostReaction, 'post', reaction_type=reaction_type)
+
+    comment_expected = {'reaction_count': _count_subquery(CommentReaction, 'comment')}
+    for reaction_type in _reaction_types(CommentReaction):
+        comment_expected[f'{reaction_type}_count'] = _count_subquery(
+            CommentReaction, 'comment', reaction_type=reaction_type
+        )
+
+    hashtag_expected = {'post_count': _count_subquery(HashTag.posts.through, 'hashtag')}
+
+    missing = get_user_model().objects.filter(community_stats__isnull=True).values_list('pk', flat=True)
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=user_id) for user_id in missing.iterator()], batch_size=batch_size, ignore_conflicts=True
+    )
+    user_expected = {
+        'post_count': _count_subquery(Post, 'author'),
+        'comment_count': _count_subquery(Comment, 'author'),
+        'follower_count': _count_subquery(Follow, 'following'),
+    }
+
+    return {
+        'posts': _reconcile(Post, post_expected, batch_size),
+        'comments': _reconcile(Comment, comment_expected, batch_size),
+        'hashtags': _reconcile(HashTag, hashtag_expected, batch_size),
+        'users': _reconcile(UserStats, user_expected, batch_size),
+    }
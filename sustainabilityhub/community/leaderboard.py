@@ -0,0 +1,237 @@
+"""
+Impact leaderboards kept as running totals in sorted sets.
+
+Every ImpactTracker insert adds its amount to six boards: the all-time,
+monthly and weekly boards of its impact type and of all impact combined.
+Reading the top N or a user's rank is then a sorted-set range or rank lookup
+(O(log n)) instead of aggregating the whole impact table. Two stores are
+available through the LEADERBOARD_BACKEND setting:
+
+* ``memory`` - per-process sorted lists, for development.
+* ``redis`` - sorted sets at REDIS_URL shared by every worker. Monthly and
+  weekly boards expire once their period is well past.
+
+A board that has not been built yet (a fresh process, an emptied Redis) is
+filled from the daily impact rollups on first read; ``rebuild_leaderboards`` rebuilds
+every board and runs nightly to repair any drift.
+"""
+import bisect
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Sum
+from django.utils import timezone
+
+ALL = 'all'
+WINDOWS = ('all', 'month', 'week')
+
+
+def period(window, when=None):
+    """The period of ``window`` containing ``when`` (default: now), e.g. '2024-06' or '2024-W23'"""
+    if window == 'all':
+        return ALL
+    when = timezone.localtime(when or timezone.now())
+    if window == 'month':
+        return when.strftime('%Y-%m')
+    year, week, _ = when.isocalendar()
+    return f'{year}-W{week:02d}'
+
+
+def _window_start(window, when=None):
+    when = timezone.localtime(when or timezone.now())
+    midnight = when.replace(hour=0, minute=0, second=0, microsecond=0)
+    if window == 'month':
+        return midnight.replace(day=1)
+    return midnight - timezone.timedelta(days=when.weekday())
+
+
+def _boards(impact_type, when):
+    return [(board_type, window, period(window, when)) for board_type in (ALL, impact_type) for window in WINDOWS]
+
+
+def board_key(impact_type, window, board_period):
+    return f'leaderboard:{impact_type}:{window}:{board_period}'
+
+
+class MemoryLeaderboard:
+    """Sorted (-score, user_id) lists held by the current process"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._scores = {}
+            self._ranked = {}
+
+    def exists(self, key):
+        return key in self._scores
+
+    def incr(self, keys, user_id, amount):
+        with self._lock:
+            for key in keys:
+                # Unbuilt boards are filled from the database on first read, this impact included
+                if key in self._scores:
+                    self._set(key, user_id, self._scores[key].get(user_id, 0.0) + amount)
+
+    def _set(self, key, user_id, score):
+        scores, ranked = self._scores[key], self._ranked[key]
+        if user_id in scores:
+            del ranked[bisect.bisect_left(ranked, (-scores[user_id], user_id))]
+        scores[user_id] = score
+        bisect.insort(ranked, (-score, user_id))
+
+    def replace(self, key, totals):
+        with self._lock:
+            self._scores[key] = dict(totals)
+            self._ranked[key] = sorted((-score, user_id) for user_id, score in totals.items())
+
+    def top(self, key, limit):
+        return [(user_id, -score) for score, user_id in self._ranked[key][:limit]]
+
+    def rank(self, key, user_id):
+        score = self._scores[key].get(user_id)
+        if score is None:
+            return None, None
+        return bisect.bisect_left(self._ranked[key], (-score, user_id)) + 1, score
+
+
+class RedisLeaderboard:
+    """Sorted sets shared by every worker"""
+
+    def __init__(self, url):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+
+    def clear(self):
+        keys = list(self._redis.scan_iter('leaderboard:*'))
+        if keys:
+            self._redis.delete(*keys)
+
+    def exists(self, key):
+        return bool(self._redis.exists(f'{key}:built'))
+
+    def _expiry(self, key):
+        # Windowed boards linger for one more period so "last week" stays readable
+        if ':month:' in key:
+            return 62 * 86400
+        if ':week:' in key:
+            return 15 * 86400
+        return None
+
+    def incr(self, keys, user_id, amount):
+        pipe = self._redis.pipeline()
+        for key in keys:
+            pipe.exists(f'{key}:built')
+        built = pipe.execute()
+        for key, exists in zip(keys, built):
+            if exists:
+                pipe.zincrby(key, amount, user_id)
+                expiry = self._expiry(key)
+                if expiry:
+                    pipe.expire(key, expiry)
+        pipe.execute()
+
+    def replace(self, key, totals):
+        building = f'{key}:building'
+        pipe = self._redis.pipeline()
+        pipe.delete(building)
+        if totals:
+            pipe.zadd(building, {user_id: score for user_id, score in totals.items()})
+            pipe.rename(building, key)
+        else:
+            pipe.delete(key)
+        pipe.set(f'{key}:built', 1, ex=self._expiry(key))
+        expiry = self._expiry(key)
+        if expiry and totals:
+            pipe.expire(key, expiry)
+        pipe.execute()
+
+    def top(self, key, limit):
+        return [(int(user_id), score) for user_id, score in self._redis.zrevrange(key, 0, limit - 1, withscores=True)]
+
+    def rank(self, key, user_id):
+        pipe = self._redis.pipeline()
+        pipe.zrevrank(key, user_id)
+        pipe.zscore(key, user_id)
+        rank, score = pipe.execute()
+        if rank is None:
+            return None, None
+        return rank + 1, score
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if getattr(settings, 'LEADERBOARD_BACKEND', 'memory') == 'redis':
+                    _store = RedisLeaderboard(settings.REDIS_URL)
+                else:
+                    _store = MemoryLeaderboard()
+    return _store
+
+
+def record_impact(user_id, impact_type, amount, when=None):
+    """Add ``amount`` (negative to retract) to every board the impact counts towards"""
+    get_store().incr([board_key(*board) for board in _boards(impact_type, when)], user_id, float(amount))
+
+
+def compute_totals(impact_type=ALL, window='all', when=None):
+    """Per-user totals of one board, aggregated from the daily impact rollups"""
+    from .sustainability_features import ImpactDailyRollup
+
+    rows = ImpactDailyRollup.objects.all()
+    if impact_type != ALL:
+        rows = rows.filter(impact_type=impact_type)
+    if window != 'all':
+        rows = rows.filter(day__gte=_window_start(window, when).date())
+    return {
+        user_id: float(total)
+        for user_id, total in rows.values('user').annotate(total=Sum('total')).values_list('user', 'total')
+    }
+
+
+def _ensure(impact_type, window):
+    store = get_store()
+    key = board_key(impact_type, window, period(window))
+    if not store.exists(key):
+        store.replace(key, compute_totals(impact_type, window))
+    return store, key
+
+
+def top(impact_type=ALL, window='all', limit=10):
+    """The leading users of a board as [{'rank', 'user', 'total'}], best first"""
+    store, key = _ensure(impact_type, window)
+    entries = store.top(key, limit)
+    users = get_user_model().objects.in_bulk([user_id for user_id, _ in entries])
+    return [
+        {'rank': position, 'user': users[user_id], 'total': total}
+        for position, (user_id, total) in enumerate(entries, 1)
+        if user_id in users
+    ]
+
+
+def rank_of(user_id, impact_type=ALL, window='all'):
+    """(rank, total) of a user on a board, or (None, None) without any impact there"""
+    store, key = _ensure(impact_type, window)
+    return store.rank(key, user_id)
+
+
+def impact_types():
+    from .sustainability_features import ImpactTracker
+    return [value for value, _ in ImpactTracker._meta.get_field('impact_type').choices]
+
+
+def rebuild_leaderboards():
+    """Recompute the current boards of every window and impact type from the database"""
+    store = get_store()
+    for impact_type in [ALL] + impact_types():
+        for window in WINDOWS:
+            store.replace(board_key(impact_type, window, period(window)), compute_totals(impact_type, window))
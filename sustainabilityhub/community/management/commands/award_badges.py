@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from community.badges import backfill_badges
+
+
+class Command(BaseCommand):
+    help = 'Evaluates badge criteria for every active user and awards the badges they have earned'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--badge', type=int, action='append', dest='badge_ids',
+                            help='Only evaluate this badge id (repeatable)')
+        parser.add_argument('--chunk-size', type=int,
+                            default=getattr(settings, 'BADGE_BACKFILL_CHUNK_SIZE', 500))
+
+    def handle(self, *args, **options):
+        chunks = backfill_badges(options['badge_ids'], options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'[OK] Queued badge evaluation in {chunks} chunks'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from community.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Backfills or rebuilds the daily impact rollups from the impact records'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='Only rebuild this user id (repeatable)')
+
+    def handle(self, *args, **options):
+        written = rebuild_rollups(options['user_ids'])
+        self.stdout.write(self.style.SUCCESS(f'[OK] Wrote {written} impact rollup rows'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from community.leaderboard import rebuild_leaderboards
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the all-time, monthly and weekly impact leaderboards from the impact records'
+
+    def handle(self, *args, **options):
+        rebuild_leaderboards()
+        self.stdout.write(self.style.SUCCESS('[OK] Impact leaderboards rebuilt'))
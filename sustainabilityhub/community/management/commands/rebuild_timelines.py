@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from community.timeline import rebuild_timeline, trim_timelines
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds materialized community home timelines from follows and posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='Only rebuild the timeline of this user id')
+        parser.add_argument('--trim-only', action='store_true', help='Only trim timelines to TIMELINE_MAX_ENTRIES')
+
+    def handle(self, *args, **options):
+        if options['trim_only']:
+            deleted = trim_timelines()
+            self.stdout.write(self.style.SUCCESS(f'[OK] Trimmed {deleted} timeline entries'))
+            return
+
+        if options['user']:
+            user_ids = [options['user']]
+        else:
+            user_ids = get_user_model().objects.values_list('id', flat=True).iterator()
+
+        rebuilt = 0
+        for user_id in user_ids:
+            rebuild_timeline(user_id)
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(f'[OK] Rebuilt {rebuilt} timeline(s)'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from community.challenges import reconcile_challenge_stats
+from community.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Recomputes community post, comment, hashtag and challenge counters and repairs any drift'
+
+    def handle(self, *args, **options):
+        repaired = reconcile_counters()
+        repaired['challenges'] = reconcile_challenge_stats()
+        for label, count in repaired.items():
+            if count:
+                self.stdout.write(self.style.WARNING(f'[-] Repaired counters on {count} {label}'))
+        self.stdout.write(self.style.SUCCESS('[OK] Community counters verified'))
@@ -0,0 +1,112 @@
+# Generated by Django 4.2.30 on 2026-10-18 03:34
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+POST_REACTIONS = ('like', 'love', 'celebrate', 'support', 'inspire')
+COMMENT_REACTIONS = ('like', 'love', 'laugh')
+
+
+def _count(model, fk, **filters):
+    counts = model.objects.filter(**{fk: OuterRef('pk')}, **filters).order_by().values(fk).annotate(
+        total=Count('*')
+    ).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def backfill_counters(apps, schema_editor):
+    Post = apps.get_model('community', 'Post')
+    PostReaction = apps.get_model('community', 'PostReaction')
+    Comment = apps.get_model('community', 'Comment')
+    CommentReaction = apps.get_model('community', 'CommentReaction')
+    HashTag = apps.get_model('community', 'HashTag')
+
+    Post.objects.update(
+        reaction_count=_count(PostReaction, 'post'),
+        comment_count=_count(Comment, 'post'),
+        **{f'{reaction}_count': _count(PostReaction, 'post', reaction_type=reaction) for reaction in POST_REACTIONS},
+    )
+    Comment.objects.update(
+        reaction_count=_count(CommentReaction, 'comment'),
+        **{
+            f'{reaction}_count': _count(CommentReaction, 'comment', reaction_type=reaction)
+            for reaction in COMMENT_REACTIONS
+        },
+    )
+    HashTag.objects.update(post_count=_count(HashTag.posts.through, 'hashtag'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0005_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='laugh_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='love_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='reaction_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='hashtag',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='celebrate_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='inspire_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='love_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='reaction_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='support_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='hashtag',
+            index=models.Index(fields=['-post_count'], name='community_h_post_co_df7a47_idx'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
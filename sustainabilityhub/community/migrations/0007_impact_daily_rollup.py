@@ -0,0 +1,65 @@
+# Generated by Django 4.2.30 on 2026-10-18 03:54
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+
+def backfill_rollups(apps, schema_editor):
+    ImpactTracker = apps.get_model('community', 'ImpactTracker')
+    ImpactDailyRollup = apps.get_model('community', 'ImpactDailyRollup')
+    grouped = ImpactTracker.objects.order_by().annotate(day=TruncDate('date_recorded')).values(
+        'user_id', 'day', 'impact_type', 'unit'
+    ).annotate(day_total=Sum('amount'), day_actions=Count('id'))
+    batch = []
+    for row in grouped.iterator(chunk_size=1000):
+        batch.append(ImpactDailyRollup(
+            user_id=row['user_id'], day=row['day'], impact_type=row['impact_type'], unit=row['unit'],
+            total=row['day_total'], actions=row['day_actions'],
+        ))
+        if len(batch) >= 1000:
+            ImpactDailyRollup.objects.bulk_create(batch)
+            batch = []
+    ImpactDailyRollup.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('community', '0006_engagement_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImpactDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('impact_type', models.CharField(max_length=50)),
+                ('unit', models.CharField(max_length=20)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('actions', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='impacttracker',
+            index=models.Index(fields=['user', 'date_recorded'], name='community_impact_user_date'),
+        ),
+        migrations.AddField(
+            model_name='impactdailyrollup',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='impact_rollups', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='impactdailyrollup',
+            index=models.Index(fields=['day', 'impact_type'], name='community_rollup_day_type'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='impactdailyrollup',
+            unique_together={('user', 'day', 'impact_type', 'unit')},
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
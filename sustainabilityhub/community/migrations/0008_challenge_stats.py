@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-18 03:58
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_challenge_stats(apps, schema_editor):
+    Post = apps.get_model('community', 'Post')
+    ChallengeParticipation = apps.get_model('community', 'ChallengeParticipation')
+
+    def count(**filters):
+        counts = ChallengeParticipation.objects.filter(challenge_post=OuterRef('pk'), **filters).order_by().values(
+            'challenge_post'
+        ).annotate(total=Count('*')).values('total')
+        return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+    totals = ChallengeParticipation.objects.filter(challenge_post=OuterRef('pk'), completed=True).order_by().values(
+        'challenge_post'
+    ).annotate(total=Sum('impact_achieved')).values('total')
+    output = DecimalField(max_digits=12, decimal_places=2)
+    Post.objects.update(
+        participants_count=count(),
+        completed_count=count(completed=True),
+        total_impact_achieved=Coalesce(Subquery(totals, output_field=output), Value(Decimal('0')), output_field=output),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0007_impact_daily_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='completed_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='total_impact_achieved',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(backfill_challenge_stats, migrations.RunPython.noop),
+    ]
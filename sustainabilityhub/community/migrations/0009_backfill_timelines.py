@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count
+
+ORDERING = ('-is_pinned', '-created_at', '-id')
+
+
+def build_timelines(apps, schema_editor):
+    Post = apps.get_model('community', 'Post')
+    TimelineEntry = apps.get_model('community', 'TimelineEntry')
+    Follow = apps.get_model('profiles', 'Follow')
+    limit = getattr(settings, 'TIMELINE_MAX_ENTRIES', 800)
+    # Posts of widely followed authors are merged at read time, not fanned out
+    celebrities = set(
+        Follow.objects.values('following').annotate(follower_count=Count('id')).filter(
+            follower_count__gt=getattr(settings, 'FEED_FANOUT_MAX_FOLLOWERS', 5000)
+        ).values_list('following', flat=True)
+    )
+    user_ids = set(Follow.objects.values_list('follower_id', flat=True))
+    user_ids.update(Post.objects.values_list('author_id', flat=True))
+    for user_id in sorted(user_ids):
+        authors = [user_id]
+        authors.extend(
+            following_id
+            for following_id in Follow.objects.filter(follower_id=user_id).values_list('following_id', flat=True)
+            if following_id not in celebrities
+        )
+        TimelineEntry.objects.filter(user_id=user_id).delete()
+        posts = Post.objects.filter(author_id__in=authors).order_by(*ORDERING).only(
+            'id', 'is_pinned', 'created_at'
+        )[:limit]
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(user_id=user_id, post_id=post.id, is_pinned=post.is_pinned, created_at=post.created_at)
+                for post in posts
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0008_challenge_stats'),
+        ('profiles', '0002_remove_profile_interests_remove_profile_skills_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_timelines, migrations.RunPython.noop),
+    ]
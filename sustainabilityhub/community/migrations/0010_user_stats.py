@@ -0,0 +1,50 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:56
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def _count(model, fk):
+    counts = model.objects.filter(**{fk: OuterRef('pk')}).order_by().values(fk).annotate(
+        total=Count('*')
+    ).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def backfill_user_stats(apps, schema_editor):
+    UserStats = apps.get_model('community', 'UserStats')
+    users = apps.get_model(settings.AUTH_USER_MODEL).objects.values_list('pk', flat=True)
+    UserStats.objects.bulk_create([UserStats(user_id=pk) for pk in users.iterator()], batch_size=1000)
+    UserStats.objects.update(
+        post_count=_count(apps.get_model('community', 'Post'), 'author'),
+        comment_count=_count(apps.get_model('community', 'Comment'), 'author'),
+        follower_count=_count(apps.get_model('profiles', 'Follow'), 'following'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_userwarning_justification_and_more'),
+        ('community', '0009_backfill_timelines'),
+        ('profiles', '0002_remove_profile_interests_remove_profile_skills_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='community_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('post_count', models.PositiveIntegerField(default=0)),
+                ('comment_count', models.PositiveIntegerField(default=0)),
+                ('follower_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'User stats',
+            },
+        ),
+        migrations.RunPython(backfill_user_stats, migrations.RunPython.noop),
+    ]
@@ -39,6 +39,8 @@ class Post(models.Model):
     location = models.CharField(max_length=200, blank=True, help_text="Location for local impact")
     challenge_duration = models.PositiveIntegerField(null=True, blank=True, help_text="Challenge duration in days")
     participants_count = models.PositiveIntegerField(default=0)
+    completed_count = models.PositiveIntegerField(default=0)
+    total_impact_achieved = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     impact_category = models.CharField(max_length=50, choices=[
         ('energy', 'Energy Saving'),
         ('waste', 'Waste Reduction'),
@@ -48,11 +50,21 @@ class Post(models.Model):
         ('biodiversity', 'Biodiversity Protection'),
     ], blank=True)
     
+    # Denormalized counters, maintained by community.counters
+    reaction_count = models.PositiveIntegerField(default=0)
+    like_count = models.PositiveIntegerField(default=0)
+    love_count = models.PositiveIntegerField(default=0)
+    celebrate_count = models.PositiveIntegerField(default=0)
+    support_count = models.PositiveIntegerField(default=0)
+    inspire_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    
     class Meta:
         ordering = ['-is_pinned', '-created_at']
         indexes = [
             models.Index(fields=['-created_at']),
             models.Index(fields=['author', '-created_at']),
+            models.Index(fields=['-is_pinned', '-created_at', '-id']),
         ]
     
     def __str__(self):
@@ -60,11 +72,11 @@ class Post(models.Model):
     
     @property
     def total_reactions(self):
-        return self.reactions.count()
+        return self.reaction_count
     
     @property
     def total_comments(self):
-        return self.comments.count()
+        return self.comment_count
 
 
 class PostReaction(models.Model):
@@ -102,6 +114,12 @@ class Comment(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_edited = models.BooleanField(default=False)
     
+    # Denormalized counters, maintained by community.counters
+    reaction_count = models.PositiveIntegerField(default=0)
+    like_count = models.PositiveIntegerField(default=0)
+    love_count = models.PositiveIntegerField(default=0)
+    laugh_count = models.PositiveIntegerField(default=0)
+    
     class Meta:
         ordering = ['created_at']
         indexes = [
@@ -113,7 +131,7 @@ class Comment(models.Model):
     
     @property
     def total_reactions(self):
-        return self.reactions.count()
+        return self.reaction_count
 
 
 class CommentReaction(models.Model):
@@ -153,21 +171,56 @@ class Follow(models.Model):
         return f'{self.follower.username} follows {self.following.username}'
 
 
+class UserStats(models.Model):
+    """Per-user activity counters, maintained by community.counters"""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='community_stats'
+    )
+    post_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    # Followers in the profiles follow graph, which also drives the home timelines
+    follower_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'User stats'
+
+    def __str__(self):
+        return f'Stats of user {self.user_id}'
+
+
+class TimelineEntry(models.Model):
+    """Materialized home timeline: one row per post pushed to a follower"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='timeline_entries')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    # Copies of the post's sort keys so the feed is a single index range read
+    is_pinned = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    
+    class Meta:
+        unique_together = ['user', 'post']
+        indexes = [
+            models.Index(fields=['user', '-is_pinned', '-created_at', '-post']),
+        ]
+    
+    def __str__(self):
+        return f'Post {self.post_id} in timeline of user {self.user_id}'
+
+
 class HashTag(models.Model):
     """Hashtags for posts"""
     name = models.CharField(max_length=100, unique=True)
     posts = models.ManyToManyField(Post, related_name='hashtags', blank=True)
+    post_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['-post_count']),
+        ]
     
     def __str__(self):
         return f'#{self.name}'
-    
-    @property
-    def post_count(self):
-        return self.posts.count()
 
 
 class ChallengeParticipation(models.Model):
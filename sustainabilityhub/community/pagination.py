@@ -0,0 +1,130 @@
+"""
+Keyset pagination for the community feed.
+
+Pages are cut on (is_pinned, created_at, id) instead of OFFSET, so every page
+is a bounded index range read no matter how far the user has scrolled, and
+posts created while scrolling never shift or duplicate later pages.
+"""
+import base64
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class PostCursorPagination(BasePagination):
+    """Opaque-cursor pagination ordered by -is_pinned, -created_at, -id"""
+    ordering = ('-is_pinned', '-created_at', '-id')
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        page_size = getattr(settings, 'COMMUNITY_FEED_PAGE_SIZE', 20)
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return page_size
+        return min(max(requested, 1), self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.after(*position))
+
+        results = list(queryset.order_by(*self.ordering)[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+        self.next_position = self.position_of(results[-1]) if self.has_next else None
+        return results
+
+    @staticmethod
+    def after(is_pinned, created_at, pk, id_field='id'):
+        """Rows that sort strictly after the given position"""
+        return (
+            Q(is_pinned__lt=is_pinned) |
+            Q(is_pinned=is_pinned, created_at__lt=created_at) |
+            Q(is_pinned=is_pinned, created_at=created_at, **{f'{id_field}__lt': pk})
+        )
+
+    @staticmethod
+    def position_of(post):
+        return (post.is_pinned, post.created_at, post.pk)
+
+    def encode_cursor(self, position):
+        is_pinned, created_at, pk = position
+        raw = json.dumps([int(is_pinned), created_at.isoformat(), pk])
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)).decode()
+            is_pinned, created_at, pk = json.loads(raw)
+            created_at = parse_datetime(created_at)
+            if created_at is None:
+                raise ValueError(created_at)
+            return bool(is_pinned), created_at, int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_first_link(self):
+        return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('first', self.get_first_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'first': {'type': 'string', 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class TimelineCursorPagination(PostCursorPagination):
+    """
+    Same cursors as PostCursorPagination, but positions come from the
+    requesting user's materialized timeline, narrowed to the posts of the
+    given queryset, and the page is fetched from it by primary key.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        from .timeline import read_timeline
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        position = self.decode_cursor(request)
+        positions = read_timeline(request.user, position, self.page_size + 1, posts=queryset)
+        self.has_next = len(positions) > self.page_size
+        positions = positions[:self.page_size]
+        self.next_position = positions[-1] if self.has_next else None
+
+        posts = queryset.in_bulk([post_id for _, _, post_id in positions])
+        return [posts[post_id] for _, _, post_id in positions if post_id in posts]
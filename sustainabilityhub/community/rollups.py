@@ -0,0 +1,100 @@
+"""
+Daily impact rollups per user, impact type and unit.
+
+ImpactDailyRollup holds the running total and action count of each
+(user, day, impact_type, unit). community.signals applies every ImpactTracker
+insert, edit and delete to its row in the same transaction, so a user's
+totals and time series are read from at most one row per day and type no
+matter how many actions they log. ``rebuild_rollups`` recomputes the table
+from ImpactTracker (see the rebuild_impact_rollups command).
+"""
+from decimal import Decimal
+
+from django.apps import apps as global_apps
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def _rollup_model():
+    return global_apps.get_model('community', 'ImpactDailyRollup')
+
+
+def apply(user_id, impact_type, unit, recorded_at, amount, actions=1):
+    """Add ``amount`` and ``actions`` (negative to retract) to the day's rollup row"""
+    Rollup = _rollup_model()
+    key = {
+        'user_id': user_id, 'day': timezone.localdate(recorded_at),
+        'impact_type': impact_type, 'unit': unit,
+    }
+    amount = Decimal(str(amount))
+    changes = {'total': F('total') + amount, 'actions': F('actions') + actions}
+    if Rollup.objects.filter(**key).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            Rollup.objects.create(total=amount, actions=max(actions, 0), **key)
+    except IntegrityError:
+        # Another transaction created the row first
+        Rollup.objects.filter(**key).update(**changes)
+
+
+def user_totals(user_id):
+    """All-time impact total and action count of a user"""
+    return _rollup_model().objects.filter(user_id=user_id).aggregate(
+        total_carbon=Sum('total'), total_actions=Sum('actions')
+    )
+
+
+def daily_series(user_id, days=30, impact_type=None):
+    """[(day, total, actions)] for each of the last ``days`` days, oldest first, zero-filled"""
+    today = timezone.localdate()
+    start = today - timezone.timedelta(days=days - 1)
+    rows = _rollup_model().objects.filter(user_id=user_id, day__gte=start)
+    if impact_type:
+        rows = rows.filter(impact_type=impact_type)
+    by_day = {
+        day: (total, actions)
+        for day, total, actions in rows.values('day').annotate(
+            day_total=Sum('total'), day_actions=Sum('actions')
+        ).values_list('day', 'day_total', 'day_actions')
+    }
+    series = []
+    for offset in range(days):
+        day = start + timezone.timedelta(days=offset)
+        total, actions = by_day.get(day, (Decimal('0'), 0))
+        series.append((day, total, actions))
+    return series
+
+
+def rebuild_rollups(user_ids=None, batch_size=1000):
+    """
+    Recompute rollup rows from ImpactTracker, for ``user_ids`` or everyone.
+    Returns the number of rows written.
+    """
+    Rollup = _rollup_model()
+    records = global_apps.get_model('community', 'ImpactTracker').objects.order_by()
+    rollups = Rollup.objects.all()
+    if user_ids is not None:
+        records = records.filter(user_id__in=user_ids)
+        rollups = rollups.filter(user_id__in=user_ids)
+    grouped = records.annotate(day=TruncDate('date_recorded')).values(
+        'user_id', 'day', 'impact_type', 'unit'
+    ).annotate(day_total=Sum('amount'), day_actions=Count('id'))
+
+    with transaction.atomic():
+        rollups.delete()
+        written = 0
+        batch = []
+        for row in grouped.iterator(chunk_size=batch_size):
+            batch.append(Rollup(
+                user_id=row['user_id'], day=row['day'], impact_type=row['impact_type'], unit=row['unit'],
+                total=row['day_total'], actions=row['day_actions'],
+            ))
+            if len(batch) >= batch_size:
+                written += len(Rollup.objects.bulk_create(batch))
+                batch = []
+        if batch:
+            written += len(Rollup.objects.bulk_create(batch))
+    return written
@@ -1,5 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from sustainabilityhub.comment_tree import attach_comment_trees
 from .models import Post, PostReaction, Comment, CommentReaction, Follow, HashTag
 
 User = get_user_model()
@@ -22,7 +24,6 @@ class UserBasicSerializer(serializers.ModelSerializer):
 
 
 class HashTagSerializer(serializers.ModelSerializer):
-    post_count = serializers.ReadOnlyField()
     
     class Meta:
         model = HashTag
@@ -37,32 +38,51 @@ class CommentReactionSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'reaction_type', 'created_at']
 
 
+def _viewer_reaction(obj, context):
+    """Find the requesting user's reaction among the (prefetched) reactions"""
+    request = context.get('request')
+    if request and request.user.is_authenticated:
+        for reaction in obj.reactions.all():
+            if reaction.user_id == request.user.id:
+                return reaction.reaction_type
+    return None
+
+
 class CommentSerializer(serializers.ModelSerializer):
     author = UserBasicSerializer(read_only=True)
     reactions = CommentReactionSerializer(many=True, read_only=True)
-    total_reactions = serializers.ReadOnlyField()
+    total_reactions = serializers.IntegerField(source='reaction_count', read_only=True)
     replies = serializers.SerializerMethodField()
+    more_replies = serializers.SerializerMethodField()
+    replies_cursor = serializers.SerializerMethodField()
     user_reaction = serializers.SerializerMethodField()
     
     class Meta:
         model = Comment
         fields = [
             'id', 'author', 'content', 'parent', 'created_at', 'updated_at',
-            'is_edited', 'reactions', 'total_reactions', 'replies', 'user_reaction'
+            'is_edited', 'reactions', 'total_reactions', 'like_count', 'love_count',
+            'laugh_count', 'replies', 'more_replies', 'replies_cursor', 'user_reaction'
+        ]
+        read_only_fields = [
+            'author', 'created_at', 'updated_at', 'is_edited', 'like_count', 'love_count', 'laugh_count'
         ]
-        read_only_fields = ['author', 'created_at', 'updated_at', 'is_edited']
     
     def get_replies(self, obj):
-        if obj.replies.exists():
-            return CommentSerializer(obj.replies.all(), many=True, context=self.context).data
-        return []
+        # Comments loaded through comment_tree carry their visible replies already
+        replies = getattr(obj, 'tree_replies', None)
+        if replies is None:
+            replies = obj.replies.all()
+        return CommentSerializer(replies, many=True, context=self.context).data
+    
+    def get_more_replies(self, obj):
+        return getattr(obj, 'hidden_replies', 0)
+    
+    def get_replies_cursor(self, obj):
+        return getattr(obj, 'replies_cursor', None)
     
     def get_user_reaction(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            reaction = obj.reactions.filter(user=request.user).first()
-            return reaction.reaction_type if reaction else None
-        return None
+        return _viewer_reaction(obj, self.context)
 
 
 class PostReactionSerializer(serializers.ModelSerializer):
@@ -73,13 +93,46 @@ class PostReactionSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'reaction_type', 'created_at']
 
 
+class PostListSerializer(serializers.ListSerializer):
+    """
+    Serializes a page of posts in a fixed number of queries: comment trees
+    are built from one query for the whole page and linked objects are loaded
+    with one query per content type instead of one per post.
+    """
+    
+    def to_representation(self, data):
+        posts = list(data.all() if hasattr(data, 'all') else data)
+        PostSerializer.attach_comments(posts)
+        self._attach_content_objects(posts)
+        return super().to_representation(posts)
+    
+    @staticmethod
+    def _attach_content_objects(posts):
+        wanted = {}
+        for post in posts:
+            if post.content_type_id and post.object_id:
+                wanted.setdefault(post.content_type_id, set()).add(post.object_id)
+        
+        field = Post._meta.get_field('content_object')
+        for content_type_id, object_ids in wanted.items():
+            model = ContentType.objects.get_for_id(content_type_id).model_class()
+            if model is None:
+                continue
+            objects = model._base_manager.in_bulk(object_ids)
+            for post in posts:
+                if post.content_type_id == content_type_id and post.object_id in objects:
+                    field.set_cached_value(post, objects[post.object_id])
+
+
 class PostSerializer(serializers.ModelSerializer):
     author = UserBasicSerializer(read_only=True)
     reactions = PostReactionSerializer(many=True, read_only=True)
-    comments = CommentSerializer(many=True, read_only=True)
+    comments = serializers.SerializerMethodField()
+    more_comments = serializers.SerializerMethodField()
+    comments_cursor = serializers.SerializerMethodField()
     hashtags = HashTagSerializer(many=True, read_only=True)
-    total_reactions = serializers.ReadOnlyField()
-    total_comments = serializers.ReadOnlyField()
+    total_reactions = serializers.IntegerField(source='reaction_count', read_only=True)
+    total_comments = serializers.IntegerField(source='comment_count', read_only=True)
     user_reaction = serializers.SerializerMethodField()
     image_url = serializers.SerializerMethodField()
     content_object_data = serializers.SerializerMethodField()
@@ -89,17 +142,44 @@ class PostSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'author', 'content', 'post_type', 'image', 'image_url',
             'link_url', 'link_title', 'created_at', 'updated_at', 'is_pinned',
-            'is_featured', 'reactions', 'comments', 'hashtags', 'total_reactions',
-            'total_comments', 'user_reaction', 'content_object_data'
+            'is_featured', 'reactions', 'comments', 'more_comments', 'comments_cursor',
+            'hashtags', 'total_reactions',
+            'total_comments', 'like_count', 'love_count', 'celebrate_count',
+            'support_count', 'inspire_count', 'user_reaction', 'content_object_data',
+            'participants_count', 'completed_count', 'total_impact_achieved'
+        ]
+        read_only_fields = [
+            'author', 'created_at', 'updated_at', 'like_count', 'love_count',
+            'celebrate_count', 'support_count', 'inspire_count', 'participants_count',
+            'completed_count', 'total_impact_achieved'
         ]
-        read_only_fields = ['author', 'created_at', 'updated_at']
+        list_serializer_class = PostListSerializer
+    
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Prefetch everything the serializer touches so a page costs O(1) queries"""
+        return queryset.select_related('author', 'content_type').prefetch_related(
+            'reactions__user', 'hashtags',
+        )
+    
+    @staticmethod
+    def attach_comments(posts):
+        """Build the comment trees of all ``posts`` from a single comment query"""
+        attach_comment_trees(posts, Comment, prefetch=('reactions__user',))
+    
+    def get_comments(self, obj):
+        if not hasattr(obj, 'comment_tree'):
+            self.attach_comments([obj])
+        return CommentSerializer(obj.comment_tree, many=True, context=self.context).data
+    
+    def get_more_comments(self, obj):
+        return obj.hidden_comments
+    
+    def get_comments_cursor(self, obj):
+        return obj.comments_cursor
     
     def get_user_reaction(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            reaction = obj.reactions.filter(user=request.user).first()
-            return reaction.reaction_type if reaction else None
-        return None
+        return _viewer_reaction(obj, self.context)
     
     def get_image_url(self, obj):
         if obj.image:
@@ -0,0 +1,203 @@
+from django.db.models import F
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+from profiles.models import Follow
+from sustainabilityhub.dispatch import enqueue
+from . import badges, counters, leaderboard, rollups, tasks
+from .models import Post, PostReaction, Comment, CommentReaction, HashTag, ChallengeParticipation
+from .sustainability_features import ImpactTracker, SustainabilityBadge
+from .timeline import backfill_follow, remove_follow, sync_pinned
+
+
+@receiver(post_save, sender=Post)
+def push_post_to_timelines(sender, instance, created, **kwargs):
+    """Fan new posts out to follower timelines in the background"""
+    if created:
+        enqueue(tasks.fan_out_post, instance.pk, idempotency_key=f'fan_out_post:{instance.pk}')
+    else:
+        sync_pinned(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline_on_follow(sender, instance, created, **kwargs):
+    if created:
+        backfill_follow(instance.follower_id, instance.following_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline_on_unfollow(sender, instance, **kwargs):
+    remove_follow(instance.follower_id, instance.following_id)
+
+
+# Denormalized counters
+
+REACTION_TARGETS = {PostReaction: (Post, 'post_id'), CommentReaction: (Comment, 'comment_id')}
+
+
+def remember_reaction_type(sender, instance, **kwargs):
+    instance._saved_reaction_type = instance.reaction_type
+
+
+def count_reaction_save(sender, instance, created, **kwargs):
+    model, fk = REACTION_TARGETS[sender]
+    if created:
+        counters.reaction_added(model, getattr(instance, fk), instance.reaction_type)
+    else:
+        counters.reaction_changed(model, getattr(instance, fk), instance._saved_reaction_type, instance.reaction_type)
+    instance._saved_reaction_type = instance.reaction_type
+
+
+def count_reaction_delete(sender, instance, **kwargs):
+    model, fk = REACTION_TARGETS[sender]
+    counters.reaction_removed(model, getattr(instance, fk), instance._saved_reaction_type)
+
+
+for reaction_model in REACTION_TARGETS:
+    post_init.connect(remember_reaction_type, sender=reaction_model)
+    post_save.connect(count_reaction_save, sender=reaction_model)
+    post_delete.connect(count_reaction_delete, sender=reaction_model)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment_save(sender, instance, created, **kwargs):
+    if created:
+        counters.comment_added(instance.post_id)
+        counters.user_stat_changed(instance.author_id, 'comment_count', 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_comment_delete(sender, instance, **kwargs):
+    counters.comment_removed(instance.post_id)
+    counters.user_stat_changed(instance.author_id, 'comment_count', -1)
+
+
+@receiver(post_save, sender=Post)
+def count_post_save(sender, instance, created, **kwargs):
+    if created:
+        counters.user_stat_changed(instance.author_id, 'post_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_post_delete(sender, instance, **kwargs):
+    counters.user_stat_changed(instance.author_id, 'post_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow_save(sender, instance, created, **kwargs):
+    if created:
+        counters.user_stat_changed(instance.following_id, 'follower_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_follow_delete(sender, instance, **kwargs):
+    counters.user_stat_changed(instance.following_id, 'follower_count', -1)
+
+
+@receiver(m2m_changed, sender=HashTag.posts.through)
+def count_hashtag_posts(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep HashTag.post_count in step with tagging from either side of the relation"""
+    if action == 'pre_clear':
+        # pk_set is not provided for clears, so count the rows about to go
+        if reverse:
+            HashTag.objects.filter(posts=instance).update(post_count=F('post_count') - 1)
+        else:
+            HashTag.objects.filter(pk=instance.pk).update(post_count=0)
+        return
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+    delta = len(pk_set) if action == 'post_add' else -len(pk_set)
+    if reverse:
+        HashTag.objects.filter(pk__in=pk_set).update(post_count=F('post_count') + (1 if delta > 0 else -1))
+    else:
+        HashTag.objects.filter(pk=instance.pk).update(post_count=F('post_count') + delta)
+
+
+@receiver(pre_delete, sender=Post)
+def uncount_deleted_post_hashtags(sender, instance, **kwargs):
+    # Cascading deletes of the through rows do not send m2m_changed
+    HashTag.objects.filter(posts=instance).update(post_count=F('post_count') - 1)
+
+
+# Impact rollups and leaderboards
+
+def _impact_entry(instance):
+    return instance.user_id, instance.impact_type, instance.amount, instance.date_recorded, instance.unit
+
+
+@receiver(post_init, sender=ImpactTracker)
+def remember_impact(sender, instance, **kwargs):
+    instance._saved_impact = _impact_entry(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=ImpactTracker)
+def track_impact_save(sender, instance, created, **kwargs):
+    """
+    Move the daily rollup in this transaction and the running leaderboard
+    totals once it commits
+    """
+    previous, current = instance._saved_impact, _impact_entry(instance)
+    instance._saved_impact = current
+    if previous == current:
+        return
+    if previous is not None:
+        user_id, impact_type, amount, when, unit = previous
+        rollups.apply(user_id, impact_type, unit, when, -amount, -1)
+    user_id, impact_type, amount, when, unit = current
+    rollups.apply(user_id, impact_type, unit, when, amount, 1)
+    check_badges(user_id, 'impact_total', 'impact_actions', f'{badges.IMPACT_PREFIX}{impact_type}')
+
+    def rank():
+        if previous is not None:
+            leaderboard.record_impact(previous[0], previous[1], -previous[2], previous[3])
+        leaderboard.record_impact(*current[:4])
+    transaction.on_commit(rank)
+
+
+@receiver(post_delete, sender=ImpactTracker)
+def track_impact_delete(sender, instance, **kwargs):
+    user_id, impact_type, amount, when, unit = _impact_entry(instance)
+    rollups.apply(user_id, impact_type, unit, when, -amount, -1)
+    transaction.on_commit(lambda: leaderboard.record_impact(user_id, impact_type, -amount, when))
+
+
+# Badges
+
+def check_badges(user_id, *metrics):
+    """Re-evaluate the badges reading ``metrics`` for one user after commit"""
+    enqueue(tasks.evaluate_badges, [user_id], list(metrics))
+
+
+@receiver(post_save, sender=ChallengeParticipation)
+def badge_challenges(sender, instance, **kwargs):
+    check_badges(instance.user_id, 'challenges_joined', 'challenges_completed')
+
+
+@receiver(post_save, sender=Post)
+def badge_posts(sender, instance, created, **kwargs):
+    if created:
+        check_badges(instance.author_id, 'posts')
+
+
+@receiver(post_save, sender=Comment)
+def badge_comments(sender, instance, created, **kwargs):
+    if created:
+        check_badges(instance.author_id, 'comments')
+
+
+@receiver(post_save, sender=Follow)
+def badge_followers(sender, instance, created, **kwargs):
+    if created:
+        check_badges(instance.following_id, 'followers')
+
+
+@receiver(post_save, sender=SustainabilityBadge)
+def recompile_badge(sender, instance, **kwargs):
+    """Edited criteria take effect at once and are checked against everyone"""
+    transaction.on_commit(badges.invalidate)
+    enqueue(tasks.backfill_badges, [instance.pk])
+
+
+@receiver(post_delete, sender=SustainabilityBadge)
+def forget_badge(sender, instance, **kwargs):
+    transaction.on_commit(badges.invalidate)
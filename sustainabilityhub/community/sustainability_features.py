@@ -25,6 +25,28 @@ class ImpactTracker(models.Model):
     
     class Meta:
         ordering = ['-date_recorded']
+        indexes = [
+            models.Index(fields=['user', 'date_recorded'], name='community_impact_user_date'),
+        ]
+
+
+class ImpactDailyRollup(models.Model):
+    """One user's impact of one type and unit on one day, kept in step by community.signals"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='impact_rollups')
+    day = models.DateField()
+    impact_type = models.CharField(max_length=50)
+    unit = models.CharField(max_length=20)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    actions = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['user', 'day', 'impact_type', 'unit']
+        indexes = [
+            models.Index(fields=['day', 'impact_type'], name='community_rollup_day_type'),
+        ]
+    
+    def __str__(self):
+        return f'{self.user_id} {self.day} {self.impact_type}: {self.total} {self.unit}'
 
 
 class EcoTip(models.Model):
@@ -0,0 +1,42 @@
+from celery import shared_task
+from django.conf import settings
+from sustainabilityhub.dispatch import IdempotentTask
+from . import badges, challenges, counters, leaderboard, timeline
+
+
+@shared_task(base=IdempotentTask)
+def fan_out_post(post_id):
+    """Push a new post into its followers' timelines"""
+    return timeline.fan_out_post(post_id)
+
+
+@shared_task
+def trim_timelines():
+    """Periodic: cap every timeline at TIMELINE_MAX_ENTRIES"""
+    return timeline.trim_timelines()
+
+
+@shared_task
+def reconcile_counters():
+    """Periodic: repair drift in the denormalized engagement and challenge counters"""
+    repaired = counters.reconcile_counters()
+    repaired['challenges'] = challenges.reconcile_challenge_stats()
+    return repaired
+
+
+@shared_task
+def rebuild_leaderboards():
+    """Periodic: recompute the current impact leaderboards from the database"""
+    leaderboard.rebuild_leaderboards()
+
+
+@shared_task(base=IdempotentTask)
+def evaluate_badges(user_ids, metrics=None, badge_ids=None):
+    """Award the badges affected by changes to ``metrics`` of ``user_ids``"""
+    return len(badges.evaluate(user_ids, metrics, badge_ids))
+
+
+@shared_task
+def backfill_badges(badge_ids=None):
+    """Fan badge evaluation for the whole user base out into chunk tasks"""
+    return badges.backfill_badges(badge_ids, getattr(settings, 'BADGE_BACKFILL_CHUNK_SIZE', 500))
@@ -1,3 +1,495 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from profiles.models import Follow
+from projects.models import Project
+from . import badges, challenges, leaderboard, tasks, timeline
+from .counters import reconcile_counters, toggle_reaction
+from .models import (
+    Post, PostReaction, Comment, CommentReaction, HashTag, ChallengeParticipation, TimelineEntry, UserStats
+)
+from .rollups import daily_series, rebuild_rollups, user_totals
+from .sustainability_features import ImpactDailyRollup, ImpactTracker, SustainabilityBadge, UserBadge
 
-# Create your tests here.
+User = get_user_model()
+
+
+class PostSerializerQueryCountTests(TestCase):
+    """A page of posts must serialize in a constant number of queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = User.objects.create_user('viewer', 'viewer@example.com', 'pw')
+        authors = [User.objects.create_user(f'author{i}', f'author{i}@example.com', 'pw') for i in range(3)]
+        project = Project.objects.create(title='Solar roofs', description='d', creator=authors[0])
+        project_type = ContentType.objects.get_for_model(Project)
+        tag = HashTag.objects.create(name='solar')
+
+        for i in range(25):
+            post = Post.objects.create(
+                author=authors[i % 3], content=f'post {i}',
+                content_type=project_type if i % 2 == 0 else None,
+                object_id=project.pk if i % 2 == 0 else None,
+            )
+            post.hashtags.add(tag)
+            PostReaction.objects.create(post=post, user=cls.viewer, reaction_type='like')
+            PostReaction.objects.create(post=post, user=authors[0], reaction_type='love')
+            comment = Comment.objects.create(post=post, author=authors[1], content='top')
+            reply = Comment.objects.create(post=post, author=authors[2], content='reply', parent=comment)
+            Comment.objects.create(post=post, author=authors[0], content='nested', parent=reply)
+            CommentReaction.objects.create(comment=comment, user=cls.viewer)
+
+    def count_queries(self, page_size):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'/community/api/posts/discover/?page_size={page_size}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), page_size)
+        return len(ctx.captured_queries)
+
+    def test_query_count_independent_of_page_size(self):
+        self.client.force_login(self.viewer)
+        self.count_queries(1)  # Warm per-process caches such as ContentType
+        self.assertEqual(self.count_queries(5), self.count_queries(20))
+
+    def test_batched_fields_match_per_row_values(self):
+        self.client.force_login(self.viewer)
+        post = self.client.get('/community/api/posts/discover/?page_size=1').json()['results'][0]
+        self.assertEqual(post['total_reactions'], 2)
+        self.assertEqual(post['total_comments'], 3)
+        self.assertEqual(post['user_reaction'], 'like')
+        self.assertEqual(post['hashtags'][0]['post_count'], 25)
+        self.assertEqual(post['content_object_data']['title'], 'Solar roofs')
+
+        top = next(comment for comment in post['comments'] if comment['parent'] is None)
+        self.assertEqual(top['user_reaction'], 'like')
+        self.assertEqual(top['total_reactions'], 1)
+        self.assertEqual(top['replies'][0]['replies'][0]['content'], 'nested')
+
+
+class EngagementCounterTests(TestCase):
+    """Stored counters follow reaction, comment and hashtag writes"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('reactor', 'reactor@example.com', 'pw')
+        self.post = Post.objects.create(author=self.user, content='counted')
+
+    def test_toggle_reaction_updates_counters(self):
+        self.assertEqual(toggle_reaction(PostReaction, 'post', self.post, self.user, 'like')[0], 'added')
+        self.assertEqual((self.post.reaction_count, self.post.like_count), (1, 1))
+
+        self.assertEqual(toggle_reaction(PostReaction, 'post', self.post, self.user, 'love')[0], 'updated')
+        self.assertEqual((self.post.reaction_count, self.post.like_count, self.post.love_count), (1, 0, 1))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.post.total_reactions, 1)
+
+        self.assertEqual(toggle_reaction(PostReaction, 'post', self.post, self.user, 'love')[0], 'removed')
+        self.assertEqual((self.post.reaction_count, self.post.love_count), (0, 0))
+
+    def test_unknown_reaction_type_is_rejected(self):
+        comment = Comment.objects.create(post=self.post, author=self.user, content='first')
+        self.client.force_login(self.user)
+        for url, reaction_type in (
+            (f'/community/post/{self.post.pk}/react/', 'bogus'),
+            (f'/community/api/posts/{self.post.pk}/react/', 'laugh'),
+            (f'/community/api/comments/{comment.pk}/react/', 'inspire'),
+        ):
+            self.assertEqual(self.client.post(url, {'reaction_type': reaction_type}).status_code, 400)
+        self.assertFalse(PostReaction.objects.exists())
+        self.assertFalse(CommentReaction.objects.exists())
+
+    def test_comment_and_hashtag_counters(self):
+        comment = Comment.objects.create(post=self.post, author=self.user, content='first')
+        Comment.objects.create(post=self.post, author=self.user, content='reply', parent=comment)
+        CommentReaction.objects.create(comment=comment, user=self.user, reaction_type='laugh')
+        tag = HashTag.objects.create(name='compost')
+        self.post.hashtags.add(tag)
+
+        self.post.refresh_from_db()
+        comment.refresh_from_db()
+        tag.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 2)
+        self.assertEqual((comment.reaction_count, comment.laugh_count), (1, 1))
+        self.assertEqual(tag.post_count, 1)
+
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+        self.post.delete()
+        tag.refresh_from_db()
+        self.assertEqual(tag.post_count, 0)
+
+    def test_reconcile_repairs_drift(self):
+        PostReaction.objects.create(post=self.post, user=self.user, reaction_type='inspire')
+        Post.objects.filter(pk=self.post.pk).update(reaction_count=7, inspire_count=0)
+
+        self.assertEqual(reconcile_counters()['posts'], 1)
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.reaction_count, self.post.inspire_count), (1, 1))
+        self.assertEqual(reconcile_counters()['posts'], 0)
+
+        UserStats.objects.all().delete()
+        self.assertEqual(reconcile_counters()['users'], 1)
+        self.assertEqual(UserStats.objects.get(user=self.user).post_count, 1)
+
+    def test_user_stats_follow_posts_comments_and_followers(self):
+        fan = User.objects.create_user('fan', 'fan@example.com', 'pw')
+        comment = Comment.objects.create(post=self.post, author=fan, content='nice')
+        follow = Follow.objects.create(follower=fan, following=self.user)
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual((stats.post_count, stats.comment_count, stats.follower_count), (1, 0, 1))
+        self.assertEqual(UserStats.objects.get(user=fan).comment_count, 1)
+
+        comment.delete()
+        follow.delete()
+        self.post.delete()
+        stats.refresh_from_db()
+        self.assertEqual((stats.post_count, stats.comment_count, stats.follower_count), (0, 0, 0))
+        self.assertEqual(UserStats.objects.get(user=fan).comment_count, 0)
+
+        # Deleting a user cascades through their posts without recreating their row
+        Post.objects.create(author=fan, content='bye')
+        fan.delete()
+        self.assertFalse(UserStats.objects.filter(user_id=fan.pk).exists())
+
+
+@override_settings(COMMENT_TREE_MAX_DEPTH=3, COMMENT_TREE_MAX_CHILDREN=2)
+class CommentTreeTests(TestCase):
+    """Comment threads load in constant queries and continue through cursors"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('threader', 'threader@example.com', 'pw')
+        cls.post = Post.objects.create(author=cls.user, content='thread')
+        parent = None
+        for depth in range(30):
+            parent = Comment.objects.create(post=cls.post, author=cls.user, content=f'depth {depth}', parent=parent)
+        cls.roots = [Comment.objects.get(post=cls.post, parent=None)] + [
+            Comment.objects.create(post=cls.post, author=cls.user, content=f'root {i}') for i in range(3)
+        ]
+
+    def test_deep_thread_renders_in_constant_queries(self):
+        with self.assertNumQueries(5):
+            post = self.client.get(f'/community/api/posts/{self.post.pk}/').json()
+
+        self.assertEqual(post['more_comments'], 2)
+        node = post['comments'][0]
+        for depth in range(3):
+            self.assertEqual(node['content'], f'depth {depth}')
+            node = node['replies'][0]
+        self.assertEqual(node['replies'], [])
+        self.assertEqual(node['more_replies'], 1)
+
+        deeper = self.client.get('/community/api/comments/more/', {'cursor': node['replies_cursor']}).json()
+        self.assertEqual(deeper['results'][0]['content'], 'depth 4')
+
+    def test_load_more_top_level_comments(self):
+        post = self.client.get(f'/community/api/posts/{self.post.pk}/').json()
+        page = self.client.get('/community/api/comments/more/', {'cursor': post['comments_cursor']}).json()
+        self.assertEqual([c['content'] for c in page['results']], ['root 1', 'root 2'])
+        self.assertIsNone(page['next_cursor'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/community/api/comments/more/', {'cursor': 'nonsense'})
+        self.assertEqual(response.status_code, 404)
+
+
+class ImpactLeaderboardTests(TestCase):
+    """Leaderboards follow impact records without aggregating the impact table"""
+
+    def setUp(self):
+        leaderboard.get_store().clear()
+        self.users = [User.objects.create_user(f'saver{i}', f'saver{i}@example.com', 'pw') for i in range(3)]
+
+    def log(self, user, amount, impact_type='carbon_saved'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return ImpactTracker.objects.create(user=user, impact_type=impact_type, amount=amount)
+
+    def standings(self, impact_type=leaderboard.ALL, window='all'):
+        return [(entry['user'].username, entry['total']) for entry in leaderboard.top(impact_type, window)]
+
+    def test_inserts_update_every_window_and_type(self):
+        self.log(self.users[0], 5)
+        self.assertEqual(self.standings(), [('saver0', 5.0)])
+        self.log(self.users[1], 3, 'water_saved')
+        self.log(self.users[1], 4)
+        for window in leaderboard.WINDOWS:
+            self.assertEqual(self.standings(window=window), [('saver1', 7.0), ('saver0', 5.0)])
+        self.assertEqual(self.standings('carbon_saved'), [('saver0', 5.0), ('saver1', 4.0)])
+        self.assertEqual(leaderboard.rank_of(self.users[0].pk), (2, 5.0))
+        self.assertEqual(leaderboard.rank_of(self.users[2].pk), (None, None))
+
+    def test_warm_rank_lookups_skip_the_impact_table(self):
+        self.log(self.users[0], 5)
+        leaderboard.rank_of(self.users[0].pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(leaderboard.rank_of(self.users[0].pk), (1, 5.0))
+
+    def test_edits_and_deletes_move_totals(self):
+        record = self.log(self.users[0], 5)
+        self.log(self.users[1], 4)
+        leaderboard.top()
+        with self.captureOnCommitCallbacks(execute=True):
+            record.amount = 1
+            record.save()
+        self.assertEqual(self.standings(), [('saver1', 4.0), ('saver0', 1.0)])
+        with self.captureOnCommitCallbacks(execute=True):
+            record.delete()
+        self.assertEqual(self.standings(), [('saver1', 4.0), ('saver0', 0.0)])
+
+    def test_weekly_board_excludes_older_impact(self):
+        old = self.log(self.users[0], 9)
+        ImpactTracker.objects.filter(pk=old.pk).update(date_recorded=timezone.now() - timezone.timedelta(days=40))
+        rebuild_rollups()
+        self.log(self.users[1], 2)
+        self.assertEqual(self.standings(window='week'), [('saver1', 2.0)])
+        self.assertEqual(self.standings(), [('saver0', 9.0), ('saver1', 2.0)])
+
+    def test_api_reports_my_rank(self):
+        self.log(self.users[0], 5)
+        self.client.force_login(self.users[0])
+        data = self.client.get('/community/api/leaderboard/', {'window': 'month'}).json()
+        self.assertEqual(data['me'], {'rank': 1, 'total': 5.0})
+        self.assertEqual(data['leaders'][0]['username'], 'saver0')
+        self.assertEqual(self.client.get('/community/api/leaderboard/', {'type': 'bogus'}).status_code, 404)
+        self.assertEqual(self.client.get('/community/').context['my_rank'], 1)
+
+
+class ImpactRollupTests(TestCase):
+    """Daily rollups follow impact records in the same transaction"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('logger', 'logger@example.com', 'pw')
+
+    def log(self, amount, impact_type='carbon_saved', unit='kg'):
+        return ImpactTracker.objects.create(user=self.user, impact_type=impact_type, amount=amount, unit=unit)
+
+    def test_records_fold_into_one_row_per_day_type_and_unit(self):
+        for amount in (1, 2, 3):
+            self.log(amount)
+        self.log(5, 'water_saved', 'l')
+        self.assertEqual(ImpactDailyRollup.objects.count(), 2)
+        with self.assertNumQueries(1):
+            self.assertEqual(user_totals(self.user.pk), {'total_carbon': 11, 'total_actions': 4})
+
+    def test_edits_and_deletes_are_retracted(self):
+        record = self.log(4)
+        record.amount = 6
+        record.save()
+        self.log(1).delete()
+        row = ImpactDailyRollup.objects.get()
+        self.assertEqual((row.total, row.actions), (6, 1))
+
+    def test_series_and_rebuild(self):
+        old = self.log(2)
+        ImpactTracker.objects.filter(pk=old.pk).update(date_recorded=timezone.now() - timezone.timedelta(days=3))
+        self.log(5)
+        self.assertEqual(rebuild_rollups(), 2)
+        series = daily_series(self.user.pk, days=7)
+        self.assertEqual(len(series), 7)
+        self.assertEqual([float(total) for _, total, _ in series], [0, 0, 0, 2, 0, 0, 5])
+
+        self.client.force_login(self.user)
+        data = self.client.get('/community/api/impact/series/', {'days': 2}).json()
+        self.assertEqual([day['total'] for day in data['days']], [0.0, 5.0])
+
+
+class BadgeEngineTests(TestCase):
+    """Badges are awarded from compiled criteria as metrics change"""
+
+    def setUp(self):
+        cache.clear()
+        badges._compiled['version'] = None
+        self.user = User.objects.create_user('earner', 'earner@example.com', 'pw')
+
+    def tearDown(self):
+        # The badges are rolled back without post_delete, so drop their compilation too
+        cache.clear()
+        badges._compiled['version'] = None
+
+    def badge(self, name, criteria):
+        with self.captureOnCommitCallbacks(execute=True):
+            return SustainabilityBadge.objects.create(name=name, description='d', criteria=criteria)
+
+    def test_malformed_criteria_are_rejected(self):
+        for criteria in ({}, [], {'karma': 1}, {'impact:': 1}, {'posts': 'ten'}, {'posts': True}):
+            with self.assertRaises(badges.BadgeCriteriaError):
+                badges.compile_criteria(criteria)
+        self.assertEqual(badges.compile_criteria({'posts': 2, 'impact:water_saved': 5}),
+                         [('impact:water_saved', 5), ('posts', 2)])
+
+    def test_awards_follow_the_metrics_they_read(self):
+        writer = self.badge('Writer', {'posts': 2})
+        saver = self.badge('Saver', {'impact:carbon_saved': 10, 'impact_actions': 2})
+        for i in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                Post.objects.create(author=self.user, content=f'post {i}')
+        self.assertEqual(list(UserBadge.objects.values_list('badge_id', flat=True)), [writer.pk])
+
+        # Only badges reading a changed metric are evaluated
+        self.assertEqual(badges.evaluate([self.user.pk], ['comments']), [])
+        for amount in (4, 6):
+            with self.captureOnCommitCallbacks(execute=True):
+                ImpactTracker.objects.create(user=self.user, impact_type='carbon_saved', amount=amount, unit='kg')
+        self.assertTrue(UserBadge.objects.filter(user=self.user, badge=saver).exists())
+        self.assertEqual(self.user.notifications.filter(title='Badge earned').count(), 2)
+
+    def test_follower_badges_read_the_profile_follow_graph(self):
+        badge = self.badge('Popular', {'followers': 2})
+        fans = [User.objects.create_user(f'fan{i}', f'fan{i}@example.com', 'pw') for i in range(2)]
+        for fan in fans:
+            with self.captureOnCommitCallbacks(execute=True):
+                Follow.objects.create(follower=fan, following=self.user)
+        self.assertTrue(UserBadge.objects.filter(user=self.user, badge=badge).exists())
+        with self.assertNumQueries(1):
+            self.assertEqual(badges.metric_function('followers')([self.user.pk]), {self.user.pk: 2})
+
+    def test_badges_are_awarded_once(self):
+        self.badge('Writer', {'posts': 1})
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(author=self.user, content='first')
+            Post.objects.create(author=self.user, content='second')
+        self.assertEqual(badges.evaluate([self.user.pk]), [])
+        self.assertEqual(UserBadge.objects.count(), 1)
+
+    def test_new_badges_are_backfilled(self):
+        others = [User.objects.create_user(f'poster{i}', f'poster{i}@example.com', 'pw') for i in range(3)]
+        for user in others[:2]:
+            Post.objects.create(author=user, content='hello')
+        self.assertEqual(badges.backfill_badges(chunk_size=2), 2)
+        badge = self.badge('Voice', {'posts': 1})
+        self.assertEqual(
+            set(UserBadge.objects.filter(badge=badge).values_list('user_id', flat=True)),
+            {others[0].pk, others[1].pk},
+        )
+
+
+class ChallengeParticipationTests(TestCase):
+    """Challenge counters move with relative updates alongside participation rows"""
+
+    def setUp(self):
+        self.author = User.objects.create_user('host', 'host@example.com', 'pw')
+        self.users = [User.objects.create_user(f'joiner{i}', f'joiner{i}@example.com', 'pw') for i in range(3)]
+        self.post = Post.objects.create(author=self.author, content='Bike week', post_type='challenge',
+                                        challenge_duration=7)
+
+    def test_joins_count_once(self):
+        self.assertTrue(challenges.join(self.post, self.users[0]))
+        self.assertFalse(challenges.join(self.post, self.users[0]))
+        # A stale copy of the post still adds to the stored count instead of overwriting it
+        stale = Post.objects.get(pk=self.post.pk)
+        challenges.join(self.post, self.users[1])
+        self.assertTrue(challenges.join(stale, self.users[2]))
+        self.assertEqual(stale.participants_count, 3)
+        self.assertEqual(ChallengeParticipation.objects.count(), 3)
+
+    def test_completion_stats(self):
+        for user in self.users[:2]:
+            challenges.join(self.post, user)
+        self.assertTrue(challenges.complete(self.post, self.users[0], '4.5'))
+        self.assertTrue(challenges.complete(self.post, self.users[1], 2))
+        self.assertFalse(challenges.complete(self.post, self.users[1], 3))
+        self.assertEqual((self.post.completed_count, float(self.post.total_impact_achieved)), (2, 7.5))
+        with self.assertRaises(ChallengeParticipation.DoesNotExist):
+            challenges.complete(self.post, self.users[2], 1)
+        with self.assertRaises(ValueError):
+            challenges.complete(self.post, self.users[0], '-1')
+
+    def test_api_and_reconcile(self):
+        self.client.force_login(self.users[0])
+        url = f'/community/api/posts/{self.post.pk}/'
+        self.assertEqual(self.client.post(url + 'join_challenge/').json()['participants'], 1)
+        response = self.client.post(url + 'complete_challenge/', {'impact_achieved': 'lots'})
+        self.assertEqual(response.status_code, 400)
+        data = self.client.post(url + 'complete_challenge/', {'impact_achieved': '12'}).json()
+        self.assertEqual((data['completed'], data['total_impact_achieved']), (1, 12.0))
+
+        Post.objects.filter(pk=self.post.pk).update(participants_count=9, completed_count=0, total_impact_achieved=0)
+        # The periodic reconcile task repairs challenge counters too
+        self.assertEqual(tasks.reconcile_counters()['challenges'], 1)
+        self.post.refresh_from_db()
+        self.assertEqual(
+            (self.post.participants_count, self.post.completed_count, float(self.post.total_impact_achieved)),
+            (1, 1, 12.0),
+        )
+
+
+class TimelineFeedTests(TestCase):
+    """The feed pages through the reader's timeline with the list filters applied"""
+
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user('reader', 'reader@example.com', 'pw')
+        self.author = User.objects.create_user('writer', 'writer@example.com', 'pw')
+        Follow.objects.create(follower=self.reader, following=self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts = [
+                Post.objects.create(author=self.author, content=f'post {i}', post_type='tip' if i % 3 == 0 else 'text')
+                for i in range(9)
+            ]
+        self.client.force_login(self.reader)
+
+    def feed(self, query):
+        ids, url = [], f'/community/api/posts/feed/?{query}'
+        while url:
+            page = self.client.get(url).json()
+            ids.append([post['id'] for post in page['results']])
+            url = page['next']
+        return ids
+
+    def test_filters_fill_every_page(self):
+        tips = [post.pk for post in reversed(self.posts) if post.post_type == 'tip']
+        self.assertEqual(self.feed('type=tip&page_size=2'), [tips[:2], tips[2:]])
+        self.assertEqual(self.feed('author=nobody'), [[]])
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=0)
+    def test_merged_authors_are_filtered_too(self):
+        TimelineEntry.objects.all().delete()
+        cache.delete(timeline.CELEBRITY_CACHE_KEY)
+        tips = [post.pk for post in reversed(self.posts) if post.post_type == 'tip']
+        self.assertEqual(self.feed('type=tip&page_size=2'), [tips[:2], tips[2:]])
+
+    def test_backfill_builds_existing_timelines(self):
+        TimelineEntry.objects.all().delete()
+        self.assertEqual(timeline.backfill_timelines(), 2)
+        newest = [post.pk for post in reversed(self.posts)]
+        self.assertEqual(sum(self.feed('page_size=5'), []), newest)
+
+
+class PostCursorPaginationTests(TestCase):
+    """Discover pages are anchored on (is_pinned, created_at, id) and stay stable while posts arrive"""
+
+    def setUp(self):
+        self.author = User.objects.create_user('poster', 'poster@example.com', 'pw')
+        now = timezone.now()
+        self.posts = []
+        for i, (pinned, minutes_ago) in enumerate([(True, 50), (True, 40), (False, 30), (False, 20), (False, 20)]):
+            post = Post.objects.create(author=self.author, content=f'post {i}', is_pinned=pinned)
+            Post.objects.filter(pk=post.pk).update(created_at=now - timezone.timedelta(minutes=minutes_ago))
+            self.posts.append(post)
+
+    def page(self, url):
+        data = self.client.get(url).json()
+        return [post['id'] for post in data['results']], data['next']
+
+    def test_pages_cross_the_pinned_boundary_without_gaps(self):
+        pinned_1, pinned_2, oldest, tied_low, tied_high = [post.pk for post in self.posts]
+        first, next_url = self.page('/community/api/posts/discover/?page_size=2')
+        self.assertEqual(first, [pinned_2, pinned_1])
+
+        # A new pin sorts before the cursor and is not repeated; a new unpinned post is still ahead
+        Post.objects.create(author=self.author, content='fresh pin', is_pinned=True)
+        fresh = Post.objects.create(author=self.author, content='fresh').pk
+        second, next_url = self.page(next_url)
+        self.assertEqual(second, [fresh, tied_high])
+        third, next_url = self.page(next_url)
+        self.assertEqual((third, next_url), ([tied_low, oldest], None))
+
+    def test_tampered_cursor_is_not_found(self):
+        response = self.client.get('/community/api/posts/discover/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
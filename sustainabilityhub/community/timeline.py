@@ -0,0 +1,182 @@
+"""
+Fan-out-on-write home timelines for the community feed.
+
+When a post is created its id is pushed into the TimelineEntry rows of the
+author and every follower, so reading a feed is a range read over one user's
+entries followed by a bulk fetch of the posts by primary key. Authors with
+more than FEED_FANOUT_MAX_FOLLOWERS followers are not fanned out; their posts
+are merged in at read time instead. Timelines keep the newest
+TIMELINE_MAX_ENTRIES rows per user (see ``trim_timelines``).
+"""
+import heapq
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from profiles.models import Follow
+from .models import Post, TimelineEntry
+
+CELEBRITY_CACHE_KEY = 'community:timeline:celebrities'
+ORDERING = ('-is_pinned', '-created_at', '-id')
+
+
+def _fanout_limit():
+    return getattr(settings, 'FEED_FANOUT_MAX_FOLLOWERS', 5000)
+
+
+def _batch_size():
+    return getattr(settings, 'FEED_FANOUT_BATCH_SIZE', 1000)
+
+
+def _celebrities():
+    return set(
+        Follow.objects.values('following').annotate(
+            follower_count=Count('id')
+        ).filter(follower_count__gt=_fanout_limit()).values_list('following', flat=True)
+    )
+
+
+def celebrity_ids():
+    """Users whose posts are merged at read time instead of fanned out"""
+    return cache.get_or_set(CELEBRITY_CACHE_KEY, _celebrities, 600)
+
+
+def _push(post, user_ids):
+    entries = [
+        TimelineEntry(user_id=user_id, post_id=post.id, is_pinned=post.is_pinned, created_at=post.created_at)
+        for user_id in user_ids
+    ]
+    TimelineEntry.objects.bulk_create(entries, batch_size=_batch_size(), ignore_conflicts=True)
+
+
+def fan_out_post(post_id):
+    """Push a new post into the timelines of its author and their followers"""
+    post = Post.objects.filter(pk=post_id).only('id', 'author_id', 'is_pinned', 'created_at').first()
+    if post is None:
+        return 0
+
+    recipients = [post.author_id]
+    followers = Follow.objects.filter(following_id=post.author_id).values_list('follower_id', flat=True)
+    if post.author_id not in celebrity_ids():
+        recipients.extend(followers.iterator())
+    _push(post, recipients)
+    return len(recipients)
+
+
+def backfill_follow(follower_id, following_id, limit=None):
+    """Copy the recent posts of a newly followed user into the follower's timeline"""
+    if following_id in celebrity_ids():
+        return
+    limit = limit or getattr(settings, 'TIMELINE_FOLLOW_BACKFILL', 50)
+    posts = Post.objects.filter(author_id=following_id).order_by(*ORDERING).only(
+        'id', 'is_pinned', 'created_at'
+    )[:limit]
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=follower_id, post_id=post.id, is_pinned=post.is_pinned, created_at=post.created_at)
+            for post in posts
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def remove_follow(follower_id, following_id):
+    TimelineEntry.objects.filter(user_id=follower_id, post__author_id=following_id).delete()
+
+
+def sync_pinned(post):
+    TimelineEntry.objects.filter(post=post).exclude(is_pinned=post.is_pinned).update(is_pinned=post.is_pinned)
+
+
+def read_timeline(user, position=None, limit=20, posts=None):
+    """
+    Return up to ``limit`` (is_pinned, created_at, post_id) positions for a
+    user's feed in feed order, starting after ``position`` if given. Only
+    posts in the ``posts`` queryset are returned, so its filters never
+    leave a page short.
+    """
+    from .pagination import PostCursorPagination
+    after = PostCursorPagination.after
+
+    entries = TimelineEntry.objects.filter(user=user)
+    if posts is not None:
+        entries = entries.filter(post__in=posts.order_by().values('id'))
+    if position is not None:
+        entries = entries.filter(after(*position, id_field='post_id'))
+    streams = [
+        entries.order_by('-is_pinned', '-created_at', '-post_id').values_list(
+            'is_pinned', 'created_at', 'post_id'
+        )[:limit]
+    ]
+
+    celebrities = celebrity_ids()
+    if celebrities:
+        followed = list(
+            user.following.filter(following_id__in=celebrities).values_list('following_id', flat=True)
+        )
+        if followed:
+            merged = (Post.objects.all() if posts is None else posts).filter(author_id__in=followed)
+            if position is not None:
+                merged = merged.filter(after(*position))
+            streams.append(merged.order_by(*ORDERING).values_list('is_pinned', 'created_at', 'id').distinct()[:limit])
+
+    positions = []
+    seen = set()
+    merged = heapq.merge(*[list(stream) for stream in streams], reverse=True)
+    for position in merged:
+        if position[2] in seen:
+            continue
+        seen.add(position[2])
+        positions.append(position)
+        if len(positions) == limit:
+            break
+    return positions
+
+
+def rebuild_timeline(user_id, celebrities=None):
+    """Recreate one user's timeline from the people they follow"""
+    limit = getattr(settings, 'TIMELINE_MAX_ENTRIES', 800)
+    if celebrities is None:
+        celebrities = celebrity_ids()
+    authors = [user_id]
+    authors.extend(
+        following_id
+        for following_id in Follow.objects.filter(follower_id=user_id).values_list('following_id', flat=True)
+        if following_id not in celebrities
+    )
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    posts = Post.objects.filter(author_id__in=authors).order_by(*ORDERING).only(
+        'id', 'is_pinned', 'created_at'
+    )[:limit]
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post_id=post.id, is_pinned=post.is_pinned, created_at=post.created_at)
+            for post in posts
+        ],
+        batch_size=_batch_size(),
+    )
+
+
+def backfill_timelines():
+    """Build the timeline of every user who posts or follows someone; returns the number built"""
+    celebrities = _celebrities()
+    user_ids = set(Follow.objects.values_list('follower_id', flat=True))
+    user_ids.update(Post.objects.values_list('author_id', flat=True))
+    for user_id in sorted(user_ids):
+        rebuild_timeline(user_id, celebrities)
+    return len(user_ids)
+
+
+def trim_timelines():
+    """Drop entries beyond TIMELINE_MAX_ENTRIES for every user; returns rows deleted"""
+    limit = getattr(settings, 'TIMELINE_MAX_ENTRIES', 800)
+    deleted = 0
+    oversized = TimelineEntry.objects.values('user').annotate(
+        entry_count=Count('id')
+    ).filter(entry_count__gt=limit).values_list('user', flat=True)
+    for user_id in oversized:
+        entries = TimelineEntry.objects.filter(user_id=user_id).order_by('-is_pinned', '-created_at', '-post_id')
+        cutoff = entries.values_list('id', flat=True)[limit:]
+        deleted += TimelineEntry.objects.filter(id__in=list(cutoff)).delete()[0]
+    return deleted
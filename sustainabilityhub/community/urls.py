@@ -22,5 +22,7 @@ urlpatterns = [
     path('user/<int:user_id>/follow/', views.toggle_follow, name='toggle_follow'),
     
     # API endpoints
+    path('api/leaderboard/', views.impact_leaderboard, name='impact_leaderboard'),
+    path('api/impact/series/', views.impact_series, name='impact_series'),
     path('api/', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,16 +1,21 @@
+from decimal import InvalidOperation
+
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.core.paginator import Paginator
-from django.db.models import Q, Count, Prefetch, Sum
-from django.db import models
 from rest_framework import viewsets, status, permissions
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from django.contrib.auth import get_user_model
+from sustainabilityhub.comment_tree import InvalidCursor, load_more_replies
 from .models import Post, PostReaction, Comment, CommentReaction, Follow, HashTag, ChallengeParticipation
-from .sustainability_features import ImpactTracker
+from . import challenges, leaderboard, rollups
+from .counters import toggle_reaction
+from .pagination import PostCursorPagination, TimelineCursorPagination
 from .serializers import (
     PostSerializer, PostCreateSerializer, CommentSerializer,
     PostReactionSerializer, CommentReactionSerializer, FollowSerializer,
@@ -24,8 +29,6 @@ User = get_user_model()
 @login_required
 def community_dashboard(request):
     """Main community dashboard - challenges and fitness focused"""
-    from .sustainability_features import ImpactTracker
-    
     if request.method == 'POST':
         # Handle challenge creation
         content = request.POST.get('content')
@@ -68,21 +71,18 @@ def community_dashboard(request):
     ).select_related('challenge_post').order_by('-joined_at')[:5]
     
     # Get user's impact stats
-    user_impact = ImpactTracker.objects.filter(user=request.user).aggregate(
-        total_carbon=models.Sum('amount'),
-        total_actions=models.Count('id')
-    )
+    user_impact = rollups.user_totals(request.user.pk)
     
     # Get leaderboard
-    leaderboard = ImpactTracker.objects.values('user__username').annotate(
-        total_impact=models.Sum('amount')
-    ).order_by('-total_impact')[:10]
+    leaders = leaderboard.top(limit=getattr(settings, 'LEADERBOARD_SIZE', 10))
+    my_rank, _ = leaderboard.rank_of(request.user.pk)
     
     context = {
         'active_challenges': active_challenges,
         'user_challenges': user_challenges,
         'user_impact': user_impact,
-        'leaderboard': leaderboard,
+        'leaderboard': leaders,
+        'my_rank': my_rank,
     }
     return render(request, 'community/dashboard.html', context)
 
@@ -116,14 +116,7 @@ def join_challenge(request, post_id):
     
     post = get_object_or_404(Post, id=post_id, post_type='challenge')
     
-    participation, created = ChallengeParticipation.objects.get_or_create(
-        user=request.user,
-        challenge_post=post
-    )
-    
-    if created:
-        post.participants_count += 1
-        post.save()
+    if challenges.join(post, request.user):
         return JsonResponse({
             'action': 'joined',
             'message': 'Successfully joined challenge!',
@@ -194,22 +187,15 @@ def toggle_post_reaction(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     reaction_type = request.POST.get('reaction_type', 'like')
     
-    reaction, created = PostReaction.objects.get_or_create(
-        post=post,
-        user=request.user,
-        defaults={'reaction_type': reaction_type}
-    )
-    
-    if not created:
-        if reaction.reaction_type == reaction_type:
-            reaction.delete()
-            return JsonResponse({'action': 'removed', 'total': post.total_reactions})
-        else:
-            reaction.reaction_type = reaction_type
-            reaction.save()
+    try:
+        action, reaction = toggle_reaction(PostReaction, 'post', post, request.user, reaction_type)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    if action == 'removed':
+        return JsonResponse({'action': 'removed', 'total': post.total_reactions})
     
     return JsonResponse({
-        'action': 'added' if created else 'updated',
+        'action': action,
         'reaction_type': reaction_type,
         'total': post.total_reactions
     })
@@ -239,9 +225,7 @@ def toggle_follow(request, user_id):
 # DRF API ViewSets
 class PostViewSet(viewsets.ModelViewSet):
     """API ViewSet for posts"""
-    queryset = Post.objects.all().select_related('author').prefetch_related(
-        'reactions__user', 'comments__author', 'hashtags'
-    ).order_by('-is_pinned', '-created_at')
+    queryset = PostSerializer.setup_eager_loading(Post.objects.all()).order_by('-is_pinned', '-created_at')
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     
     def get_serializer_class(self):
@@ -278,43 +262,29 @@ class PostViewSet(viewsets.ModelViewSet):
         post = self.get_object()
         reaction_type = request.data.get('reaction_type', 'like')
         
-        reaction, created = PostReaction.objects.get_or_create(
-            post=post,
-            user=request.user,
-            defaults={'reaction_type': reaction_type}
-        )
-        
-        if not created:
-            if reaction.reaction_type == reaction_type:
-                reaction.delete()
-                return Response({'action': 'removed'})
-            else:
-                reaction.reaction_type = reaction_type
-                reaction.save()
+        try:
+            action, reaction = toggle_reaction(PostReaction, 'post', post, request.user, reaction_type)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if action == 'removed':
+            return Response({'action': 'removed', 'total': post.total_reactions})
         
         serializer = PostReactionSerializer(reaction, context={'request': request})
         return Response({
-            'action': 'added' if created else 'updated',
-            'reaction': serializer.data
+            'action': action,
+            'reaction': serializer.data,
+            'total': post.total_reactions
         })
     
-    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated],
+            pagination_class=TimelineCursorPagination)
     def feed(self, request):
-        """Get personalized feed for authenticated user"""
-        following_users = request.user.following.values_list('following', flat=True)
-        queryset = self.get_queryset().filter(
-            Q(author__in=following_users) | Q(author=request.user)
-        )
-        
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        """Get personalized feed for authenticated user from their materialized timeline"""
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], pagination_class=PostCursorPagination)
     def discover(self, request):
         """Get posts for discovery (from non-followed users)"""
         if request.user.is_authenticated:
@@ -340,14 +310,7 @@ class PostViewSet(viewsets.ModelViewSet):
         if post.post_type != 'challenge':
             return Response({'error': 'This is not a challenge post'}, status=status.HTTP_400_BAD_REQUEST)
         
-        participation, created = ChallengeParticipation.objects.get_or_create(
-            user=request.user,
-            challenge_post=post
-        )
-        
-        if created:
-            post.participants_count += 1
-            post.save()
+        if challenges.join(post, request.user):
             return Response({'message': 'Successfully joined challenge!', 'participants': post.participants_count})
         else:
             return Response({'message': 'Already participating in this challenge', 'participants': post.participants_count})
@@ -358,18 +321,17 @@ class PostViewSet(viewsets.ModelViewSet):
         post = self.get_object()
         
         try:
-            participation = ChallengeParticipation.objects.get(
-                user=request.user,
-                challenge_post=post
-            )
+            challenges.complete(post, request.user, request.data.get('impact_achieved'))
         except ChallengeParticipation.DoesNotExist:
             return Response({'error': 'You are not participating in this challenge'}, status=status.HTTP_400_BAD_REQUEST)
+        except (InvalidOperation, ValueError):
+            return Response({'error': 'impact_achieved must be a number'}, status=status.HTTP_400_BAD_REQUEST)
         
-        participation.completed = True
-        participation.impact_achieved = request.data.get('impact_achieved')
-        participation.save()
-        
-        return Response({'message': 'Challenge completed successfully!'})
+        return Response({
+            'message': 'Challenge completed successfully!',
+            'completed': post.completed_count,
+            'total_impact_achieved': float(post.total_impact_achieved),
+        })
 
 
 class CommentViewSet(viewsets.ModelViewSet):
@@ -388,30 +350,36 @@ class CommentViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(post_id=post_id)
         return queryset
     
+    @action(detail=False, methods=['get'])
+    def more(self, request):
+        """Continue a truncated reply list from a replies_cursor or comments_cursor"""
+        try:
+            comments, next_cursor = load_more_replies(
+                Comment, request.query_params.get('cursor', ''), prefetch=('reactions__user',)
+            )
+        except InvalidCursor:
+            raise NotFound('Invalid cursor')
+        serializer = self.get_serializer(comments, many=True)
+        return Response({'next_cursor': next_cursor, 'results': serializer.data})
+    
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def react(self, request, pk=None):
         """Add or update reaction to a comment"""
         comment = self.get_object()
         reaction_type = request.data.get('reaction_type', 'like')
         
-        reaction, created = CommentReaction.objects.get_or_create(
-            comment=comment,
-            user=request.user,
-            defaults={'reaction_type': reaction_type}
-        )
-        
-        if not created:
-            if reaction.reaction_type == reaction_type:
-                reaction.delete()
-                return Response({'action': 'removed'})
-            else:
-                reaction.reaction_type = reaction_type
-                reaction.save()
+        try:
+            action, reaction = toggle_reaction(CommentReaction, 'comment', comment, request.user, reaction_type)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if action == 'removed':
+            return Response({'action': 'removed', 'total': comment.total_reactions})
         
         serializer = CommentReactionSerializer(reaction, context={'request': request})
         return Response({
-            'action': 'added' if created else 'updated',
-            'reaction': serializer.data
+            'action': action,
+            'reaction': serializer.data,
+            'total': comment.total_reactions
         })
 
 
@@ -472,9 +440,7 @@ class FollowViewSet(viewsets.ModelViewSet):
 
 class HashTagViewSet(viewsets.ReadOnlyModelViewSet):
     """API ViewSet for hashtags"""
-    queryset = HashTag.objects.all().annotate(
-        post_count=Count('posts')
-    ).order_by('-post_count')
+    queryset = HashTag.objects.all().order_by('-post_count')
     serializer_class = HashTagSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     
@@ -489,11 +455,50 @@ class HashTagViewSet(viewsets.ReadOnlyModelViewSet):
     def challenges(self, request):
         """Get active challenges"""
         from .models import Post
-        challenges = Post.objects.filter(
+        from .serializers import PostSerializer
+        challenges = PostSerializer.setup_eager_loading(Post.objects.filter(
             post_type='challenge',
             challenge_duration__isnull=False
-        ).order_by('-created_at')
+        )).order_by('-created_at')
         
-        from .serializers import PostSerializer
         serializer = PostSerializer(challenges, many=True, context={'request': request})
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def impact_leaderboard(request):
+    """Top users of an impact leaderboard plus the requesting user's rank"""
+    window = request.query_params.get('window', 'all')
+    impact_type = request.query_params.get('type', leaderboard.ALL)
+    if window not in leaderboard.WINDOWS or impact_type not in [leaderboard.ALL] + leaderboard.impact_types():
+        raise NotFound('Unknown leaderboard')
+    rank, total = leaderboard.rank_of(request.user.pk, impact_type, window)
+    return Response({
+        'window': window,
+        'period': leaderboard.period(window),
+        'type': impact_type,
+        'leaders': [
+            {'rank': entry['rank'], 'user_id': entry['user'].pk, 'username': entry['user'].username, 'total': entry['total']}
+            for entry in leaderboard.top(impact_type, window, getattr(settings, 'LEADERBOARD_SIZE', 10))
+        ],
+        'me': {'rank': rank, 'total': total or 0},
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def impact_series(request):
+    """The requesting user's daily impact over the last ``days`` days, for charts"""
+    try:
+        days = max(1, min(int(request.query_params.get('days', 30)), 366))
+    except ValueError:
+        days = 30
+    series = rollups.daily_series(request.user.pk, days, request.query_params.get('type') or None)
+    return Response({
+        'days': [
+            {'day': day.isoformat(), 'total': float(total), 'actions': actions}
+            for day, total, actions in series
+        ],
+        'totals': rollups.user_totals(request.user.pk),
+    })
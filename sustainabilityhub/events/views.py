@@ -7,6 +7,7 @@ from django.utils import timezone
 from django.db.models import Q
 from django import forms
 from .models import Event
+from search.result_cache import CachedQueryset, normalize_query
 
 
 class EventListView(ListView):
@@ -19,7 +20,7 @@ class EventListView(ListView):
         queryset = Event.objects.all()
         
         # Search functionality
-        search = self.request.GET.get('search')
+        search = normalize_query(self.request.GET.get('search'))
         if search:
             queryset = queryset.filter(
                 Q(title__icontains=search) | Q(description__icontains=search) | Q(location__icontains=search)
@@ -36,8 +37,15 @@ class EventListView(ListView):
             queryset = queryset.filter(start_date__gte=timezone.now())
         elif time_filter == 'past':
             queryset = queryset.filter(start_date__lt=timezone.now())
-            
-        return queryset.order_by('start_date')
+        
+        queryset = queryset.order_by('start_date')
+        if search:
+            # Upcoming/past depends on the clock too, so entries also turn over each minute
+            return CachedQueryset(queryset, 'events', {
+                'search': search, 'type': filter_type, 'time': time_filter,
+                'minute': timezone.now().replace(second=0, microsecond=0),
+            })
+        return queryset
 
 
 class EventDetailView(DetailView):
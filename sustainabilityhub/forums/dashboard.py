@@ -0,0 +1,148 @@
+"""
+Cached dashboard snapshots for the home page.
+
+Site-wide numbers are recomputed at most once per DASHBOARD_CACHE_TIMEOUT.
+Per-user numbers live under versioned keys; the signal handlers in
+forums.signals bump a user's version whenever something they own changes,
+so a stale snapshot is simply never read again.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+
+from .trending import trending_topics
+
+GLOBAL_KEY = 'dashboard:global'
+ADMIN_KEY = 'dashboard:admin'
+USER_VERSION_KEY = 'dashboard:user:{}:version'
+USER_KEY = 'dashboard:user:{}:v{}'
+
+
+def _timeout():
+    return getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300)
+
+
+def build_global_snapshot():
+    """Compute the statistics shown to every visitor"""
+    from projects.models import Project
+    from events.models import Event
+    from resources.models import Resource
+    from .models import Topic
+
+    User = get_user_model()
+    week_ago = timezone.now() - timezone.timedelta(days=7)
+
+    return {
+        'stats': {
+            'total_projects': Project.objects.count(),
+            'total_topics': Topic.objects.count(),
+            'total_events': Event.objects.count(),
+            'total_resources': Resource.objects.count(),
+            'total_users': User.objects.filter(is_active=True).count(),
+        },
+        'community_highlights': {
+            'new_members': User.objects.filter(date_joined__gte=week_ago).count(),
+            'active_projects': Project.objects.filter(
+                status='active', updated_at__gte=week_ago
+            ).count(),
+            'recent_events': Event.objects.filter(created_at__gte=week_ago).count(),
+        },
+        'trending_topics': list(trending_topics(5)),
+    }
+
+
+def build_admin_snapshot():
+    """Compute the site-wide part of the superuser dashboard"""
+    from projects.models import Project
+    from events.models import Event
+    from rms.models import Report
+    from .models import Topic
+
+    User = get_user_model()
+    now = timezone.now()
+    week_ago = now - timezone.timedelta(days=7)
+
+    return {
+        'admin_stats': {
+            'pending_reports': Report.objects.filter(status='pending').count(),
+            'new_users_today': User.objects.filter(date_joined__date=now.date()).count(),
+            'total_users': User.objects.count(),
+            'inactive_users': User.objects.filter(is_active=False).count(),
+            'recent_activity': {
+                'new_projects': Project.objects.filter(created_at__gte=week_ago).count(),
+                'new_topics': Topic.objects.filter(created_at__gte=week_ago).count(),
+                'new_events': Event.objects.filter(created_at__gte=week_ago).count(),
+            }
+        },
+        'admin_quick_actions': {
+            'users_needing_attention': User.objects.filter(
+                is_active=True, last_login__lt=now - timezone.timedelta(days=30)
+            ).count(),
+            'flagged_content': Topic.objects.filter(is_locked=True).count(),
+            'system_health': {
+                'active_projects': Project.objects.filter(status='active').count(),
+                'upcoming_events': Event.objects.filter(start_date__gte=now).count(),
+            }
+        },
+    }
+
+
+def build_user_snapshot(user):
+    """Compute the personal statistics for one user"""
+    snapshot = {
+        # Only unviewed warnings count towards the banner
+        'user_warnings_count': user.warnings.filter(is_active=True, viewed_at__isnull=True).count(),
+        'user_stats': {
+            'projects_created': user.created_projects.count(),
+            'projects_joined': user.joined_projects.count(),
+            'topics_created': user.topics.count(),
+            'forum_posts': user.forum_posts.count(),
+            'events_attending': user.attending_events.count(),
+            'resources_shared': user.resources_created.count() if hasattr(user, 'resources_created') else 0,
+        },
+    }
+    if user.is_superuser:
+        snapshot['active_warnings'] = user.warnings_issued.filter(is_active=True).count()
+    return snapshot
+
+
+def get_global_snapshot():
+    return cache.get_or_set(GLOBAL_KEY, build_global_snapshot, _timeout())
+
+
+def get_admin_snapshot():
+    return cache.get_or_set(ADMIN_KEY, build_admin_snapshot, _timeout())
+
+
+def _user_version(user_id):
+    key = USER_VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so a lost version key never resurrects old snapshots
+        cache.add(key, int(time.time()), None)
+        version = cache.get(key)
+    return version
+
+
+def get_user_snapshot(user):
+    key = USER_KEY.format(user.pk, _user_version(user.pk))
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_user_snapshot(user)
+        cache.set(key, snapshot, _timeout())
+    return snapshot
+
+
+def invalidate_user(*user_ids):
+    """Bump the snapshot version of the given users"""
+    for user_id in user_ids:
+        if user_id is None:
+            continue
+        key = USER_VERSION_KEY.format(user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, int(time.time()), None)
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from forums.view_counter import flush_topic_views
+
+
+class Command(BaseCommand):
+    help = 'Applies buffered topic view counts to the database'
+
+    def handle(self, *args, **options):
+        flushed = flush_topic_views()
+        self.stdout.write(
+            self.style.SUCCESS(f'[OK] Flushed {flushed} buffered topic view(s)')
+        )
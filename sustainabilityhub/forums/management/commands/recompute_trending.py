@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from forums.models import Topic
+from forums.trending import recompute_trending_scores
+
+
+class Command(BaseCommand):
+    help = 'Recomputes topic engagement counts and trending scores from replies and likes'
+
+    def handle(self, *args, **options):
+        drifted = recompute_trending_scores()
+        if drifted:
+            self.stdout.write(
+                self.style.WARNING(f'[-] Repaired {drifted} topic(s) whose trending score had drifted')
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f'[OK] Trending scores verified for {Topic.objects.count()} topics')
+        )
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-18 03:27
+
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import migrations, models
+
+# forums.trending scores against this instant until its first rebase
+TRENDING_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def backfill_trending(apps, schema_editor):
+    Topic = apps.get_model('forums', 'Topic')
+    half_life = getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 168) * 3600
+    totals = defaultdict(lambda: [0, 0.0])
+    for model in (apps.get_model('forums', 'TopicPost'), apps.get_model('forums', 'TopicLike')):
+        for topic_id, created_at in model.objects.values_list('topic_id', 'created_at').iterator():
+            totals[topic_id][0] += 1
+            totals[topic_id][1] += 2.0 ** ((created_at - TRENDING_EPOCH).total_seconds() / half_life)
+    topics = list(Topic.objects.filter(pk__in=list(totals)).only('id'))
+    for topic in topics:
+        topic.engagement_count, topic.trending_score = totals[topic.id]
+    Topic.objects.bulk_update(topics, ['engagement_count', 'trending_score'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forums', '0002_alter_post_options_remove_post_topic_post_category_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='topic',
+            name='engagement_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='topic',
+            name='trending_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='topic',
+            index=models.Index(fields=['-trending_score', '-created_at'], name='forums_topi_trendin_d2ddd0_idx'),
+        ),
+        migrations.RunPython(backfill_trending, migrations.RunPython.noop),
+    ]
@@ -119,8 +119,15 @@ class Topic(models.Model):
     is_locked = models.BooleanField(default=False)
     views = models.IntegerField(default=0)
     
+    # Maintained by forums.trending as replies and likes come and go
+    engagement_count = models.IntegerField(default=0)
+    trending_score = models.FloatField(default=0)
+    
     class Meta:
         ordering = ['-is_pinned', '-created_at']
+        indexes = [
+            models.Index(fields=['-trending_score', '-created_at']),
+        ]
     
     def __str__(self):
         return self.title
@@ -153,3 +160,11 @@ class TopicLike(models.Model):
     
     def __str__(self):
         return f'{self.user.username} liked {self.topic.title}'
+
+
+class TrendingEpoch(models.Model):
+    """The instant Topic.trending_score values are relative to; a single row moved by forums.trending"""
+    epoch = models.DateTimeField()
+
+    def __str__(self):
+        return f'Trending epoch {self.epoch.isoformat()}'
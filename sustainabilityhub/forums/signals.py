@@ -1,22 +1,96 @@
-from django.db.models.signals import post_save
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
 from django.dispatch import receiver
-from .models import Post
-from notifications.utils import create_notification
+from accounts.models import UserWarning
+from events.models import Event
+from projects.models import Project
+from resources.models import Resource
+from sustainabilityhub.dispatch import enqueue
+from . import tasks
+from .models import Topic, TopicPost, TopicLike
+from .dashboard import invalidate_user
+from .trending import record_engagement
 
+User = get_user_model()
 
-@receiver(post_save, sender=Post)
+
+@receiver(post_save, sender=TopicPost)
 def notify_topic_reply(sender, instance, created, **kwargs):
     """Send notification when someone replies to a topic"""
-    if created and instance.topic.author != instance.author:
-        from django.urls import reverse
-        url = reverse('forums:topic_detail', kwargs={'pk': instance.topic.pk})
-        
-        create_notification(
-            recipient=instance.topic.author,
-            notification_type='topic_reply',
-            title=f'New reply to "{instance.topic.title}"',
-            message=f'{instance.author.username} replied: {instance.content[:100]}...' if len(instance.content) > 100 else f'{instance.author.username} replied: {instance.content}',
-            url=url,
-            content_object=instance
-        )
+    if created:
+        enqueue(tasks.notify_topic_reply, instance.pk, idempotency_key=f'topic_reply:{instance.pk}')
+
+
+@receiver(post_save, sender=TopicPost)
+@receiver(post_save, sender=TopicLike)
+def add_topic_engagement(sender, instance, created, **kwargs):
+    """Replies and likes push a topic up the trending ranking"""
+    if created:
+        record_engagement(instance.topic_id, instance.created_at, 1)
+
+
+@receiver(post_delete, sender=TopicPost)
+@receiver(post_delete, sender=TopicLike)
+def remove_topic_engagement(sender, instance, **kwargs):
+    record_engagement(instance.topic_id, instance.created_at, -1)
+
+
+# -------------------------
+# Dashboard snapshot invalidation
+# -------------------------
+_OWNER_FIELDS = {
+    Project: 'creator_id',
+    Topic: 'author_id',
+    TopicPost: 'author_id',
+    Event: 'organizer_id',
+    Resource: 'author_id',
+}
+
+
+def invalidate_owner_dashboard(sender, instance, **kwargs):
+    """Drop the cached dashboard of whoever owns the changed object"""
+    invalidate_user(getattr(instance, _OWNER_FIELDS[sender]))
+
+
+for _model in _OWNER_FIELDS:
+    post_save.connect(invalidate_owner_dashboard, sender=_model, dispatch_uid=f'dashboard_save_{_model.__name__}')
+    post_delete.connect(invalidate_owner_dashboard, sender=_model, dispatch_uid=f'dashboard_delete_{_model.__name__}')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_dashboard(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=UserWarning)
+@receiver(post_delete, sender=UserWarning)
+def invalidate_warning_dashboard(sender, instance, **kwargs):
+    invalidate_user(instance.user_id, instance.issued_by_id)
+
+
+_MEMBER_ATTRS = {
+    Project.members.through: 'members',
+    Event.participants.through: 'participants',
+}
+
+
+@receiver(m2m_changed, sender=Project.members.through)
+@receiver(m2m_changed, sender=Event.participants.through)
+def invalidate_membership_dashboard(sender, instance, action, reverse, pk_set, **kwargs):
+    """Joining or leaving a project/event changes the member's counters"""
+    if reverse:
+        if action in ('post_add', 'post_remove', 'pre_clear'):
+            invalidate_user(instance.pk)
+    elif action in ('post_add', 'post_remove'):
+        invalidate_user(*(pk_set or ()))
+    elif action == 'pre_clear':
+        invalidate_user(*getattr(instance, _MEMBER_ATTRS[sender]).values_list('pk', flat=True))
+
 
+@receiver(pre_delete, sender=Project)
+@receiver(pre_delete, sender=Event)
+def invalidate_members_on_delete(sender, instance, **kwargs):
+    """Membership rows vanish with the object without an m2m_changed signal"""
+    attr = 'members' if sender is Project else 'participants'
+    invalidate_user(*getattr(instance, attr).values_list('pk', flat=True))
@@ -0,0 +1,38 @@
+from celery import shared_task
+from django.urls import reverse
+from notifications.utils import create_notification
+from sustainabilityhub.dispatch import IdempotentTask
+from .models import TopicPost
+from .trending import recompute_trending_scores
+from .view_counter import flush_topic_views as flush_buffered_views
+
+
+@shared_task(base=IdempotentTask)
+def notify_topic_reply(topic_post_id):
+    """Tell a topic's author about a new reply"""
+    reply = TopicPost.objects.select_related('topic__author', 'author').filter(pk=topic_post_id).first()
+    if reply is None or reply.topic.author_id == reply.author_id:
+        return 0
+
+    content = reply.content
+    create_notification(
+        recipient=reply.topic.author,
+        notification_type='topic_reply',
+        title=f'New reply to "{reply.topic.title}"',
+        message=f'{reply.author.username} replied: {content[:100]}...' if len(content) > 100 else f'{reply.author.username} replied: {content}',
+        url=reverse('forums:topic_detail', kwargs={'pk': reply.topic_id}),
+        content_object=reply
+    )
+    return 1
+
+
+@shared_task
+def flush_topic_views():
+    """Periodic: write buffered topic views to the database"""
+    return flush_buffered_views()
+
+
+@shared_task
+def recompute_trending():
+    """Periodic: repair drift in the incrementally maintained trending scores"""
+    return recompute_trending_scores()
@@ -1,3 +1,234 @@
-from django.test import TestCase
+import time
+from unittest.mock import patch
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from accounts.models import UserWarning
+from events.models import Event
+from projects.models import Project
+from resources.models import Resource
+from rms.models import Report
+from . import dashboard, trending, view_counter
+from .models import Topic, TopicLike, TopicPost, TrendingEpoch
+
+User = get_user_model()
+
+
+class TrendingScoreTests(TestCase):
+    """Replies and likes move topics up the trending list with in-place F() updates"""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('author', 'author@example.com', 'pw')
+        self.fan = User.objects.create_user('fan', 'fan@example.com', 'pw')
+        self.older = Topic.objects.create(title='Composting', content='...', author=self.author)
+        self.newer = Topic.objects.create(title='Rain barrels', content='...', author=self.author)
+
+    def reply(self, topic, days_ago=0):
+        post = TopicPost.objects.create(topic=topic, author=self.fan, content='+1')
+        if days_ago:
+            # Backdate the reply as if it had been counted back then
+            created_at = timezone.now() - timezone.timedelta(days=days_ago)
+            TopicPost.objects.filter(pk=post.pk).update(created_at=created_at)
+            Topic.objects.filter(pk=topic.pk).update(
+                trending_score=Topic.objects.get(pk=topic.pk).trending_score
+                - trending.event_weight(post.created_at) + trending.event_weight(created_at)
+            )
+        return post
+
+    def test_engagement_updates_counters_in_place(self):
+        stale = Topic.objects.get(pk=self.newer.pk)
+        reply = self.reply(self.newer)
+        like = TopicLike.objects.create(topic=self.newer, user=self.fan)
+        # A stale copy saved later must not undo the counters
+        stale.title = 'Rain barrels!'
+        stale.save(update_fields=['title'])
+        self.newer.refresh_from_db()
+        self.assertEqual(self.newer.engagement_count, 2)
+        self.assertAlmostEqual(
+            self.newer.trending_score, trending.event_weight(reply.created_at) + trending.event_weight(like.created_at)
+        )
+
+        with self.assertNumQueries(1):
+            trending.record_engagement(self.newer.pk, timezone.now(), 1)
+        reply.delete()
+        like.delete()
+        self.newer.refresh_from_db()
+        self.assertEqual(self.newer.engagement_count, 1)
+
+    def test_recent_engagement_outranks_older_volume(self):
+        for _ in range(3):
+            self.reply(self.older, days_ago=28)
+        self.reply(self.newer)
+        self.assertEqual(list(trending.trending_topics(2)), [self.newer, self.older])
+        self.assertEqual(trending.recompute_trending_scores(), 0)
+
+    def test_rebase_keeps_ranking_and_bounds_weights(self):
+        for _ in range(3):
+            self.reply(self.older, days_ago=3)
+        self.reply(self.newer)
+        # Decades past the initial epoch a weight would overflow a float without rebasing
+        far_future = trending.TRENDING_EPOCH + timezone.timedelta(days=365 * 30)
+        with self.assertRaises(OverflowError):
+            trending.event_weight(far_future)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(trending.recompute_trending_scores(now=timezone.now()), 0)
+        self.assertEqual(list(trending.trending_topics(2)), [self.older, self.newer])
+        self.assertAlmostEqual(trending.event_weight(TrendingEpoch.objects.get().epoch), 1.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            trending.recompute_trending_scores(now=far_future)
+        self.assertEqual(trending.event_weight(far_future), 1.0)
+        cache.clear()
+        self.assertEqual(trending.current_epoch(), far_future)
+
+    def test_workers_pick_up_a_rebase_within_the_epoch_timeout(self):
+        stale = trending.current_epoch()
+        # Another worker rebases; its cache write never reaches this process's cache
+        TrendingEpoch.objects.update_or_create(pk=1, defaults={'epoch': timezone.now()})
+        self.assertEqual(trending.current_epoch(), stale)
+        later = time.time() + settings.TRENDING_EPOCH_CACHE_TIMEOUT + 1
+        with patch('django.core.cache.backends.locmem.time.time', return_value=later):
+            self.assertEqual(trending.current_epoch(), TrendingEpoch.objects.get().epoch)
+
+
+@override_settings(TOPIC_VIEW_FLUSH_INTERVAL=3600)
+class TopicViewBufferTests(TestCase):
+    """Topic views collect in a buffer and reach the database in one UPDATE per flush"""
+
+    def setUp(self):
+        view_counter.get_buffer().drain()
+        author = User.objects.create_user('author', 'author@example.com', 'pw')
+        self.topics = [
+            Topic.objects.create(title=f'Topic {i}', content='...', author=author) for i in range(2)
+        ]
+
+    def tearDown(self):
+        view_counter.get_buffer().drain()
+
+    def test_views_are_buffered_then_flushed_together(self):
+        for _ in range(3):
+            response = self.client.get(f'/forums/topics/{self.topics[0].pk}/')
+        self.client.get(f'/forums/topics/{self.topics[1].pk}/')
+        self.assertEqual(response.context['topic'].views, 3)
+        self.assertEqual(Topic.objects.get(pk=self.topics[0].pk).views, 0)
+
+        with self.assertNumQueries(3):  # savepoint, one UPDATE for both topics, release
+            self.assertEqual(view_counter.flush_topic_views(), 4)
+        self.assertEqual(sorted(Topic.objects.values_list('views', flat=True)), [1, 3])
+        self.assertEqual(view_counter.pending_views(self.topics[0].pk), 0)
+        self.assertEqual(view_counter.flush_topic_views(), 0)
+
+    def test_failed_flush_keeps_the_views(self):
+        self.assertEqual(view_counter.record_view(self.topics[0].pk), 1)
+        with patch('forums.view_counter.apply_view_counts', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                view_counter.flush_topic_views()
+        self.assertEqual(view_counter.pending_views(self.topics[0].pk), 1)
+        view_counter.flush_topic_views()
+        self.assertEqual(Topic.objects.get(pk=self.topics[0].pk).views, 1)
+
+
+class DashboardSnapshotTests(TestCase):
+    """The home page reads its statistics from cached snapshots that signals invalidate"""
+
+    def setUp(self):
+        # Sessions live in the cache too, so only drop the shared snapshots
+        cache.delete_many([dashboard.GLOBAL_KEY, dashboard.ADMIN_KEY])
+        self.user = User.objects.create_user('member', 'member@example.com', 'pw')
+        self.other = User.objects.create_user('organizer', 'organizer@example.com', 'pw')
+
+    def tearDown(self):
+        cache.delete_many([dashboard.GLOBAL_KEY, dashboard.ADMIN_KEY])
+
+    def version(self, user):
+        return dashboard._user_version(user.pk)
+
+    def assertBumps(self, users, change):
+        before = [self.version(user) for user in users]
+        change()
+        for user, version in zip(users, before):
+            self.assertNotEqual(self.version(user), version, user.username)
+
+    def test_cached_home_page_costs_few_queries(self):
+        self.client.login(username='member', password='pw')
+        self.client.get('/')
+        # The user, recommended projects and events, and pending notifications
+        with self.assertNumQueries(4):
+            response = self.client.get('/')
+        self.assertEqual(response.context['stats']['total_users'], 2)
+        self.assertEqual(response.context['user_stats']['projects_created'], 0)
+
+    def test_global_snapshot_is_reused_within_its_interval(self):
+        self.assertEqual(dashboard.get_global_snapshot()['stats']['total_projects'], 0)
+        Project.objects.create(title='Garden', description='...', creator=self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(dashboard.get_global_snapshot()['stats']['total_projects'], 0)
+        cache.delete(dashboard.GLOBAL_KEY)  # the interval ran out
+        self.assertEqual(dashboard.get_global_snapshot()['stats']['total_projects'], 1)
+
+    def test_owned_objects_bump_the_owner_version(self):
+        before = dashboard.get_user_snapshot(self.user)
+        self.assertEqual(before['user_stats']['projects_created'], 0)
+        project = Project(title='Garden', description='...', creator=self.user)
+        self.assertBumps([self.user], project.save)
+        self.assertEqual(dashboard.get_user_snapshot(self.user)['user_stats']['projects_created'], 1)
+        self.assertBumps([self.user], project.delete)
+
+        topic = Topic(title='Composting', content='...', author=self.user)
+        self.assertBumps([self.user], topic.save)
+        self.assertBumps([self.user], topic.delete)
+        event = Event(
+            title='Cleanup', description='...', organizer=self.user, location='Pier', start_date=timezone.now()
+        )
+        self.assertBumps([self.user], event.save)
+        self.assertBumps([self.user], event.delete)
+        resource = Resource(title='Guide', description='...', author=self.user)
+        self.assertBumps([self.user], resource.save)
+        self.assertBumps([self.user], resource.delete)
+
+        self.assertBumps([self.user], lambda: self.user.save(update_fields=['first_name']))
+        self.assertBumps([self.other], self.other.delete)
+
+    def test_memberships_and_warnings_bump_the_users_involved(self):
+        project = Project.objects.create(title='Garden', description='...', creator=self.other)
+        event = Event.objects.create(
+            title='Cleanup', description='...', organizer=self.other, location='Pier', start_date=timezone.now()
+        )
+        self.assertBumps([self.user], lambda: project.members.add(self.user))
+        self.assertEqual(dashboard.get_user_snapshot(self.user)['user_stats']['projects_joined'], 1)
+        self.assertBumps([self.user], lambda: project.members.remove(self.user))
+        self.assertBumps([self.user], lambda: self.user.joined_projects.add(project))
+        self.assertBumps([self.user], project.members.clear)
+        self.assertBumps([self.user], lambda: event.participants.add(self.user))
+        self.assertBumps([self.user], lambda: self.user.attending_events.clear())
+        event.participants.add(self.user)
+        self.assertBumps([self.user], event.delete)
+
+        warning = UserWarning(user=self.user, issued_by=self.other, severity='low', reason='Spam', description='...')
+        self.assertBumps([self.user, self.other], warning.save)
+        self.assertEqual(dashboard.get_user_snapshot(self.user)['user_warnings_count'], 1)
+        self.assertBumps([self.user, self.other], warning.delete)
+
+    def test_superusers_get_the_admin_block_from_its_own_snapshot(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.login(username='member', password='pw')
+        self.client.get('/')
+        self.assertIsNone(cache.get(dashboard.ADMIN_KEY))
+
+        self.client.login(username='admin', password='pw')
+        response = self.client.get('/')
+        self.assertEqual(response.context['admin_stats']['pending_reports'], 0)
+        Report.objects.create(reporter=self.user, category='other', subject='Spam', description='...')
+        response = self.client.get('/')
+        self.assertEqual(response.context['admin_stats']['pending_reports'], 0)
+        self.assertEqual(len(response.context['recent_reports']), 1)
+
+        cache.delete(dashboard.ADMIN_KEY)  # the interval ran out
+        response = self.client.get('/')
+        self.assertEqual(response.context['admin_stats']['pending_reports'], 1)
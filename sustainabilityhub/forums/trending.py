@@ -0,0 +1,109 @@
+"""
+Time-decayed trending ranking for forum topics.
+
+Every reply or like adds ``2 ** ((created_at - epoch) / half_life)`` to the
+topic's ``trending_score``. Because all scores decay at the same rate, storing
+the undecayed sum is enough to keep the ordering correct without ever
+rewriting old rows, and "top N trending" becomes an index range read.
+Deleting a reply or like subtracts exactly what it added.
+
+Left alone, weights would grow without bound as time moves away from the
+epoch, so ``recompute_trending_scores`` also rebases: it moves the epoch
+(stored in TrendingEpoch) to the present and multiplies every score by the
+same factor, which leaves the ordering untouched. Weights therefore stay
+near 1 and never overflow. Workers cache the epoch for at most
+TRENDING_EPOCH_CACHE_TIMEOUT seconds, so after a rebase each of them moves
+to the new scale within that window, even with a per-process cache.
+"""
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+# Scores are relative to this instant until the first rebase
+TRENDING_EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+EPOCH_CACHE_KEY = 'forums:trending:epoch'
+
+
+def _half_life_seconds():
+    return getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 168) * 3600
+
+
+def _epoch_timeout():
+    return getattr(settings, 'TRENDING_EPOCH_CACHE_TIMEOUT', 60)
+
+
+def current_epoch():
+    from .models import TrendingEpoch
+    epoch = cache.get(EPOCH_CACHE_KEY)
+    if epoch is None:
+        epoch = TrendingEpoch.objects.filter(pk=1).values_list('epoch', flat=True).first() or TRENDING_EPOCH
+        cache.set(EPOCH_CACHE_KEY, epoch, _epoch_timeout())
+    return epoch
+
+
+def event_weight(created_at, epoch=None):
+    """Contribution of one interaction that happened at ``created_at``"""
+    elapsed = (created_at - (epoch or current_epoch())).total_seconds()
+    return 2.0 ** (elapsed / _half_life_seconds())
+
+
+def record_engagement(topic_id, created_at, delta=1):
+    """Apply a reply/like being added (delta=1) or removed (delta=-1)"""
+    from .models import Topic
+    Topic.objects.filter(pk=topic_id).update(
+        engagement_count=F('engagement_count') + delta,
+        trending_score=F('trending_score') + delta * event_weight(created_at),
+    )
+
+
+def trending_topics(limit=5):
+    from .models import Topic
+    return Topic.objects.select_related('author').order_by('-trending_score', '-created_at')[:limit]
+
+
+def compute_scores(post_model, like_model, epoch=None):
+    """Batch-compute {topic_id: (engagement_count, trending_score)} from scratch"""
+    epoch = epoch or current_epoch()
+    totals = defaultdict(lambda: [0, 0.0])
+    for model in (post_model, like_model):
+        for topic_id, created_at in model.objects.values_list('topic_id', 'created_at').iterator():
+            entry = totals[topic_id]
+            entry[0] += 1
+            entry[1] += event_weight(created_at, epoch)
+    return {topic_id: tuple(entry) for topic_id, entry in totals.items()}
+
+
+def recompute_trending_scores(batch_size=500, now=None):
+    """
+    Rebase the scores onto ``now`` (default: the current time) and rewrite
+    every topic's counters from the underlying rows. Returns the number of
+    topics whose stored values drifted.
+    """
+    from .models import Topic, TopicLike, TopicPost, TrendingEpoch
+
+    new_epoch = now or timezone.now()
+    with transaction.atomic():
+        stored = TrendingEpoch.objects.select_for_update().filter(pk=1).first()
+        old_epoch = stored.epoch if stored else TRENDING_EPOCH
+        # Scaling every score by the same factor keeps the ranking; underflow to 0 is fine
+        factor = 2.0 ** ((old_epoch - new_epoch).total_seconds() / _half_life_seconds())
+        Topic.objects.exclude(trending_score=0).update(trending_score=F('trending_score') * factor)
+        TrendingEpoch.objects.update_or_create(pk=1, defaults={'epoch': new_epoch})
+
+        scores = compute_scores(TopicPost, TopicLike, new_epoch)
+        drifted = []
+        for topic in Topic.objects.only('id', 'engagement_count', 'trending_score').iterator():
+            count, score = scores.get(topic.id, (0, 0.0))
+            if topic.engagement_count != count or abs(topic.trending_score - score) > 1e-9 * max(1.0, abs(score)):
+                topic.engagement_count = count
+                topic.trending_score = score
+                drifted.append(topic)
+        Topic.objects.bulk_update(drifted, ['engagement_count', 'trending_score'], batch_size=batch_size)
+    # A write that read the old epoch in the meantime is repaired by the next run
+    transaction.on_commit(lambda: cache.set(EPOCH_CACHE_KEY, new_epoch, _epoch_timeout()))
+    return len(drifted)
@@ -0,0 +1,159 @@
+"""
+Write-behind view counting for forum topics.
+
+Detail pages only bump a counter in a buffer; ``flush_topic_views`` later
+applies everything accumulated since the last flush as a single
+``views = views + n`` UPDATE. Two buffers are available through the
+TOPIC_VIEW_BUFFER setting:
+
+* ``memory`` - per-process counters, flushed opportunistically every
+  TOPIC_VIEW_FLUSH_INTERVAL seconds and when the process exits.
+* ``redis`` - a shared hash at REDIS_URL updated with HINCRBY, flushed by the
+  ``flush_topic_views`` management command (or a periodic task).
+"""
+import atexit
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+FLUSH_CHUNK_SIZE = 500
+
+
+class MemoryViewBuffer:
+    """Counts views inside the current process"""
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def incr(self, topic_id):
+        with self._lock:
+            self._counts[topic_id] += 1
+            return self._counts[topic_id]
+
+    def pending(self, topic_id):
+        return self._counts.get(topic_id, 0)
+
+    def drain(self):
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            self._last_flush = time.monotonic()
+        return dict(counts)
+
+    def restore(self, counts):
+        with self._lock:
+            self._counts.update(counts)
+
+    def flush_due(self):
+        interval = getattr(settings, 'TOPIC_VIEW_FLUSH_INTERVAL', 60)
+        return time.monotonic() - self._last_flush >= interval
+
+
+class RedisViewBuffer:
+    """Counts views in a Redis hash shared by every worker"""
+    key = 'forums:topic_views'
+
+    def __init__(self, url):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+
+    def incr(self, topic_id):
+        return self._redis.hincrby(self.key, topic_id, 1)
+
+    def pending(self, topic_id):
+        return int(self._redis.hget(self.key, topic_id) or 0)
+
+    def drain(self):
+        import redis
+        # Renaming is atomic, so increments racing with the flush land in a fresh hash
+        flushing_key = f'{self.key}:flushing:{uuid.uuid4().hex}'
+        try:
+            self._redis.rename(self.key, flushing_key)
+        except redis.ResponseError:
+            return {}
+        pipe = self._redis.pipeline()
+        pipe.hgetall(flushing_key)
+        pipe.delete(flushing_key)
+        raw, _ = pipe.execute()
+        return {int(topic_id): int(count) for topic_id, count in raw.items()}
+
+    def restore(self, counts):
+        pipe = self._redis.pipeline()
+        for topic_id, count in counts.items():
+            pipe.hincrby(self.key, topic_id, count)
+        pipe.execute()
+
+    def flush_due(self):
+        # Flushed out of band so requests never pay for the UPDATE
+        return False
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                if getattr(settings, 'TOPIC_VIEW_BUFFER', 'memory') == 'redis':
+                    _buffer = RedisViewBuffer(settings.REDIS_URL)
+                else:
+                    _buffer = MemoryViewBuffer()
+                    atexit.register(flush_topic_views)
+    return _buffer
+
+
+def record_view(topic_id):
+    """
+    Count one view of a topic without touching the database. Returns the
+    topic's buffered view count with this view included.
+    """
+    buffer = get_buffer()
+    pending = buffer.incr(topic_id)
+    if buffer.flush_due():
+        flush_topic_views()
+    return pending
+
+
+def pending_views(topic_id):
+    """Views recorded for a topic that have not been flushed yet"""
+    return get_buffer().pending(topic_id)
+
+
+def apply_view_counts(counts):
+    from .models import Topic
+
+    items = list(counts.items())
+    with transaction.atomic():
+        for start in range(0, len(items), FLUSH_CHUNK_SIZE):
+            chunk = items[start:start + FLUSH_CHUNK_SIZE]
+            Topic.objects.filter(pk__in=[topic_id for topic_id, _ in chunk]).update(
+                views=F('views') + Case(
+                    *[When(pk=topic_id, then=Value(count)) for topic_id, count in chunk],
+                    default=Value(0),
+                    output_field=IntegerField(),
+                )
+            )
+
+
+def flush_topic_views():
+    """Write all buffered views to the database; returns the number flushed"""
+    buffer = get_buffer()
+    counts = buffer.drain()
+    if not counts:
+        return 0
+    try:
+        apply_view_counts(counts)
+    except Exception:
+        # Put the increments back so the next flush retries them
+        buffer.restore(counts)
+        raise
+    return sum(counts.values())
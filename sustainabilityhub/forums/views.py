@@ -161,64 +161,35 @@ from django.contrib.auth.decorators import user_passes_test, login_required
 from django.utils.decorators import method_decorator
 from django.contrib import messages
 from django.urls import reverse_lazy
-from django.db.models import Q, Count
+from django.db.models import Q
 from django.utils import timezone
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 import json
+from sustainabilityhub.comment_tree import attach_comment_trees
 from .models import Category, Topic, Post, TopicPost, TopicLike, PostReaction, Comment
+from .view_counter import record_view
 
 
 def home_view(request):
     from projects.models import Project
     from events.models import Event
-    from resources.models import Resource
     from notifications.models import Notification
     from rms.models import Report
-    from django.contrib.auth import get_user_model
     from django.db.models import Q
+    from .dashboard import get_global_snapshot, get_admin_snapshot, get_user_snapshot
     
-    User = get_user_model()
-    
-    # Base statistics for all users
-    stats = {
-        'total_projects': Project.objects.count(),
-        'total_topics': Topic.objects.count(),
-        'total_events': Event.objects.count(),
-        'total_resources': Resource.objects.count(),
-        'total_users': User.objects.filter(is_active=True).count(),
-    }
-    
-    context = {'stats': stats}
+    # Site-wide statistics come from a periodically refreshed snapshot
+    snapshot = get_global_snapshot()
+    context = {'stats': snapshot['stats']}
     
     if request.user.is_authenticated:
         user = request.user
         
-        # User warnings count (only unviewed warnings for banner)
-        user_warnings_count = user.warnings.filter(is_active=True, viewed_at__isnull=True).count()
-        context['user_warnings_count'] = user_warnings_count
-        
-        # Personal statistics
-        user_stats = {
-            'projects_created': user.created_projects.count(),
-            'projects_joined': user.joined_projects.count(),
-            'topics_created': user.topics.count(),
-            'forum_posts': user.forum_posts.count(),
-            'events_attending': user.attending_events.count(),
-            'resources_shared': user.resources_created.count() if hasattr(user, 'resources_created') else 0,
-        }
-        
-        # Activity feed - recent activities from user's network
-        my_projects = user.joined_projects.all() | user.created_projects.all()
-        activity_feed = []
-        
-        # Recent project updates from projects user is involved in
-        if my_projects.exists():
-            recent_project_updates = Project.objects.filter(
-                id__in=my_projects.values_list('id', flat=True)
-            ).order_by('-updated_at')[:5]
-            activity_feed.extend(recent_project_updates)
+        # Personal statistics and warnings banner (cached per user, invalidated by signals)
+        user_snapshot = get_user_snapshot(user)
+        context['user_warnings_count'] = user_snapshot['user_warnings_count']
         
         # Personalized recommendations
         recommended_projects = Project.objects.exclude(
@@ -229,75 +200,34 @@ def home_view(request):
             start_date__gte=timezone.now()
         ).exclude(participants=user).order_by('start_date')[:4]
         
-        # Trending content
-        trending_topics = Topic.objects.annotate(
-            engagement=Count('posts') + Count('likes')
-        ).order_by('-engagement', '-created_at')[:5]
-        
         # User's pending tasks/notifications
         pending_notifications = Notification.objects.filter(
             recipient=user, is_read=False
         ).order_by('-created_at')[:5]
         
-        # Recent community highlights
-        community_highlights = {
-            'new_members': User.objects.filter(
-                date_joined__gte=timezone.now() - timezone.timedelta(days=7)
-            ).count(),
-            'active_projects': Project.objects.filter(
-                status='active', updated_at__gte=timezone.now() - timezone.timedelta(days=7)
-            ).count(),
-            'recent_events': Event.objects.filter(
-                created_at__gte=timezone.now() - timezone.timedelta(days=7)
-            ).count(),
-        }
-        
         context.update({
-            'user_stats': user_stats,
+            'user_stats': user_snapshot['user_stats'],
             'recommended_projects': recommended_projects,
             'recommended_events': recommended_events,
-            'trending_topics': trending_topics,
+            'trending_topics': snapshot['trending_topics'],
             'pending_notifications': pending_notifications,
-            'community_highlights': community_highlights,
+            'community_highlights': snapshot['community_highlights'],
         })
         
         # Admin-specific data (admins get both member experience + admin controls)
         if user.is_superuser:
-            admin_stats = {
-                'pending_reports': Report.objects.filter(status='pending').count(),
-                'new_users_today': User.objects.filter(
-                    date_joined__date=timezone.now().date()
-                ).count(),
-                'active_warnings': user.warnings_issued.filter(is_active=True).count() if hasattr(user, 'warnings_issued') else 0,
-                'total_users': User.objects.count(),
-                'inactive_users': User.objects.filter(is_active=False).count(),
-                'recent_activity': {
-                    'new_projects': Project.objects.filter(created_at__gte=timezone.now() - timezone.timedelta(days=7)).count(),
-                    'new_topics': Topic.objects.filter(created_at__gte=timezone.now() - timezone.timedelta(days=7)).count(),
-                    'new_events': Event.objects.filter(created_at__gte=timezone.now() - timezone.timedelta(days=7)).count(),
-                }
-            }
+            admin_snapshot = get_admin_snapshot()
+            admin_stats = dict(admin_snapshot['admin_stats'])
+            admin_stats['active_warnings'] = user_snapshot.get('active_warnings', 0)
             
             recent_reports = Report.objects.filter(
                 status__in=['pending', 'investigating']
             ).order_by('-created_at')[:5]
             
-            # Admin quick actions data
-            admin_quick_actions = {
-                'users_needing_attention': User.objects.filter(
-                    is_active=True, last_login__lt=timezone.now() - timezone.timedelta(days=30)
-                ).count(),
-                'flagged_content': Topic.objects.filter(is_locked=True).count(),
-                'system_health': {
-                    'active_projects': Project.objects.filter(status='active').count(),
-                    'upcoming_events': Event.objects.filter(start_date__gte=timezone.now()).count(),
-                }
-            }
-            
             context.update({
                 'admin_stats': admin_stats,
                 'recent_reports': recent_reports,
-                'admin_quick_actions': admin_quick_actions,
+                'admin_quick_actions': admin_snapshot['admin_quick_actions'],
             })
     
     return render(request, 'index.html', context)
@@ -357,10 +287,12 @@ class TopicListView(ListView):
     paginate_by = 10
 
     def get_queryset(self):
-        return Post.objects.select_related('author', 'category').prefetch_related('reactions', 'comments').order_by('-created_at')
+        return Post.objects.select_related('author', 'category').prefetch_related('reactions').order_by('-created_at')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        # The feed previews the first top-level comments of each post
+        attach_comment_trees(context['posts'], Comment, max_depth=0, max_children=3)
         context['categories'] = Category.objects.all()
         return context
 
@@ -375,8 +307,8 @@ class TopicDetailView(DetailView):
 
     def get_object(self):
         topic = get_object_or_404(Topic, pk=self.kwargs['pk'])
-        topic.views += 1
-        topic.save(update_fields=['views'])
+        # Views are buffered and flushed in bulk; show the live total without writing
+        topic.views += record_view(topic.pk)
         return topic
 
     def get_context_data(self, **kwargs):
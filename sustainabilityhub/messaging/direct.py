@@ -0,0 +1,81 @@
+"""
+One-to-one conversations.
+
+A direct conversation stores its two participants' ids, lower first, in
+the unique ``Conversation.direct_key``. Finding the conversation between two
+users is then a single unique-index lookup, group conversations never
+match, and two users starting a conversation at the same moment end up in
+the same one: the loser of the insert race gets an IntegrityError and reads
+the winner's row.
+"""
+from django.apps import apps as global_apps
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max
+
+
+def direct_key(user_id, other_id):
+    low, high = sorted((int(user_id), int(other_id)))
+    return f'{low}:{high}'
+
+
+def get_or_create_direct(user, other):
+    """Return ``(conversation, created)`` for the one-to-one conversation of two distinct users"""
+    if user.pk == other.pk:
+        raise ValueError('A direct conversation needs two different users')
+    Conversation = global_apps.get_model('messaging', 'Conversation')
+    key = direct_key(user.pk, other.pk)
+    conversation = Conversation.objects.filter(direct_key=key).first()
+    if conversation is not None:
+        return conversation, False
+    try:
+        with transaction.atomic():
+            conversation = Conversation.objects.create(direct_key=key)
+            conversation.participants.add(user, other)
+    except IntegrityError:
+        return Conversation.objects.get(direct_key=key), False
+    return conversation, True
+
+
+def assign_direct_keys():
+    """
+    Key every existing two-person conversation. Where duplicates were created
+    before the key existed, the most recently active one gets it. Returns the
+    number keyed.
+    """
+    Conversation = global_apps.get_model('messaging', 'Conversation')
+    participants = Conversation.participants.through
+    pairs = {}
+    two_person = participants.objects.values('conversation_id').annotate(
+        people=Count('user_id')
+    ).filter(people=2).values('conversation_id')
+    for conversation_id, user_id in participants.objects.filter(
+        conversation_id__in=two_person
+    ).values_list('conversation_id', 'user_id'):
+        pairs.setdefault(conversation_id, []).append(user_id)
+
+    activity = dict(
+        Conversation.objects.filter(pk__in=pairs).annotate(
+            active=Max('messages__created_at')
+        ).values_list('pk', 'active')
+    )
+    keyed = {}
+    for conversation_id in sorted(pairs, key=lambda pk: (activity.get(pk) is not None, activity.get(pk), pk)):
+        keyed[direct_key(*pairs[conversation_id])] = conversation_id
+    with transaction.atomic():
+        Conversation.objects.filter(direct_key__isnull=False).update(direct_key=None)
+        Conversation.objects.bulk_update(
+            [Conversation(pk=conversation_id, direct_key=key) for key, conversation_id in keyed.items()],
+            ['direct_key'], batch_size=500,
+        )
+    return len(keyed)
+
+
+def release_direct_key(conversation_id):
+    """Forget the key of a conversation that no longer has exactly its two original participants"""
+    Conversation = global_apps.get_model('messaging', 'Conversation')
+    conversation = Conversation.objects.filter(pk=conversation_id, direct_key__isnull=False).first()
+    if conversation is None:
+        return
+    members = sorted(conversation.participants.values_list('pk', flat=True))
+    if len(members) != 2 or direct_key(*members) != conversation.direct_key:
+        Conversation.objects.filter(pk=conversation_id).update(direct_key=None)
@@ -0,0 +1,67 @@
+"""
+Windowed message history.
+
+A conversation opens on its newest MESSAGE_HISTORY_PAGE_SIZE messages; older
+ones are read backwards a window at a time from an opaque keyset cursor on
+(created_at, id). Each window is one range scan of the
+(conversation, created_at, id) index, so a thread of 50,000 messages opens
+as cheaply as one of 50. Read receipts come from the other participants'
+watermarks in ConversationReadState rather than a per-message flag.
+"""
+import base64
+import json
+
+from django.conf import settings
+from django.db.models import Count, Min, Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(message):
+    raw = json.dumps([message.created_at.isoformat(), message.pk])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (created_at, id) or raise InvalidCursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, pk = json.loads(raw)
+        created_at = parse_datetime(created_at)
+        if created_at is None or not isinstance(pk, int):
+            raise ValueError(raw)
+        return created_at, pk
+    except (TypeError, ValueError, UnicodeDecodeError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def window(conversation, before=None, limit=None):
+    """
+    Up to ``limit`` messages of ``conversation`` older than the cursor
+    ``before`` (default: the newest ones), oldest first, and the cursor of the
+    window before them or None at the start of the conversation.
+    """
+    if limit is None:
+        limit = getattr(settings, 'MESSAGE_HISTORY_PAGE_SIZE', 50)
+    messages = conversation.messages.select_related('sender')
+    if before:
+        created_at, pk = decode_cursor(before)
+        messages = messages.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+    rows = list(messages.order_by('-created_at', '-pk')[:limit + 1])
+    older = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit][::-1], older
+
+
+def mark_receipts(conversation, messages, user_id):
+    """Set ``seen`` on ``messages``: whether every other participant has read up to them"""
+    receipts = conversation.read_states.exclude(user_id=user_id).aggregate(
+        watermark=Min('last_read_message_id'),
+        never_read=Count('pk', filter=Q(last_read_message__isnull=True)),
+    )
+    watermark = None if receipts['never_read'] else receipts['watermark']
+    for message in messages:
+        message.seen = watermark is not None and message.pk <= watermark
+    return messages
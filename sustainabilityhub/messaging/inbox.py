@@ -0,0 +1,191 @@
+"""
+Inbox state for conversations.
+
+Each Conversation points at its last message and keeps a short preview of
+it; each participant has a ConversationReadState row holding their read
+watermark (``last_read_message``) and unread count, plus a copy of the
+conversation's last-message time. messaging.signals applies every new
+message to these rows in one transaction, so the inbox is a single indexed
+query over the viewer's read states, however long the conversations get.
+``rebuild_inbox`` recomputes everything from the messages.
+"""
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+PREVIEW_LENGTH = 120
+
+
+def preview(content):
+    content = ' '.join(content.split())
+    return content if len(content) <= PREVIEW_LENGTH else content[:PREVIEW_LENGTH - 3] + '...'
+
+
+def _models():
+    return (
+        global_apps.get_model('messaging', 'Conversation'),
+        global_apps.get_model('messaging', 'Message'),
+        global_apps.get_model('messaging', 'ConversationReadState'),
+    )
+
+
+def add_participants(conversation_id, user_ids):
+    """Give new participants a read state; earlier messages count as read"""
+    Conversation, _, ReadState = _models()
+    conversation = Conversation.objects.only('last_message', 'last_message_at').get(pk=conversation_id)
+    ReadState.objects.bulk_create([
+        ReadState(
+            conversation_id=conversation_id, user_id=user_id,
+            last_read_message_id=conversation.last_message_id, last_message_at=conversation.last_message_at,
+        )
+        for user_id in user_ids
+    ], ignore_conflicts=True)
+
+
+def remove_participants(conversation_id, user_ids):
+    _models()[2].objects.filter(conversation_id=conversation_id, user_id__in=user_ids).delete()
+
+
+def record_messages(messages):
+    """
+    Point each conversation at its newest of ``messages`` and count them as
+    unread for everyone but their senders, with a few updates per conversation
+    however many messages arrived together.
+    """
+    Conversation, _, ReadState = _models()
+    by_conversation = {}
+    for message in messages:
+        by_conversation.setdefault(message.conversation_id, []).append(message)
+    with transaction.atomic():
+        for conversation_id, batch in by_conversation.items():
+            last = max(batch, key=lambda message: (message.created_at, message.pk))
+            Conversation.objects.filter(pk=conversation_id).update(
+                last_message=last, last_message_at=last.created_at,
+                last_message_preview=preview(last.content), updated_at=timezone.now(),
+            )
+            sent = {}
+            for message in batch:
+                sent[message.sender_id] = sent.get(message.sender_id, 0) + 1
+            # Everyone gets the whole batch as unread, then senders take back their own
+            states = ReadState.objects.filter(conversation_id=conversation_id)
+            states.update(unread_count=F('unread_count') + len(batch), last_message_at=last.created_at)
+            for sender_id, count in sent.items():
+                states.filter(user_id=sender_id).update(unread_count=F('unread_count') - count)
+
+
+def record_message(message):
+    """Point the conversation at ``message`` and count it as unread for everyone but its sender"""
+    record_messages([message])
+
+
+def mark_read(conversation, user_id):
+    """Move ``user_id``'s watermark to the last message; returns how many were unread"""
+    ReadState = _models()[2]
+    with transaction.atomic():
+        state = ReadState.objects.select_for_update().filter(
+            conversation_id=conversation.pk, user_id=user_id
+        ).first()
+        if state is None:
+            return 0
+        cleared = state.unread_count
+        if cleared or state.last_read_message_id != conversation.last_message_id:
+            state.unread_count = 0
+            state.last_read_message_id = conversation.last_message_id
+            state.save(update_fields=['unread_count', 'last_read_message'])
+    return cleared
+
+
+def mark_all_read(user_id):
+    """Clear every unread conversation of ``user_id``; returns the number of conversations"""
+    Conversation, _, ReadState = _models()
+    return ReadState.objects.filter(user_id=user_id, unread_count__gt=0).update(
+        unread_count=0,
+        last_read_message_id=Subquery(
+            Conversation.objects.filter(pk=OuterRef('conversation_id')).values('last_message_id')[:1]
+        ),
+    )
+
+
+def unread_total(user_id):
+    ReadState = _models()[2]
+    return sum(ReadState.objects.filter(user_id=user_id, unread_count__gt=0).values_list('unread_count', flat=True))
+
+
+def inbox(user_id):
+    """The conversations of ``user_id``, most recently active first, with ``unread_count`` annotated"""
+    Conversation = _models()[0]
+    return Conversation.objects.filter(read_states__user_id=user_id).annotate(
+        unread_count=F('read_states__unread_count'),
+        activity=F('read_states__last_message_at'),
+    ).select_related('last_message__sender').order_by(F('activity').desc(nulls_last=True), '-pk')
+
+
+def rebuild_inbox(batch_size=500):
+    """
+    Recompute last-message pointers and every read state from the messages,
+    keeping each participant's read watermark. Returns the number of read
+    states written.
+    """
+    Conversation, Message, ReadState = _models()
+    participants = Conversation.participants.through
+    latest = Message.objects.filter(conversation_id=OuterRef('pk')).order_by('-created_at', '-pk')
+
+    with transaction.atomic():
+        conversations = list(Conversation.objects.annotate(
+            latest_id=Subquery(latest.values('pk')[:1]),
+        ).only('pk'))
+        contents = Message.objects.in_bulk([c.latest_id for c in conversations if c.latest_id])
+        for conversation in conversations:
+            message = contents.get(conversation.latest_id)
+            conversation.last_message_id = message.pk if message else None
+            conversation.last_message_at = message.created_at if message else None
+            conversation.last_message_preview = preview(message.content) if message else ''
+        Conversation.objects.bulk_update(
+            conversations, ['last_message', 'last_message_at', 'last_message_preview'], batch_size=batch_size
+        )
+        by_pk = {conversation.pk: conversation for conversation in conversations}
+
+        # The watermark never moves back: keep each participant's current one, or
+        # the newest message they sent or that was flagged read before watermarks
+        kept = dict(
+            ((conversation_id, user_id), last_read)
+            for conversation_id, user_id, last_read in ReadState.objects.filter(
+                last_read_message__isnull=False
+            ).values_list('conversation_id', 'user_id', 'last_read_message_id')
+        )
+        sent_by = dict(
+            ((conversation_id, sender_id), last_sent)
+            for conversation_id, sender_id, last_sent in Message.objects.order_by().values(
+                'conversation_id', 'sender_id'
+            ).annotate(last_sent=Max('pk')).values_list('conversation_id', 'sender_id', 'last_sent')
+        )
+        flagged_read = dict(
+            Message.objects.filter(is_read=True).order_by().values('conversation_id')
+            .annotate(last=Max('pk')).values_list('conversation_id', 'last')
+        )
+
+        ReadState.objects.all().delete()
+        states = []
+        for conversation_id, user_id in participants.objects.values_list('conversation_id', 'user_id').iterator():
+            seen = [
+                pk for pk in (
+                    kept.get((conversation_id, user_id)), flagged_read.get(conversation_id),
+                    sent_by.get((conversation_id, user_id)),
+                ) if pk
+            ]
+            states.append(ReadState(
+                conversation_id=conversation_id, user_id=user_id, last_read_message_id=max(seen, default=None),
+                last_message_at=by_pk[conversation_id].last_message_at,
+            ))
+        ReadState.objects.bulk_create(states, batch_size=batch_size)
+
+        # Unread is whatever others sent past the watermark
+        unread = Message.objects.filter(
+            conversation_id=OuterRef('conversation_id'), pk__gt=Coalesce(OuterRef('last_read_message_id'), 0),
+        ).exclude(sender_id=OuterRef('user_id')).order_by().values('conversation_id').annotate(
+            total=Count('pk')
+        ).values('total')
+        ReadState.objects.update(unread_count=Coalesce(Subquery(unread), 0))
+    return len(states)
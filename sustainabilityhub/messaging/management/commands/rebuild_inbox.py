@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from messaging.inbox import rebuild_inbox
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds conversation last-message pointers and per-participant read states from the messages'
+
+    def handle(self, *args, **options):
+        written = rebuild_inbox()
+        self.stdout.write(self.style.SUCCESS(f'[OK] Wrote {written} conversation read states'))
@@ -0,0 +1,104 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:00
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def _preview(content):
+    content = ' '.join(content.split())
+    return content if len(content) <= 120 else content[:117] + '...'
+
+
+def backfill_inbox(apps, schema_editor):
+    Conversation = apps.get_model('messaging', 'Conversation')
+    Message = apps.get_model('messaging', 'Message')
+    ReadState = apps.get_model('messaging', 'ConversationReadState')
+
+    latest = Message.objects.filter(conversation_id=OuterRef('pk')).order_by('-created_at', '-pk')
+    conversations = list(Conversation.objects.annotate(latest_id=Subquery(latest.values('pk')[:1])).only('pk'))
+    contents = Message.objects.in_bulk([c.latest_id for c in conversations if c.latest_id])
+    for conversation in conversations:
+        message = contents.get(conversation.latest_id)
+        conversation.last_message_id = message.pk if message else None
+        conversation.last_message_at = message.created_at if message else None
+        conversation.last_message_preview = _preview(message.content) if message else ''
+    Conversation.objects.bulk_update(
+        conversations, ['last_message', 'last_message_at', 'last_message_preview'], batch_size=500
+    )
+    last_message_at = {conversation.pk: conversation.last_message_at for conversation in conversations}
+
+    # Everyone has read up to the newest message they sent or that was flagged read
+    sent_by = dict(
+        ((conversation_id, sender_id), last_sent)
+        for conversation_id, sender_id, last_sent in Message.objects.order_by().values(
+            'conversation_id', 'sender_id'
+        ).annotate(last_sent=Max('pk')).values_list('conversation_id', 'sender_id', 'last_sent')
+    )
+    flagged_read = dict(
+        Message.objects.filter(is_read=True).order_by().values('conversation_id')
+        .annotate(last=Max('pk')).values_list('conversation_id', 'last')
+    )
+    states = []
+    participants = Conversation.participants.through
+    for conversation_id, user_id in participants.objects.values_list('conversation_id', 'user_id').iterator():
+        seen = [pk for pk in (flagged_read.get(conversation_id), sent_by.get((conversation_id, user_id))) if pk]
+        states.append(ReadState(
+            conversation_id=conversation_id, user_id=user_id, last_read_message_id=max(seen, default=None),
+            last_message_at=last_message_at[conversation_id],
+        ))
+    ReadState.objects.bulk_create(states, batch_size=500)
+
+    unread = Message.objects.filter(
+        conversation_id=OuterRef('conversation_id'), pk__gt=Coalesce(OuterRef('last_read_message_id'), 0),
+    ).exclude(sender_id=OuterRef('user_id')).order_by().values('conversation_id').annotate(
+        total=Count('pk')
+    ).values('total')
+    ReadState.objects.update(unread_count=Coalesce(Subquery(unread), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('messaging', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='messaging.message'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_preview',
+            field=models.CharField(blank=True, max_length=120),
+        ),
+        migrations.CreateModel(
+            name='ConversationReadState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('last_message_at', models.DateTimeField(blank=True, null=True)),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_states', to='messaging.conversation')),
+                ('last_read_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='messaging.message')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversation_states', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-last_message_at'], name='messaging_inbox_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='conversationreadstate',
+            constraint=models.UniqueConstraint(fields=('conversation', 'user'), name='unique_conversation_read_state'),
+        ),
+        migrations.RunPython(backfill_inbox, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:12
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def backfill_direct_keys(apps, schema_editor):
+    Conversation = apps.get_model('messaging', 'Conversation')
+    participants = Conversation.participants.through
+    two_person = participants.objects.values('conversation_id').annotate(
+        people=Count('user_id')
+    ).filter(people=2).values('conversation_id')
+    pairs = {}
+    for conversation_id, user_id in participants.objects.filter(
+        conversation_id__in=two_person
+    ).values_list('conversation_id', 'user_id'):
+        pairs.setdefault(conversation_id, []).append(user_id)
+
+    # Where a pair has several conversations, the most recently active one gets the key
+    activity = dict(
+        Conversation.objects.filter(pk__in=pairs).annotate(
+            active=Max('messages__created_at')
+        ).values_list('pk', 'active')
+    )
+    keyed = {}
+    for conversation_id in sorted(pairs, key=lambda pk: (activity.get(pk) is not None, activity.get(pk), pk)):
+        low, high = sorted(pairs[conversation_id])
+        keyed[f'{low}:{high}'] = conversation_id
+    Conversation.objects.bulk_update(
+        [Conversation(pk=conversation_id, direct_key=key) for key, conversation_id in keyed.items()],
+        ['direct_key'], batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0003_message_history_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='direct_key',
+            field=models.CharField(blank=True, editable=False, max_length=41, null=True, unique=True),
+        ),
+        migrations.RunPython(backfill_direct_keys, migrations.RunPython.noop),
+    ]
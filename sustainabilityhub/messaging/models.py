@@ -7,6 +7,13 @@ class Conversation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Denormalized inbox fields, maintained by messaging.inbox
+    last_message = models.ForeignKey('Message', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    last_message_preview = models.CharField(max_length=120, blank=True)
+    # "<lower user id>:<higher user id>" for one-to-one conversations, see messaging.direct
+    direct_key = models.CharField(max_length=41, unique=True, null=True, blank=True, editable=False)
+    
     class Meta:
         ordering = ['-updated_at']
     
@@ -25,6 +32,30 @@ class Message(models.Model):
     
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['conversation', 'created_at', 'id'], name='messaging_history_idx'),
+        ]
     
     def __str__(self):
         return f'Message from {self.sender.username} in conversation {self.conversation.id}'
+
+
+class ConversationReadState(models.Model):
+    """A participant's read watermark and unread count in one conversation"""
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='read_states')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='conversation_states')
+    last_read_message = models.ForeignKey(Message, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    unread_count = models.PositiveIntegerField(default=0)
+    # Copy of Conversation.last_message_at so the inbox sorts on this table's index
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['conversation', 'user'], name='unique_conversation_read_state'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-last_message_at'], name='messaging_inbox_idx'),
+        ]
+    
+    def __str__(self):
+        return f'{self.user_id} in conversation {self.conversation_id}: {self.unread_count} unread'
@@ -0,0 +1,61 @@
+"""Direct messages over the WebSocket gateway (see sustainabilityhub.realtime)"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from notifications import unread
+from notifications.utils import mark_group_read
+from sustainabilityhub.realtime import Room, publish_on_commit
+from . import inbox
+from .models import Conversation, Message
+from .tasks import notification_group
+
+
+def serialize(message, username):
+    return {
+        'type': 'message',
+        'id': message.pk,
+        'sender_id': message.sender_id,
+        'sender': username,
+        'content': message.content,
+        'created_at': message.created_at.isoformat(),
+    }
+
+
+def publish_messages(messages):
+    """Send ``messages`` to the sockets of their conversations once they commit; returns the events"""
+    usernames = dict(
+        get_user_model().objects.filter(pk__in={message.sender_id for message in messages})
+        .values_list('pk', 'username')
+    )
+    events = [serialize(message, usernames.get(message.sender_id, '')) for message in messages]
+    for message, event in zip(messages, events):
+        publish_on_commit(ConversationRoom.channel(message.conversation_id), event)
+    return events
+
+
+class ConversationRoom(Room):
+    kind = 'messages'
+
+    def allowed(self, pairs):
+        return pairs & set(Conversation.participants.through.objects.filter(
+            conversation_id__in={room_id for room_id, _ in pairs},
+            user_id__in={user_id for _, user_id in pairs}, user__is_active=True,
+        ).values_list('conversation_id', 'user_id'))
+
+    def persist(self, items):
+        from .signals import messages_created
+
+        with transaction.atomic():
+            messages = Message.objects.bulk_create([
+                Message(conversation_id=room_id, sender_id=user_id, content=content)
+                for room_id, user_id, content in items
+            ])
+            return messages_created(messages)
+
+    def read(self, user, room_id):
+        conversation = Conversation.objects.only('pk', 'last_message').filter(pk=room_id).first()
+        if conversation is None:
+            return None
+        cleared = inbox.mark_read(conversation, user.pk)
+        unread.adjust(unread.MESSAGES, [user.pk], -cleared)
+        mark_group_read(user.pk, notification_group(room_id))
+        return {'type': 'read', 'user_id': user.pk, 'message_id': conversation.last_message_id}
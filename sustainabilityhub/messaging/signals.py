@@ -1,32 +1,63 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_save
 from django.dispatch import receiver
-from .models import Message
-from notifications.utils import create_notification
+from .models import Conversation, Message
+from . import direct, inbox
+from .realtime import publish_messages
+from notifications import unread
+from sustainabilityhub.dispatch import enqueue
+from .tasks import notify_message_recipients
+
+
+def messages_created(messages):
+    """
+    Move the inbox, bump unread badges, notify recipients and reach open
+    sockets for newly created ``messages``; bulk inserts call this directly.
+    Returns the events published for them.
+    """
+    inbox.record_messages(messages)
+    participants = {}
+    for conversation_id, user_id in Conversation.participants.through.objects.filter(
+        conversation_id__in={message.conversation_id for message in messages}
+    ).values_list('conversation_id', 'user_id'):
+        participants.setdefault(conversation_id, []).append(user_id)
+    received = {}
+    for message in messages:
+        for user_id in participants.get(message.conversation_id, ()):
+            if user_id != message.sender_id:
+                received[user_id] = received.get(user_id, 0) + 1
+    for user_id, count in received.items():
+        unread.adjust_on_commit(unread.MESSAGES, [user_id], count)
+    for message in messages:
+        enqueue(notify_message_recipients, message.pk, idempotency_key=f'message:{message.pk}')
+    return publish_messages(messages)
 
 
 @receiver(post_save, sender=Message)
-def notify_new_message(sender, instance, created, **kwargs):
-    """Send notification when a new message is received"""
+def message_created(sender, instance, created, **kwargs):
     if created:
-        # Get the other participant(s) in the conversation
-        conversation = instance.conversation
-        recipient = None
-        
-        for participant in conversation.participants.all():
-            if participant != instance.sender:
-                recipient = participant
-                break
-        
-        if recipient:
-            from django.urls import reverse
-            url = reverse('messaging:conversation_detail', kwargs={'pk': conversation.pk})
-            
-            create_notification(
-                recipient=recipient,
-                notification_type='message',
-                title=f'New message from {instance.sender.username}',
-                message=instance.content[:100] + '...' if len(instance.content) > 100 else instance.content,
-                url=url,
-                content_object=instance
-            )
+        messages_created([instance])
+
+
+@receiver(m2m_changed, sender=Conversation.participants.through)
+def sync_read_states(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep one read state per participant"""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if action == 'pre_clear':
+        pairs = (
+            [(conversation_id, instance.pk) for conversation_id in instance.conversations.values_list('pk', flat=True)]
+            if reverse else [(instance.pk, user_id) for user_id in instance.participants.values_list('pk', flat=True)]
+        )
+    else:
+        pairs = [(pk, instance.pk) for pk in pk_set] if reverse else [(instance.pk, pk) for pk in pk_set]
+    update = inbox.add_participants if action == 'post_add' else inbox.remove_participants
+    for conversation_id, user_id in pairs:
+        update(conversation_id, [user_id])
+
 
+@receiver(m2m_changed, sender=Conversation.participants.through)
+def check_direct_key(sender, instance, action, reverse, pk_set, **kwargs):
+    """A direct conversation whose participants change is no longer the pair's conversation"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        for conversation_id in (pk_set or ()) if reverse else [instance.pk]:
+            direct.release_direct_key(conversation_id)
@@ -0,0 +1,42 @@
+from celery import shared_task
+from django.urls import reverse
+from notifications.utils import coalesce_notification
+from sustainabilityhub.dispatch import IdempotentTask
+from .models import ConversationReadState, Message
+
+
+NOTIFICATION_GROUP = 'conversation:'
+
+
+def notification_group(conversation_id):
+    return f'{NOTIFICATION_GROUP}{conversation_id}'
+
+
+@shared_task(base=IdempotentTask)
+def notify_message_recipients(message_id):
+    """
+    Notify the other participant of a conversation about a new message,
+    merged into their unread notification of the conversation if they have one
+    """
+    message = Message.objects.select_related('sender', 'conversation').filter(pk=message_id).first()
+    if message is None:
+        return 0
+
+    recipient = message.conversation.participants.exclude(pk=message.sender_id).order_by('pk').first()
+    if recipient is None:
+        return 0
+    if ConversationReadState.objects.filter(
+        conversation_id=message.conversation_id, user=recipient, last_read_message_id__gte=message.pk
+    ).exists():
+        # Read before this task ran
+        return 0
+
+    url = reverse('messaging:conversation_detail', kwargs={'pk': message.conversation_id})
+    coalesce_notification(
+        recipient.pk, notification_group(message.conversation_id), 'message',
+        f'New message from {message.sender.username}',
+        message.content[:100] + '...' if len(message.content) > 100 else message.content,
+        url=url,
+        content_object=message,
+    )
+    return 1
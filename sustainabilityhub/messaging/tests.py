@@ -1,3 +1,310 @@
-from django.test import TestCase
+import asyncio
+import json
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.db import IntegrityError, connection, transaction
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from sustainabilityhub.realtime import get_batcher, get_room, websocket_application
+from . import direct, history, inbox
+from .models import Conversation, ConversationReadState, Message
+
+User = get_user_model()
+
+
+class InboxTests(TestCase):
+    """The inbox reads denormalized last-message and read-state rows"""
+
+    def setUp(self):
+        cache.clear()
+        self.alice, self.bob, self.carol = [
+            User.objects.create_user(name, f'{name}@example.com', 'pw') for name in ('alice', 'bob', 'carol')
+        ]
+        self.first = Conversation.objects.create()
+        self.first.participants.add(self.alice, self.bob)
+        self.second = Conversation.objects.create()
+        self.second.participants.add(self.alice, self.carol)
+
+    def send(self, conversation, sender, content):
+        return Message.objects.create(conversation=conversation, sender=sender, content=content)
+
+    def state(self, conversation, user):
+        return ConversationReadState.objects.get(conversation=conversation, user=user)
+
+    def test_messages_move_pointer_preview_and_unread_counts(self):
+        self.send(self.first, self.bob, 'hello')
+        last = self.send(self.first, self.bob, 'are   you\nthere? ' + 'x' * 200)
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.last_message, last)
+        self.assertEqual(len(self.first.last_message_preview), inbox.PREVIEW_LENGTH)
+        self.assertTrue(self.first.last_message_preview.startswith('are you there? x'))
+        self.assertEqual(self.state(self.first, self.alice).unread_count, 2)
+        self.assertEqual(self.state(self.first, self.bob).unread_count, 0)
+        self.assertEqual(inbox.unread_total(self.alice.pk), 2)
+
+        self.assertEqual(inbox.mark_read(self.first, self.alice.pk), 2)
+        state = self.state(self.first, self.alice)
+        self.assertEqual((state.unread_count, state.last_read_message_id), (0, last.pk))
+
+    def test_inbox_is_one_query_ordered_by_activity(self):
+        for i in range(5):
+            self.send(self.first, self.bob, f'first {i}')
+        self.send(self.second, self.carol, 'newer')
+        with self.assertNumQueries(1):
+            rows = [(c.pk, c.unread_count, c.last_message.sender.username) for c in inbox.inbox(self.alice.pk)]
+        self.assertEqual(rows, [(self.second.pk, 1, 'carol'), (self.first.pk, 5, 'bob')])
+        self.assertEqual([c.pk for c in inbox.inbox(self.bob.pk)], [self.first.pk])
+
+        self.client.force_login(self.alice)
+        response = self.client.get('/messages/')
+        self.assertContains(response, '5 new')
+        self.assertEqual(response.context['total_unread'], 6)
+
+    def test_participant_changes_and_rebuild(self):
+        self.send(self.first, self.bob, 'before carol')
+        self.first.participants.add(self.carol)
+        self.assertEqual(self.state(self.first, self.carol).unread_count, 0)
+        self.first.participants.remove(self.carol)
+        self.assertFalse(ConversationReadState.objects.filter(conversation=self.first, user=self.carol).exists())
+
+        self.send(self.first, self.bob, 'second')
+        ConversationReadState.objects.update(unread_count=7)
+        Conversation.objects.update(last_message=None, last_message_preview='')
+        self.assertEqual(inbox.rebuild_inbox(), 4)
+        self.assertEqual(self.state(self.first, self.alice).unread_count, 2)
+        self.assertEqual(self.state(self.second, self.alice).unread_count, 0)
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.last_message_preview, 'second')
+
+    def test_rebuild_keeps_read_watermarks(self):
+        read = self.send(self.first, self.bob, 'seen')
+        self.client.force_login(self.alice)
+        self.client.get(f'/messages/{self.first.pk}/')
+        later = self.send(self.first, self.bob, 'not yet')
+        ConversationReadState.objects.update(unread_count=7)
+
+        inbox.rebuild_inbox()
+        state = self.state(self.first, self.alice)
+        self.assertEqual((state.unread_count, state.last_read_message_id), (1, read.pk))
+        self.assertEqual(self.state(self.first, self.bob).last_read_message_id, later.pk)
+        self.assertEqual(self.state(self.first, self.bob).unread_count, 0)
+
+
+@override_settings(MESSAGE_HISTORY_PAGE_SIZE=3)
+class MessageHistoryTests(TestCase):
+    """Conversations open on their newest window and page backwards by cursor"""
+
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        self.bob = User.objects.create_user('bob', 'bob@example.com', 'pw')
+        self.conversation = Conversation.objects.create()
+        self.conversation.participants.add(self.alice, self.bob)
+
+    def fill(self, count):
+        for i in range(count):
+            Message.objects.create(conversation=self.conversation, sender=self.bob, content=f'm{i}')
+        # Shared timestamps must not repeat or skip messages between windows
+        Message.objects.filter(conversation=self.conversation).update(created_at=timezone.now())
+
+    def test_windows_walk_back_without_gaps(self):
+        self.fill(7)
+        seen, cursor = [], None
+        while True:
+            messages, cursor = history.window(self.conversation, before=cursor)
+            seen = [message.content for message in messages] + seen
+            if cursor is None:
+                break
+        self.assertEqual(seen, [f'm{i}' for i in range(7)])
+        with self.assertRaises(history.InvalidCursor):
+            history.window(self.conversation, before='nonsense')
+
+    def test_opening_costs_the_same_however_long_the_thread(self):
+        self.client.force_login(self.alice)
+        self.client.get(f'/messages/{self.conversation.pk}/')
+        self.fill(4)
+        with CaptureQueriesContext(connection) as short:
+            response = self.client.get(f'/messages/{self.conversation.pk}/')
+        self.assertEqual([m.content for m in response.context['message_list']], ['m1', 'm2', 'm3'])
+        self.assertIsNotNone(response.context['older_cursor'])
+
+        self.fill(40)
+        with CaptureQueriesContext(connection) as long:
+            self.client.get(f'/messages/{self.conversation.pk}/')
+        self.assertEqual(len(long), len(short))
+        self.assertEqual(self.client.get(f'/messages/{self.conversation.pk}/?before=bad').status_code, 404)
+
+    def test_receipts_follow_the_readers_watermark(self):
+        sent = Message.objects.create(conversation=self.conversation, sender=self.alice, content='hi')
+        self.client.force_login(self.alice)
+        page = self.client.get(f'/messages/{self.conversation.pk}/')
+        self.assertFalse(page.context['message_list'][0].seen)
+
+        self.client.force_login(self.bob)
+        self.client.get(f'/messages/{self.conversation.pk}/')
+        self.client.force_login(self.alice)
+        page = self.client.get(f'/messages/{self.conversation.pk}/')
+        self.assertEqual([(m.pk, m.seen) for m in page.context['message_list']], [(sent.pk, True)])
+
+
+@override_settings(REALTIME_BACKEND='memory', REALTIME_FLUSH_INTERVAL=0.01)
+class RealtimeGatewayTests(TransactionTestCase):
+    """Conversation sockets carry messages, typing and read receipts"""
+
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        self.bob = User.objects.create_user('bob', 'bob@example.com', 'pw')
+        self.eve = User.objects.create_user('eve', 'eve@example.com', 'pw')
+        self.conversation = Conversation.objects.create()
+        self.conversation.participants.add(self.alice, self.bob)
+        self.path = f'/ws/messages/{self.conversation.pk}/'
+        self.cookies = {}
+        for user in (self.alice, self.bob, self.eve):
+            client = Client()
+            client.force_login(user)
+            self.cookies[user.pk] = client.cookies[settings.SESSION_COOKIE_NAME].value
+
+    def scope(self, user=None, path=None, origin='http://localhost'):
+        headers = [(b'origin', origin.encode())]
+        if user is not None:
+            headers.append((b'cookie', f'{settings.SESSION_COOKIE_NAME}={self.cookies[user.pk]}'.encode()))
+        return {'type': 'websocket', 'path': path or self.path, 'headers': headers}
+
+    async def connect(self, scope):
+        socket = ApplicationCommunicator(websocket_application, scope)
+        await socket.send_input({'type': 'websocket.connect'})
+        return socket, await socket.receive_output(timeout=2)
+
+    async def receive(self, socket, kind):
+        while True:
+            event = json.loads((await socket.receive_output(timeout=2))['text'])
+            if event['type'] == kind:
+                return event
+
+    async def close(self, *sockets):
+        for socket in sockets:
+            await socket.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await socket.wait(timeout=2)
+
+    async def test_only_participants_connect(self):
+        for scope, code in [
+            (self.scope(), 4403),
+            (self.scope(self.eve), 4403),
+            (self.scope(self.alice, path='/ws/nowhere/1/'), 4404),
+            (self.scope(self.alice, origin='https://evil.example'), 4404),
+        ]:
+            _, reply = await self.connect(scope)
+            self.assertEqual(reply, {'type': 'websocket.close', 'code': code})
+
+    async def test_messages_typing_and_receipts(self):
+        alice, accepted = await self.connect(self.scope(self.alice))
+        self.assertEqual(accepted['type'], 'websocket.accept')
+        bob, _ = await self.connect(self.scope(self.bob))
+
+        await bob.send_input({'type': 'websocket.receive', 'text': json.dumps({'type': 'typing'})})
+        self.assertEqual((await self.receive(alice, 'typing'))['username'], 'bob')
+
+        await alice.send_input({'type': 'websocket.receive', 'text': json.dumps(
+            {'type': 'message', 'content': ' hello bob ', 'client_id': 'c1'}
+        )})
+        ack = await self.receive(alice, 'ack')
+        self.assertEqual((ack['client_id'], ack['message']['content']), ('c1', 'hello bob'))
+        delivered = await self.receive(bob, 'message')
+        self.assertEqual((delivered['id'], delivered['sender']), (ack['message']['id'], 'alice'))
+        state = await ConversationReadState.objects.aget(conversation=self.conversation, user=self.bob)
+        self.assertEqual(state.unread_count, 1)
+
+        await bob.send_input({'type': 'websocket.receive', 'text': json.dumps({'type': 'read'})})
+        receipt = await self.receive(alice, 'read')
+        self.assertEqual((receipt['user_id'], receipt['message_id']), (self.bob.pk, delivered['id']))
+        state = await ConversationReadState.objects.aget(conversation=self.conversation, user=self.bob)
+        self.assertEqual(state.unread_count, 0)
+
+        await alice.send_input({'type': 'websocket.receive', 'text': 'not json'})
+        self.assertIn('error', await self.receive(alice, 'error'))
+        await self.close(alice, bob)
+
+    async def test_concurrent_messages_are_saved_together(self):
+        bob, _ = await self.connect(self.scope(self.bob))
+        room = get_room('messages')
+        with self.settings(REALTIME_BATCH_SIZE=3, REALTIME_FLUSH_INTERVAL=5):
+            saved = await asyncio.gather(*[
+                get_batcher().submit(room, self.conversation.pk, self.alice.pk, f'm{i}') for i in range(3)
+            ])
+        self.assertEqual([message['content'] for message in saved], ['m0', 'm1', 'm2'])
+        self.assertEqual([(await self.receive(bob, 'message'))['content'] for _ in range(3)], ['m0', 'm1', 'm2'])
+        conversation = await Conversation.objects.aget(pk=self.conversation.pk)
+        self.assertEqual((conversation.last_message_id, conversation.last_message_preview), (saved[-1]['id'], 'm2'))
+        state = await ConversationReadState.objects.aget(conversation=self.conversation, user=self.bob)
+        self.assertEqual(state.unread_count, 3)
+        await self.close(bob)
+
+    @override_settings(REALTIME_AUTH_TTL=0)
+    async def test_removed_participants_cannot_post(self):
+        bob, _ = await self.connect(self.scope(self.bob))
+        await sync_to_async(self.conversation.participants.remove)(self.bob)
+        await bob.send_input({'type': 'websocket.receive', 'text': json.dumps(
+            {'type': 'message', 'content': 'still here?'}
+        )})
+        self.assertEqual(await bob.receive_output(timeout=2), {'type': 'websocket.close', 'code': 4403})
+        # Batches are checked too, whatever the socket believes
+        with self.assertRaises(PermissionDenied):
+            await get_batcher().submit(get_room('messages'), self.conversation.pk, self.eve.pk, 'sneaky')
+        self.assertFalse(await Message.objects.filter(sender__in=[self.bob, self.eve]).aexists())
+        await self.close(bob)
+
+    @override_settings(REALTIME_AUTH_TTL=0)
+    async def test_deactivated_participants_stop_receiving(self):
+        alice, _ = await self.connect(self.scope(self.alice))
+        bob, _ = await self.connect(self.scope(self.bob))
+        await User.objects.filter(pk=self.bob.pk).aupdate(is_active=False)
+        await alice.send_input({'type': 'websocket.receive', 'text': json.dumps({'type': 'message', 'content': 'hi'})})
+        await self.receive(alice, 'ack')
+        self.assertEqual(await bob.receive_output(timeout=2), {'type': 'websocket.close', 'code': 4403})
+        await self.close(alice, bob)
+
+
+class DirectConversationTests(TestCase):
+    """One-to-one conversations are found and created through their unique pair key"""
+
+    def setUp(self):
+        self.alice, self.bob, self.carol = [
+            User.objects.create_user(name, f'{name}@example.com', 'pw') for name in ('alice', 'bob', 'carol')
+        ]
+
+    def test_pair_maps_to_one_conversation(self):
+        group = Conversation.objects.create()
+        group.participants.add(self.alice, self.bob, self.carol)
+        conversation, created = direct.get_or_create_direct(self.alice, self.bob)
+        self.assertTrue(created)
+        self.assertNotEqual(conversation, group)
+        self.assertEqual(direct.get_or_create_direct(self.bob, self.alice), (conversation, False))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Conversation.objects.create(direct_key=direct.direct_key(self.bob.pk, self.alice.pk))
+
+        self.client.force_login(self.bob)
+        response = self.client.get(f'/messages/start/{self.alice.pk}/')
+        self.assertRedirects(response, f'/messages/{conversation.pk}/', fetch_redirect_response=False)
+        self.assertEqual(Conversation.objects.count(), 2)
+
+    def test_backfill_and_participant_changes(self):
+        older, newer = Conversation.objects.create(), Conversation.objects.create()
+        for conversation in (older, newer):
+            conversation.participants.add(self.alice, self.bob)
+        Message.objects.create(conversation=newer, sender=self.alice, content='latest')
+        self.assertEqual(direct.assign_direct_keys(), 1)
+        newer.refresh_from_db()
+        self.assertEqual(newer.direct_key, direct.direct_key(self.alice.pk, self.bob.pk))
+
+        newer.participants.add(self.carol)
+        newer.refresh_from_db()
+        self.assertIsNone(newer.direct_key)
+        conversation, created = direct.get_or_create_direct(self.alice, self.bob)
+        self.assertTrue(created)
@@ -1,11 +1,15 @@
+from django.http import Http404
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views.generic import ListView, DetailView, CreateView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.urls import reverse_lazy
-from django.db.models import Q, Max
-from django.utils import timezone
+from django.db.models import Q
+from notifications import unread
+from notifications.utils import mark_group_read
+from . import direct, history, inbox
 from .models import Conversation, Message
+from .tasks import NOTIFICATION_GROUP, notification_group
 
 
 class ConversationListView(LoginRequiredMixin, ListView):
@@ -14,21 +18,12 @@ class ConversationListView(LoginRequiredMixin, ListView):
     context_object_name = 'conversations'
     
     def get_queryset(self):
-        return Conversation.objects.filter(
-            participants=self.request.user
-        ).annotate(
-            last_message_time=Max('messages__created_at')
-        ).order_by('-last_message_time').distinct().prefetch_related(
-            'participants', 'messages'
-        )
+        return inbox.inbox(self.request.user.pk).prefetch_related('participants')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # Add total unread messages count
-        context['total_unread'] = Message.objects.filter(
-            conversation__participants=self.request.user,
-            is_read=False
-        ).exclude(sender=self.request.user).count()
+        context['total_unread'] = unread.get_counts(self.request.user.pk)[unread.MESSAGES]
         return context
 
 
@@ -42,11 +37,16 @@ class ConversationDetailView(LoginRequiredMixin, DetailView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['message_list'] = self.object.messages.all().select_related('sender')
-        # Mark messages as read
-        self.object.messages.exclude(
-            sender=self.request.user
-        ).filter(is_read=False).update(is_read=True, read_at=timezone.now())
+        try:
+            message_list, older = history.window(self.object, before=self.request.GET.get('before'))
+        except history.InvalidCursor:
+            raise Http404('Invalid cursor')
+        context['message_list'] = history.mark_receipts(self.object, message_list, self.request.user.pk)
+        context['older_cursor'] = older
+        # Reading is one watermark update, however many messages were unread
+        cleared = inbox.mark_read(self.object, self.request.user.pk)
+        unread.adjust(unread.MESSAGES, [self.request.user.pk], -cleared)
+        mark_group_read(self.request.user.pk, notification_group(self.object.pk))
         return context
 
 
@@ -84,12 +84,9 @@ def start_conversation(request, user_id):
         return redirect('profiles:detail', username=other_user.username)
     
     # Find existing conversation or create new one
-    conversations = Conversation.objects.filter(participants=request.user)
-    conversation = conversations.filter(participants=other_user).distinct().first()
+    conversation, created = direct.get_or_create_direct(request.user, other_user)
     
-    if not conversation:
-        conversation = Conversation.objects.create()
-        conversation.participants.add(request.user, other_user)
+    if created:
         messages.success(request, f'Started conversation with {other_user.username}.')
     
     return redirect('messaging:conversation_detail', pk=conversation.pk)
@@ -103,13 +100,9 @@ def mark_all_read(request):
     
     if request.method == 'POST':
         # Mark all unread messages in user's conversations as read
-        Message.objects.filter(
-            conversation__participants=request.user,
-            is_read=False
-        ).exclude(sender=request.user).update(
-            is_read=True,
-            read_at=timezone.now()
-        )
+        inbox.mark_all_read(request.user.pk)
+        unread.reset(unread.MESSAGES, request.user.pk)
+        mark_group_read(request.user.pk, NOTIFICATION_GROUP, prefix=True)
         messages.success(request, 'All messages marked as read!')
     
     return redirect('messaging:conversations')
@@ -4,6 +4,6 @@ from .models import Notification
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
-    list_display = ['recipient', 'notification_type', 'title', 'is_read', 'created_at']
+    list_display = ['recipient', 'notification_type', 'title', 'count', 'is_read', 'created_at']
     search_fields = ['title', 'message']
     list_filter = ['notification_type', 'is_read', 'created_at']
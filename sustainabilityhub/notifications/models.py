@@ -23,6 +23,9 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     url = models.URLField(blank=True)
+    # Unread notifications sharing a group_key are merged into one row; count is how many it stands for
+    group_key = models.CharField(max_length=100, blank=True, default='')
+    count = models.PositiveIntegerField(default=1)
     
     # Generic foreign key for linking to various content types
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, null=True, blank=True)
@@ -31,6 +34,13 @@ class Notification(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipient', 'group_key'],
+                condition=models.Q(is_read=False) & ~models.Q(group_key=''),
+                name='notifications_unread_group_uniq',
+            ),
+        ]
     
     def __str__(self):
         return f'{self.notification_type} notification for {self.recipient.username}'
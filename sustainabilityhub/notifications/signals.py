@@ -0,0 +1,26 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from . import unread
+from .models import Notification
+
+
+@receiver(post_init, sender=Notification)
+def remember_read_state(sender, instance, **kwargs):
+    instance._saved_is_read = instance.is_read
+
+
+@receiver(post_save, sender=Notification)
+def count_unread_notification(sender, instance, created, **kwargs):
+    """Keep the recipient's cached unread count in step with single-row saves"""
+    if created:
+        if not instance.is_read:
+            unread.adjust_on_commit(unread.NOTIFICATIONS, [instance.recipient_id], 1)
+    elif instance.is_read != instance._saved_is_read:
+        unread.adjust_on_commit(unread.NOTIFICATIONS, [instance.recipient_id], -1 if instance.is_read else 1)
+    instance._saved_is_read = instance.is_read
+
+
+@receiver(post_delete, sender=Notification)
+def uncount_deleted_notification(sender, instance, **kwargs):
+    if not instance._saved_is_read:
+        unread.adjust_on_commit(unread.NOTIFICATIONS, [instance.recipient_id], -1)
@@ -0,0 +1,24 @@
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+from sustainabilityhub.dispatch import IdempotentTask
+from .models import Notification
+from .utils import create_notifications
+
+
+@shared_task(base=IdempotentTask)
+def send_notifications(recipient_ids, notification_type, title, message, url='',
+                       content_type_id=None, object_id=None):
+    """Write one notification per recipient in bulk"""
+    return create_notifications(
+        recipient_ids, notification_type, title, message, url, content_type_id, object_id
+    )
+
+
+@shared_task
+def purge_read_notifications():
+    """Delete read notifications older than NOTIFICATION_RETENTION_DAYS"""
+    days = getattr(settings, 'NOTIFICATION_RETENTION_DAYS', 90)
+    cutoff = timezone.now() - timezone.timedelta(days=days)
+    deleted, _ = Notification.objects.filter(is_read=True, created_at__lt=cutoff).delete()
+    return deleted
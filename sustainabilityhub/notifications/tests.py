@@ -1,3 +1,161 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from messaging.models import Conversation, ConversationReadState, Message
+from messaging.realtime import ConversationRoom
+from projects.models import Project, ProjectUpdate
+from sustainabilityhub.context_processors import notifications_count
+from . import unread
+from .models import Notification
+from .utils import coalesce_notification, notify_many
 
-# Create your tests here.
+User = get_user_model()
+
+
+class UnreadCountTests(TestCase):
+    """Badge counts come from the cache and follow reads and writes"""
+
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        self.bob = User.objects.create_user('bob', 'bob@example.com', 'pw')
+        self.conversation = Conversation.objects.create()
+        self.conversation.participants.add(self.alice, self.bob)
+
+    def counts(self, user):
+        request = RequestFactory().get('/')
+        request.user = user
+        return notifications_count(request)
+
+    def notify(self, user):
+        return Notification.objects.create(recipient=user, notification_type='other', title='t', message='m')
+
+    def test_warm_counts_need_no_queries(self):
+        self.notify(self.alice)
+        self.assertEqual(self.counts(self.alice)['unread_notifications_count'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.notify(self.alice)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.counts(self.alice)['unread_notifications_count'], 2)
+
+    def test_reading_notifications_decrements_and_resets(self):
+        first, _ = self.notify(self.alice), self.notify(self.alice)
+        unread.get_counts(self.alice.pk)
+
+        self.client.force_login(self.alice)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(f'/notifications/{first.pk}/read/')
+        self.assertEqual(unread.get_counts(self.alice.pk)['notifications'], 1)
+
+        self.client.get('/notifications/mark-all-read/')
+        self.assertEqual(unread.get_counts(self.alice.pk)['notifications'], 0)
+
+    def test_message_counts_follow_conversation_reads(self):
+        unread.get_counts(self.bob.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            Message.objects.create(conversation=self.conversation, sender=self.alice, content='hi')
+            Message.objects.create(conversation=self.conversation, sender=self.alice, content='there')
+        self.assertEqual(self.counts(self.bob)['unread_messages_count'], 2)
+
+        self.client.force_login(self.bob)
+        self.client.get(f'/messages/{self.conversation.pk}/')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.counts(self.bob)['unread_messages_count'], 0)
+        self.assertEqual(unread.get_counts(self.bob.pk), {
+            'notifications': Notification.objects.filter(recipient=self.bob, is_read=False).count(),
+            'messages': 0,
+        })
+
+
+@override_settings(NOTIFICATION_BATCH_SIZE=50)
+class NotificationFanOutTests(TestCase):
+    """Project updates notify every member with batched INSERTs after commit"""
+
+    def test_project_update_fans_out_in_batches(self):
+        author = User.objects.create_user('author', 'author@example.com', 'pw')
+        project = Project.objects.create(title='Rain gardens', description='d', creator=author)
+        members = [User(username=f'member{i}', email=f'member{i}@example.com') for i in range(120)]
+        User.objects.bulk_create(members)
+        project.members.add(author, *User.objects.filter(username__startswith='member'))
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            update = ProjectUpdate.objects.create(project=project, author=author, content='Planted!')
+        with self.assertNumQueries(3 + 2):  # savepoint, three INSERTs, release
+            for callback in callbacks:
+                callback()
+
+        notifications = Notification.objects.filter(notification_type='project_update')
+        self.assertEqual(notifications.count(), 120)
+        self.assertFalse(notifications.filter(recipient=author).exists())
+        self.assertEqual(notifications.filter(object_id=update.pk, content_type__model='projectupdate').count(), 120)
+
+    def test_duplicate_dispatch_is_ignored(self):
+        user = User.objects.create_user('reader', 'reader@example.com', 'pw')
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(2):
+                notify_many([user.pk], 'other', 'Hello', 'Once only', idempotency_key='greeting:1')
+        self.assertEqual(Notification.objects.filter(recipient=user).count(), 1)
+
+
+class MessageCoalescingTests(TestCase):
+    """Unread message notifications of a conversation collapse into one row"""
+
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        self.bob = User.objects.create_user('bob', 'bob@example.com', 'pw')
+        self.conversation = Conversation.objects.create()
+        self.conversation.participants.add(self.alice, self.bob)
+
+    def send(self, content):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Message.objects.create(conversation=self.conversation, sender=self.alice, content=content)
+
+    def test_chat_burst_updates_one_row(self):
+        for number in range(1, 6):
+            self.send(f'message {number}')
+        notification = Notification.objects.get(recipient=self.bob)
+        self.assertEqual((notification.count, notification.message), (5, 'message 5'))
+        self.assertEqual(unread.get_counts(self.bob.pk)['notifications'], 1)
+
+        self.client.force_login(self.bob)
+        self.client.get(f'/messages/{self.conversation.pk}/')
+        notification.refresh_from_db()
+        self.assertTrue(notification.is_read)
+        self.send('after reading')
+        self.assertEqual(Notification.objects.filter(recipient=self.bob, is_read=False).get().count, 1)
+
+    def test_late_event_keeps_newest_preview(self):
+        first, second = self.send('first'), self.send('second')
+        self.assertFalse(coalesce_notification(
+            self.bob.pk, f'conversation:{self.conversation.pk}', 'message', 'New message', 'first',
+            content_object=first,
+        ))
+        notification = Notification.objects.get(recipient=self.bob)
+        self.assertEqual((notification.count, notification.message, notification.object_id), (3, 'second', second.pk))
+
+    def test_every_read_path_clears_the_row(self):
+        unread_rows = Notification.objects.filter(recipient=self.bob, is_read=False)
+        self.send('over the socket')
+        ConversationRoom().read(self.bob, self.conversation.pk)
+        self.assertFalse(unread_rows.exists())
+
+        self.send('from the inbox')
+        self.client.force_login(self.bob)
+        self.client.post('/messages/mark-all-read/')
+        self.assertFalse(unread_rows.exists())
+
+        # The page clears the row even when no message was unread any more
+        self.send('opened twice')
+        ConversationReadState.objects.filter(user=self.bob).update(unread_count=0)
+        self.client.get(f'/messages/{self.conversation.pk}/')
+        self.assertFalse(unread_rows.exists())
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            Message.objects.create(conversation=self.conversation, sender=self.alice, content='read first')
+        self.client.get(f'/messages/{self.conversation.pk}/')
+        for callback in callbacks:
+            callback()
+        self.assertFalse(unread_rows.exists())
+        self.assertEqual(Notification.objects.filter(recipient=self.bob).count(), 3)
@@ -0,0 +1,73 @@
+"""
+Cached unread badge counts.
+
+Every page shows how many unread notifications and messages the user has.
+Both numbers live in the cache under per-user keys: creating a notification
+or message increments them, reading decrements or resets them, and a cold
+key is recomputed from the database on the next read. Adjustments to a cold
+key are skipped, since the recompute will see the change anyway, and
+UNREAD_COUNT_TIMEOUT bounds how long any drift can survive.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+NOTIFICATIONS = 'notifications'
+MESSAGES = 'messages'
+KEY = 'unread:{}:{}'
+
+
+def _timeout():
+    return getattr(settings, 'UNREAD_COUNT_TIMEOUT', 3600)
+
+
+def _count_notifications(user_id):
+    from .models import Notification
+    return Notification.objects.filter(recipient_id=user_id, is_read=False).count()
+
+
+def _count_messages(user_id):
+    from messaging.inbox import unread_total
+    return unread_total(user_id)
+
+
+COUNTERS = {NOTIFICATIONS: _count_notifications, MESSAGES: _count_messages}
+
+
+def get_counts(user_id):
+    """Return {'notifications': n, 'messages': m}, recomputing only cold keys"""
+    keys = {kind: KEY.format(kind, user_id) for kind in COUNTERS}
+    cached = cache.get_many(list(keys.values()))
+    counts = {}
+    for kind, key in keys.items():
+        value = cached.get(key)
+        if value is None or value < 0:
+            value = COUNTERS[kind](user_id)
+            cache.set(key, value, _timeout())
+        counts[kind] = value
+    return counts
+
+
+def adjust(kind, user_ids, delta):
+    """Add ``delta`` to the warm counters of ``user_ids``"""
+    if not delta:
+        return
+    for user_id in user_ids:
+        try:
+            cache.incr(KEY.format(kind, user_id), delta)
+        except ValueError:
+            pass
+
+
+def adjust_on_commit(kind, user_ids, delta):
+    # Only count rows that actually got committed
+    user_ids = list(user_ids)
+    transaction.on_commit(lambda: adjust(kind, user_ids, delta))
+
+
+def reset(kind, user_id):
+    cache.set(KEY.format(kind, user_id), 0, _timeout())
+
+
+def invalidate(kind, *user_ids):
+    cache.delete_many([KEY.format(kind, user_id) for user_id in user_ids])
@@ -1,22 +1,142 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest
 from django.urls import reverse
 from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
+from . import unread
 from .models import Notification
 
 
 def create_notification(recipient, notification_type, title, message, url='', content_object=None):
     """Helper function to create notifications"""
-    notification = Notification.objects.create(
+    notification = Notification(
         recipient=recipient,
         notification_type=notification_type,
         title=title,
         message=message,
         url=url,
     )
-    
+
     if content_object:
         notification.content_type = ContentType.objects.get_for_model(content_object)
         notification.object_id = content_object.pk
-        notification.save()
-    
+    notification.save()
+
     return notification
 
+
+def coalesce_notification(recipient_id, group_key, notification_type, title, message, url='',
+                          content_object=None):
+    """
+    Fold a notification into the recipient's unread one with the same
+    ``group_key``, or start that row. The merged row counts every event it
+    stands for and shows the title and message of the newest object (highest
+    pk), whatever order the events arrive in. Returns True if a new row was
+    created, False if an unread one absorbed the event.
+    """
+    content_type_id = ContentType.objects.get_for_model(content_object).pk if content_object else None
+    object_id = content_object.pk if content_object else None
+    unread_row = Notification.objects.filter(recipient_id=recipient_id, group_key=group_key, is_read=False)
+
+    def merge():
+        if object_id is None:
+            latest = {'title': Value(title), 'message': Value(message)}
+        else:
+            latest = {
+                field: Case(
+                    When(object_id__lt=object_id, then=Value(value)), default=F(field),
+                    output_field=Notification._meta.get_field(field),
+                )
+                for field, value in (('title', title), ('message', message))
+            }
+            latest['object_id'] = Greatest(F('object_id'), Value(object_id))
+        # Bump created_at so the merged row sorts by its newest event
+        return unread_row.update(count=F('count') + 1, created_at=timezone.now(), **latest)
+
+    if not merge():
+        try:
+            with transaction.atomic():
+                Notification.objects.create(
+                    recipient_id=recipient_id, group_key=group_key, notification_type=notification_type,
+                    title=title, message=message, url=url, content_type_id=content_type_id, object_id=object_id,
+                )
+            return True
+        except IntegrityError:
+            # Another worker started the row first
+            merge()
+    return False
+
+
+def mark_group_read(recipient_id, group_key, prefix=False):
+    """
+    Mark the recipient's unread ``group_key`` notification read, or every
+    group starting with ``group_key`` if ``prefix``; returns how many were
+    """
+    lookup = {'group_key__startswith': group_key} if prefix else {'group_key': group_key}
+    marked = Notification.objects.filter(recipient_id=recipient_id, is_read=False, **lookup).update(is_read=True)
+    unread.adjust(unread.NOTIFICATIONS, [recipient_id], -marked)
+    return marked
+
+
+def _write_batch(batch):
+    Notification.objects.bulk_create(batch)
+    # bulk_create skips post_save, so bump the unread badges here
+    unread.adjust_on_commit(unread.NOTIFICATIONS, [n.recipient_id for n in batch], 1)
+    return len(batch)
+
+
+def create_notifications(recipient_ids, notification_type, title, message, url='',
+                         content_type_id=None, object_id=None):
+    """
+    Create the same notification for many recipients with one INSERT per
+    NOTIFICATION_BATCH_SIZE rows. Takes plain ids so it can run outside the
+    request that triggered it. Returns the number of notifications created.
+    """
+    batch_size = getattr(settings, 'NOTIFICATION_BATCH_SIZE', 50)
+    created = 0
+    batch = []
+    with transaction.atomic():
+        for recipient_id in recipient_ids:
+            batch.append(Notification(
+                recipient_id=recipient_id,
+                notification_type=notification_type,
+                title=title,
+                message=message,
+                url=url,
+                content_type_id=content_type_id,
+                object_id=object_id,
+            ))
+            if len(batch) >= batch_size:
+                created += _write_batch(batch)
+                batch = []
+        if batch:
+            created += _write_batch(batch)
+    return created
+
+
+def notify_many(recipient_ids, notification_type, title, message, url='', content_object=None,
+                idempotency_key=None):
+    """
+    Fan a notification out to ``recipient_ids`` in background tasks once the
+    current transaction commits. ``idempotency_key`` identifies the event being
+    announced so a duplicate dispatch does not notify anyone twice.
+    """
+    from sustainabilityhub.dispatch import enqueue
+    from .tasks import send_notifications
+
+    recipient_ids = list(recipient_ids)
+    content_type_id = object_id = None
+    if content_object is not None:
+        content_type_id = ContentType.objects.get_for_model(content_object).pk
+        object_id = content_object.pk
+
+    chunk_size = getattr(settings, 'NOTIFICATION_TASK_CHUNK_SIZE', 1000)
+    for start in range(0, len(recipient_ids), chunk_size):
+        enqueue(
+            send_notifications,
+            recipient_ids[start:start + chunk_size], notification_type, title, message, url,
+            content_type_id, object_id,
+            idempotency_key=f'{idempotency_key}:{start}' if idempotency_key else None,
+        )
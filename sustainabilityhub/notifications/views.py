@@ -3,6 +3,7 @@ from django.views.generic import ListView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.urls import reverse
+from . import unread
 from .models import Notification
 
 
@@ -19,10 +20,7 @@ class NotificationListView(LoginRequiredMixin, ListView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['unread_count'] = Notification.objects.filter(
-            recipient=self.request.user,
-            is_read=False
-        ).count()
+        context['unread_count'] = unread.get_counts(self.request.user.pk)[unread.NOTIFICATIONS]
         return context
 
 
@@ -46,6 +44,7 @@ def mark_all_as_read(request):
             recipient=request.user,
             is_read=False
         ).update(is_read=True)
+        unread.reset(unread.NOTIFICATIONS, request.user.pk)
         messages.success(request, 'All notifications marked as read.')
     return redirect('notifications:list')
 
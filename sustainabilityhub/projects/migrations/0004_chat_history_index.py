@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0003_projectchat_projectchatmessage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='projectchatmessage',
+            index=models.Index(fields=['chat_room', 'created_at', 'id'], name='projects_chat_history_idx'),
+        ),
+    ]
@@ -96,6 +96,9 @@ class ProjectChatMessage(models.Model):
     
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['chat_room', 'created_at', 'id'], name='projects_chat_history_idx'),
+        ]
     
     def __str__(self):
         return f'Message from {self.sender.username} in {self.chat_room.project.title}'
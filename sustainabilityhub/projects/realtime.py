@@ -0,0 +1,62 @@
+"""Project chat over the WebSocket gateway (see sustainabilityhub.realtime)"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from sustainabilityhub.realtime import Room, publish_on_commit
+from .models import Project, ProjectChat, ProjectChatMessage
+
+
+def serialize(message, project_id, username):
+    return {
+        'type': 'message',
+        'id': message.pk,
+        'project_id': project_id,
+        'sender_id': message.sender_id,
+        'sender': username,
+        'content': message.content,
+        'created_at': message.created_at.isoformat(),
+    }
+
+
+def publish_messages(messages):
+    """Send chat ``messages`` to the project's sockets once they commit; returns the events"""
+    projects = dict(
+        ProjectChat.objects.filter(pk__in={message.chat_room_id for message in messages})
+        .values_list('pk', 'project_id')
+    )
+    usernames = dict(
+        get_user_model().objects.filter(pk__in={message.sender_id for message in messages})
+        .values_list('pk', 'username')
+    )
+    events = [
+        serialize(message, projects[message.chat_room_id], usernames.get(message.sender_id, ''))
+        for message in messages
+    ]
+    for event in events:
+        publish_on_commit(ProjectChatRoom.channel(event['project_id']), event)
+    return events
+
+
+class ProjectChatRoom(Room):
+    kind = 'projects'
+
+    def allowed(self, pairs):
+        project_ids = {room_id for room_id, _ in pairs}
+        user_ids = {user_id for _, user_id in pairs}
+        creators = Project.objects.filter(
+            pk__in=project_ids, creator_id__in=user_ids, creator__is_active=True
+        ).values_list('pk', 'creator_id')
+        members = Project.members.through.objects.filter(
+            project_id__in=project_ids, user_id__in=user_ids, user__is_active=True
+        ).values_list('project_id', 'user_id')
+        return pairs & (set(creators) | set(members))
+
+    def persist(self, items):
+        with transaction.atomic():
+            rooms = {}
+            for project_id in {room_id for room_id, _, _ in items}:
+                rooms[project_id], _ = ProjectChat.objects.get_or_create(project_id=project_id)
+            messages = ProjectChatMessage.objects.bulk_create([
+                ProjectChatMessage(chat_room=rooms[room_id], sender_id=user_id, content=content)
+                for room_id, user_id, content in items
+            ])
+            return publish_messages(messages)
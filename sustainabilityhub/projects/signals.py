@@ -1,7 +1,8 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from .models import ProjectUpdate
-from notifications.utils import create_notification
+from .models import ProjectChatMessage, ProjectUpdate
+from .realtime import publish_messages
+from notifications.utils import notify_many
 
 
 @receiver(post_save, sender=ProjectUpdate)
@@ -13,24 +14,25 @@ def notify_project_update(sender, instance, created, **kwargs):
         url = reverse('projects:detail', kwargs={'pk': project.pk})
         
         # Notify all project members except the author
-        for member in project.members.exclude(id=instance.author.id):
-            create_notification(
-                recipient=member,
-                notification_type='project_update',
-                title=f'Update on {project.title}',
-                message=instance.content[:100] + '...' if len(instance.content) > 100 else instance.content,
-                url=url,
-                content_object=instance
-            )
+        recipients = list(project.members.exclude(id=instance.author_id).values_list('id', flat=True))
         
         # Also notify the creator if they're not a member
-        if project.creator not in project.members.all() and project.creator != instance.author:
-            create_notification(
-                recipient=project.creator,
-                notification_type='project_update',
-                title=f'Update on {project.title}',
-                message=instance.content[:100] + '...' if len(instance.content) > 100 else instance.content,
-                url=url,
-                content_object=instance
-            )
+        if project.creator_id != instance.author_id and project.creator_id not in recipients:
+            recipients.append(project.creator_id)
+        
+        notify_many(
+            recipients,
+            notification_type='project_update',
+            title=f'Update on {project.title}',
+            message=instance.content[:100] + '...' if len(instance.content) > 100 else instance.content,
+            url=url,
+            content_object=instance,
+            idempotency_key=f'project_update:{instance.pk}'
+        )
+
 
+@receiver(post_save, sender=ProjectChatMessage)
+def publish_chat_message(sender, instance, created, **kwargs):
+    """Reach open chat sockets with messages posted through the form"""
+    if created:
+        publish_messages([instance])
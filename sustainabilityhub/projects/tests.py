@@ -1,3 +1,81 @@
-from django.test import TestCase
+import json
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TransactionTestCase, override_settings
+from sustainabilityhub.realtime import websocket_application
+from .models import Project, ProjectChatMessage
+
+User = get_user_model()
+
+
+@override_settings(REALTIME_BACKEND='memory', REALTIME_FLUSH_INTERVAL=0.01)
+class ProjectChatSocketTests(TransactionTestCase):
+    """Project chat runs over the socket gateway instead of page reloads"""
+
+    def setUp(self):
+        cache.clear()
+        self.creator = User.objects.create_user('creator', 'creator@example.com', 'pw')
+        self.member = User.objects.create_user('member', 'member@example.com', 'pw')
+        self.outsider = User.objects.create_user('outsider', 'outsider@example.com', 'pw')
+        self.project = Project.objects.create(title='Community garden', description='d', creator=self.creator)
+        self.project.members.add(self.member)
+        self.clients = {}
+        for user in (self.creator, self.member, self.outsider):
+            self.clients[user.pk] = Client()
+            self.clients[user.pk].force_login(user)
+
+    async def connect(self, user):
+        cookie = self.clients[user.pk].cookies[settings.SESSION_COOKIE_NAME].value
+        socket = ApplicationCommunicator(websocket_application, {
+            'type': 'websocket', 'path': f'/ws/projects/{self.project.pk}/',
+            'headers': [(b'cookie', f'{settings.SESSION_COOKIE_NAME}={cookie}'.encode())],
+        })
+        await socket.send_input({'type': 'websocket.connect'})
+        return socket, await socket.receive_output(timeout=2)
+
+    async def receive(self, socket, kind):
+        while True:
+            event = json.loads((await socket.receive_output(timeout=2))['text'])
+            if event['type'] == kind:
+                return event
+
+    async def test_socket_and_form_messages_reach_members(self):
+        _, refused = await self.connect(self.outsider)
+        self.assertEqual(refused['code'], 4403)
+        creator, _ = await self.connect(self.creator)
+        member, _ = await self.connect(self.member)
+
+        await member.send_input({'type': 'websocket.receive', 'text': json.dumps(
+            {'type': 'message', 'content': 'Seeds arrived', 'client_id': 'x'}
+        )})
+        event = await self.receive(creator, 'message')
+        self.assertEqual((event['sender'], event['content'], event['project_id']),
+                         ('member', 'Seeds arrived', self.project.pk))
+        self.assertTrue(await ProjectChatMessage.objects.filter(pk=event['id']).aexists())
+
+        post = sync_to_async(self.clients[self.creator.pk].post)
+        await post(f'/projects/{self.project.pk}/chat/send/', {'content': 'Great, planting Sunday'})
+        # The member's socket also echoes their own message first
+        received = [(await self.receive(member, 'message'))['content'] for _ in range(2)]
+        self.assertEqual(received, ['Seeds arrived', 'Great, planting Sunday'])
+
+        for socket in (creator, member):
+            await socket.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await socket.wait(timeout=2)
+
+    @override_settings(REALTIME_AUTH_TTL=0)
+    async def test_members_who_leave_are_closed(self):
+        creator, _ = await self.connect(self.creator)
+        member, _ = await self.connect(self.member)
+        await sync_to_async(self.project.members.remove)(self.member)
+
+        await creator.send_input({'type': 'websocket.receive', 'text': json.dumps({'type': 'message', 'content': 'Bye'})})
+        await self.receive(creator, 'ack')
+        self.assertEqual(await member.receive_output(timeout=2), {'type': 'websocket.close', 'code': 4403})
+        for socket in (creator, member):
+            await socket.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await socket.wait(timeout=2)
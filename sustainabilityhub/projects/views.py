@@ -7,6 +7,8 @@ from django.utils import timezone
 from django.core.exceptions import PermissionDenied
 from django import forms
 from .models import Project, ProjectUpdate, ProjectJoinRequest, ProjectChat, ProjectChatMessage
+from search.result_cache import CachedQueryset, normalize_query
+from tags.tagging import related, tag_cloud, tagged, tagged_ids
 
 
 class ProjectListView(ListView):
@@ -19,19 +21,33 @@ class ProjectListView(ListView):
         queryset = Project.objects.all()
         
         # Search functionality
-        search = self.request.GET.get('search')
+        search = normalize_query(self.request.GET.get('search'))
         if search:
             from django.db.models import Q
             queryset = queryset.filter(
-                Q(title__icontains=search) | Q(description__icontains=search) | Q(tags__icontains=search)
+                Q(title__icontains=search) | Q(description__icontains=search) | Q(pk__in=tagged_ids(Project, search))
             )
         
         # Filter by status
         status_filter = self.request.GET.get('status')
         if status_filter:
             queryset = queryset.filter(status=status_filter)
-            
-        return queryset.order_by('-created_at')
+        
+        # Filter by tag
+        tag = self.request.GET.get('tag')
+        if tag:
+            queryset = tagged(queryset, tag)
+        
+        queryset = queryset.order_by('-created_at')
+        if search:
+            # Repeated searches reuse the matching ids until a project changes
+            return CachedQueryset(queryset, 'projects', {'search': search, 'status': status_filter, 'tag': tag})
+        return queryset
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['tag_cloud'] = tag_cloud(Project)
+        return context
 
 
 class ProjectDetailView(DetailView):
@@ -59,6 +75,7 @@ class ProjectDetailView(DetailView):
                     status='pending'
                 ).order_by('-created_at')
         
+        context['related_projects'] = related(project)
         return context
 
 
@@ -267,7 +284,9 @@ class ProjectChatView(LoginRequiredMixin, DetailView):
         project = context['project']
         chat_room, _ = ProjectChat.objects.get_or_create(project=project)
         context['chat_room'] = chat_room
-        context['messages'] = chat_room.messages.all().select_related('sender')[:50]  # Last 50 messages
+        # Newest 50 messages, oldest first; later ones arrive over the chat socket
+        latest = chat_room.messages.select_related('sender').order_by('-created_at', '-id')[:50]
+        context['messages'] = list(latest)[::-1]
         context['is_member'] = self.request.user == project.creator or self.request.user in project.members.all()
         return context
 
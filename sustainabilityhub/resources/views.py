@@ -5,6 +5,8 @@ from django.contrib import messages
 from django.urls import reverse_lazy
 from django.db.models import Q, Avg
 from .models import ResourceCategory, Resource, ResourceRating
+from search.result_cache import CachedQueryset, normalize_query
+from tags.tagging import related, tag_cloud, tagged
 
 
 class ResourceCategoryListView(ListView):
@@ -30,17 +32,26 @@ class ResourceListView(ListView):
         if resource_type:
             queryset = queryset.filter(resource_type=resource_type)
         
-        search = self.request.GET.get('search')
+        tag = self.request.GET.get('tag')
+        if tag:
+            queryset = tagged(queryset, tag)
+        
+        search = normalize_query(self.request.GET.get('search'))
         if search:
             queryset = queryset.filter(
                 Q(title__icontains=search) | Q(description__icontains=search)
             )
+            # Repeated searches reuse the matching ids until a resource changes
+            return CachedQueryset(queryset, 'resources', {
+                'search': search, 'category': category_id, 'type': resource_type, 'tag': tag,
+            })
         
         return queryset
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['categories'] = ResourceCategory.objects.all()
+        context['tag_cloud'] = tag_cloud(Resource)
         return context
 
 
@@ -59,6 +70,7 @@ class ResourceDetailView(DetailView):
                 context['user_rating'] = self.object.ratings.get(user=self.request.user)
             except ResourceRating.DoesNotExist:
                 context['user_rating'] = None
+        context['related_resources'] = related(self.object)
         return context
 
 
@@ -2,7 +2,7 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from .models import Report
-from notifications.utils import create_notification
+from notifications.utils import notify_many
 
 User = get_user_model()
 
@@ -10,21 +10,22 @@ User = get_user_model()
 def report_notification(sender, instance, created, **kwargs):
     if created:
         # Notify all superusers about new report
-        superusers = User.objects.filter(is_superuser=True)
-        for admin in superusers:
-            create_notification(
-                recipient=admin,
-                notification_type='report_created',
-                title='New Report Submitted',
-                message=f'New {instance.get_category_display()} report: {instance.subject}',
-                url=f'/reports/admin/'
-            )
+        superusers = User.objects.filter(is_superuser=True).values_list('id', flat=True)
+        notify_many(
+            superusers,
+            notification_type='report_created',
+            title='New Report Submitted',
+            message=f'New {instance.get_category_display()} report: {instance.subject}',
+            url=f'/reports/admin/',
+            idempotency_key=f'report_created:{instance.pk}'
+        )
     elif instance.status in ['resolved', 'rejected'] and instance.admin_response:
         # Notify reporter about resolution
-        create_notification(
-            recipient=instance.reporter,
+        notify_many(
+            [instance.reporter_id],
             notification_type='report_resolved',
             title='Report Updated',
             message=f'Your report "{instance.subject}" has been {instance.get_status_display().lower()}',
-            url=f'/reports/my-reports/'
+            url=f'/reports/my-reports/',
+            idempotency_key=f'report_{instance.status}:{instance.pk}'
         )
\ No newline at end of file
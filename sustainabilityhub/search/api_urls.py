@@ -0,0 +1,8 @@
+from django.urls import path
+from . import api_views
+
+urlpatterns = [
+    path('', api_views.search_api, name='api_search'),
+    path('autocomplete/', api_views.autocomplete_suggestions, name='api_autocomplete'),
+    path('cache-metrics/', api_views.result_cache_metrics, name='api_search_cache_metrics'),
+]
@@ -0,0 +1,48 @@
+from django.conf import settings
+from rest_framework import permissions
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from .autocomplete import SOURCES, autocomplete
+from .faceted import FACETS, InvalidCursor, faceted_search
+from .indexing import INDEXED
+from .result_cache import metrics
+
+
+def _limit(request, default, maximum):
+    try:
+        return max(1, min(int(request.query_params.get('limit', default)), maximum))
+    except ValueError:
+        return default
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def search_api(request):
+    """Ranked hits across every indexed type with facet counts and a next-page cursor"""
+    params = request.query_params
+    entity_types = [entity_type for entity_type in params.get('type', '').split(',') if entity_type in INDEXED]
+    filters = {name: params[name] for name in FACETS if params.get(name)}
+    try:
+        return Response(faceted_search(
+            params.get('q', ''), entity_types or None, filters, params.get('cursor') or None,
+            _limit(request, getattr(settings, 'SEARCH_PAGE_SIZE', 20), 50),
+        ))
+    except InvalidCursor:
+        raise NotFound('Invalid cursor')
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def autocomplete_suggestions(request):
+    """Typeahead suggestions for users, hashtags and topics"""
+    kinds = [kind for kind in request.query_params.get('types', '').split(',') if kind in SOURCES]
+    limit = _limit(request, getattr(settings, 'AUTOCOMPLETE_LIMIT', 8), 20)
+    return Response(autocomplete(request.query_params.get('q', ''), kinds or None, limit))
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def result_cache_metrics(request):
+    """Hit and miss counts of the search result cache"""
+    return Response(metrics())
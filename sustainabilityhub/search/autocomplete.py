@@ -0,0 +1,311 @@
+"""
+Prefix index for keystroke-by-keystroke autocomplete.
+
+Every entry (a user, hashtag or topic) is filed under each prefix of each of
+its search keys: a username, a display name, a hashtag name or the words of a
+topic title. A lookup is then a single read of the prefix's members ordered
+by popularity (followers, tagged posts, topic engagement), without touching
+the database. Two indexes are available through AUTOCOMPLETE_BACKEND:
+
+* ``memory`` - per-process dictionaries, built lazily on the first lookup.
+* ``redis`` - one sorted set per prefix plus a hash of labels at REDIS_URL,
+  shared by every worker. Rebuilds write a new version of the keyspace and
+  switch lookups to it in one step, so readers never see a half-built index.
+
+search.signals keeps entries fresh through ``refresh_entries`` tasks and a
+periodic ``rebuild_autocomplete`` job repairs anything missed.
+"""
+import heapq
+import json
+import re
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+
+
+def _max_prefix():
+    return getattr(settings, 'AUTOCOMPLETE_MAX_PREFIX', 20)
+
+
+def normalize(text):
+    return re.sub(r'\s+', ' ', (text or '').lower().lstrip('#')).strip()
+
+
+def _word_keys(text):
+    """The text itself plus every tail starting at a word, so 'solar roof' matches 'roof'"""
+    words = normalize(text).split(' ')
+    return {' '.join(words[i:]) for i in range(len(words)) if words[i]}
+
+
+def prefixes(keys):
+    limit = _max_prefix()
+    found = set()
+    for key in keys:
+        for length in range(1, min(len(key), limit) + 1):
+            found.add(key[:length])
+    return found
+
+
+# -------------------------
+# Entry sources
+# -------------------------
+
+def _user_entries(ids=None):
+    from community.models import Follow
+    users = get_user_model().objects.filter(is_active=True)
+    if ids is not None:
+        users = users.filter(pk__in=ids)
+    followers = dict(
+        Follow.objects.filter(following__in=users).values('following').annotate(
+            total=Count('id')
+        ).values_list('following', 'total')
+    )
+    for user in users.only('id', 'username', 'first_name', 'last_name'):
+        full_name = f'{user.first_name} {user.last_name}'.strip()
+        keys = {normalize(user.username)} | _word_keys(full_name)
+        yield user.pk, keys, followers.get(user.pk, 0), {'label': user.username, 'detail': full_name}
+
+
+def _hashtag_entries(ids=None):
+    from community.models import HashTag
+    hashtags = HashTag.objects.all()
+    if ids is not None:
+        hashtags = hashtags.filter(pk__in=ids)
+    for hashtag in hashtags.only('id', 'name', 'post_count'):
+        yield hashtag.pk, {normalize(hashtag.name)}, hashtag.post_count, {
+            'label': f'#{hashtag.name}', 'detail': f'{hashtag.post_count} posts',
+        }
+
+
+def _topic_entries(ids=None):
+    from forums.models import Topic
+    topics = Topic.objects.all()
+    if ids is not None:
+        topics = topics.filter(pk__in=ids)
+    for topic in topics.only('id', 'title', 'engagement_count', 'views'):
+        yield topic.pk, _word_keys(topic.title), topic.engagement_count * 10 + topic.views, {
+            'label': topic.title, 'detail': '',
+        }
+
+
+SOURCES = {
+    'user': _user_entries,
+    'hashtag': _hashtag_entries,
+    'topic': _topic_entries,
+}
+
+
+# -------------------------
+# Indexes
+# -------------------------
+
+class MemoryAutocompleteIndex:
+    """Prefix dictionaries held by the current process"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._prefixes = {kind: {} for kind in SOURCES}
+            self._items = {kind: {} for kind in SOURCES}
+            self._ready = set()
+
+    def ensure_built(self, kind):
+        if kind not in self._ready:
+            with self._lock:
+                if kind not in self._ready:
+                    self.rebuild(kind)
+
+    def rebuild(self, kind):
+        with self._lock:
+            self._prefixes[kind] = {}
+            self._items[kind] = {}
+            for entry in SOURCES[kind]():
+                self._add(kind, *entry)
+            self._ready.add(kind)
+
+    def _add(self, kind, member, keys, score, payload):
+        item_prefixes = prefixes(keys)
+        for prefix in item_prefixes:
+            self._prefixes[kind].setdefault(prefix, {})[member] = score
+        self._items[kind][member] = (item_prefixes, keys, payload)
+
+    def _remove(self, kind, member):
+        item = self._items[kind].pop(member, None)
+        if item is None:
+            return
+        for prefix in item[0]:
+            members = self._prefixes[kind].get(prefix)
+            if members is not None:
+                members.pop(member, None)
+                if not members:
+                    del self._prefixes[kind][prefix]
+
+    def update(self, kind, ids):
+        if kind not in self._ready:
+            return  # Built from the database on first use anyway
+        with self._lock:
+            for member in ids:
+                self._remove(kind, member)
+            for entry in SOURCES[kind](ids):
+                self._add(kind, *entry)
+
+    def lookup(self, kind, query, limit):
+        self.ensure_built(kind)
+        with self._lock:
+            members = self._prefixes[kind].get(query[:_max_prefix()], {})
+            ranked = heapq.nlargest(limit * 2 if len(query) > _max_prefix() else limit,
+                                    members.items(), key=lambda item: (item[1], -item[0]))
+            items = [(member, self._items[kind][member]) for member, _ in ranked]
+        results = []
+        for member, (_, keys, payload) in items:
+            if any(key.startswith(query) for key in keys):
+                results.append(dict(payload, id=member))
+        return results[:limit]
+
+
+class RedisAutocompleteIndex:
+    """
+    One sorted set per prefix, shared by every worker. The live keyspace
+    version of each kind is held in ``autocomplete:<kind>:version``; a
+    rebuild fills the next version and then points that key at it.
+    """
+
+    def __init__(self, url):
+        import redis
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+
+    def _prefix_key(self, kind, version, prefix):
+        return f'autocomplete:{kind}:v{version}:p:{prefix}'
+
+    def _items_key(self, kind, version):
+        return f'autocomplete:{kind}:v{version}:items'
+
+    def _version_key(self, kind):
+        return f'autocomplete:{kind}:version'
+
+    def _building_key(self, kind):
+        return f'autocomplete:{kind}:building'
+
+    def clear(self):
+        for kind in SOURCES:
+            keys = list(self._redis.scan_iter(f'autocomplete:{kind}:*'))
+            if keys:
+                self._redis.delete(*keys)
+
+    def ensure_built(self, kind):
+        if self._redis.exists(self._version_key(kind)):
+            return
+        # One worker builds; the others find nothing until it is done
+        if self._redis.set(f'autocomplete:{kind}:lock', 1, nx=True, ex=300):
+            self.rebuild(kind)
+
+    def rebuild(self, kind):
+        version = self._redis.incr(f'autocomplete:{kind}:next')
+        # update() also writes here while the build runs, so no change is lost
+        abandoned = self._redis.set(self._building_key(kind), version, ex=3600, get=True)
+        if abandoned is not None and abandoned != self._redis.get(self._version_key(kind)):
+            self._drop_version(kind, abandoned)
+        pipe = self._redis.pipeline(transaction=False)
+        for count, entry in enumerate(SOURCES[kind](), 1):
+            self._add(pipe, kind, version, *entry)
+            if count % 500 == 0:
+                pipe.execute()
+        pipe.execute()
+
+        pipe = self._redis.pipeline()
+        pipe.set(self._version_key(kind), version, get=True)
+        pipe.delete(self._building_key(kind), f'autocomplete:{kind}:lock')
+        previous = pipe.execute()[0]
+        if previous is not None and int(previous) != version:
+            self._drop_version(kind, previous)
+
+    def _drop_version(self, kind, version):
+        batch = []
+        for key in self._redis.scan_iter(f'autocomplete:{kind}:v{version}:*', count=1000):
+            batch.append(key)
+            if len(batch) >= 1000:
+                self._redis.unlink(*batch)
+                batch = []
+        if batch:
+            self._redis.unlink(*batch)
+
+    def _add(self, pipe, kind, version, member, keys, score, payload):
+        for prefix in prefixes(keys):
+            pipe.zadd(self._prefix_key(kind, version, prefix), {member: score})
+        pipe.hset(self._items_key(kind, version), member, json.dumps(dict(payload, keys=sorted(keys))))
+
+    def update(self, kind, ids):
+        versions = {version for version in self._redis.mget(self._version_key(kind), self._building_key(kind)) if version}
+        entries = list(SOURCES[kind](ids)) if versions else []
+        for version in versions:
+            old = self._redis.hmget(self._items_key(kind, version), ids)
+            pipe = self._redis.pipeline()
+            for member, raw in zip(ids, old):
+                if raw is not None:
+                    for prefix in prefixes(json.loads(raw)['keys']):
+                        pipe.zrem(self._prefix_key(kind, version, prefix), member)
+                    pipe.hdel(self._items_key(kind, version), member)
+            for entry in entries:
+                self._add(pipe, kind, version, *entry)
+            pipe.execute()
+
+    def lookup(self, kind, query, limit):
+        self.ensure_built(kind)
+        version = self._redis.get(self._version_key(kind))
+        if version is None:
+            return []
+        fetch = limit * 2 if len(query) > _max_prefix() else limit
+        members = self._redis.zrevrange(self._prefix_key(kind, version, query[:_max_prefix()]), 0, fetch - 1)
+        if not members:
+            return []
+        results = []
+        for member, raw in zip(members, self._redis.hmget(self._items_key(kind, version), members)):
+            if raw is None:
+                continue
+            payload = json.loads(raw)
+            keys = payload.pop('keys')
+            if any(key.startswith(query) for key in keys):
+                results.append(dict(payload, id=int(member)))
+        return results[:limit]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                if getattr(settings, 'AUTOCOMPLETE_BACKEND', 'memory') == 'redis':
+                    _index = RedisAutocompleteIndex(settings.REDIS_URL)
+                else:
+                    _index = MemoryAutocompleteIndex()
+    return _index
+
+
+def autocomplete(query, kinds=None, limit=None):
+    """Return {kind: [{'id', 'label', 'detail'}, ...]} for the best matches of ``query``"""
+    limit = limit or getattr(settings, 'AUTOCOMPLETE_LIMIT', 8)
+    query = normalize(query)
+    kinds = [kind for kind in (kinds or SOURCES) if kind in SOURCES]
+    if not query:
+        return {kind: [] for kind in kinds}
+    index = get_index()
+    return {kind: index.lookup(kind, query, limit) for kind in kinds}
+
+
+def refresh_entries(kind, ids):
+    get_index().update(kind, list(ids))
+
+
+def rebuild_autocomplete(kinds=None):
+    index = get_index()
+    for kind in kinds or SOURCES:
+        index.rebuild(kind)
@@ -0,0 +1,179 @@
+"""
+Full-text search backends over the SearchDocument table.
+
+* ``sqlite`` - an FTS5 external-content table kept in sync by triggers,
+  ranked with bm25 (title matches weigh ten times more than body matches).
+* ``postgres`` - a generated, weighted ``tsvector`` column with a GIN index,
+  ranked with ts_rank_cd.
+* ``basic`` - ``icontains`` over the documents, for any other database.
+
+Besides ranked pages and counts, every backend exposes ``matches``: SQL for
+the matching documents with a ``score`` column (lower is better), which the
+faceted API composes with facet filters, counts and keyset cursors.
+
+The SEARCH_BACKEND setting picks one; ``auto`` (the default) follows the
+database vendor. The FTS table and the tsvector column are created by the
+search app's migrations.
+"""
+import re
+import threading
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from .models import SearchDocument
+
+FTS_TABLE = 'search_searchdocument_fts'
+
+
+def tokenize(query):
+    return re.findall(r'\w+', query.lower())
+
+
+class BasicSearchBackend:
+    """Substring matching for databases without a full-text engine"""
+
+    def _matches(self, query, entity_types):
+        tokens = tokenize(query)
+        if not tokens:
+            return SearchDocument.objects.none()
+        documents = SearchDocument.objects.all()
+        if entity_types:
+            documents = documents.filter(entity_type__in=entity_types)
+        for token in tokens:
+            documents = documents.filter(Q(title__icontains=token) | Q(body__icontains=token))
+        return documents
+
+    def _title_score(self, query):
+        # 0 when every query word is in the title, 1 otherwise
+        title_hits = Q()
+        for token in tokenize(query):
+            title_hits &= Q(title__icontains=token)
+        return Case(When(title_hits, then=Value(0)), default=Value(1), output_field=IntegerField())
+
+    def search(self, query, entity_types=None, offset=0, limit=20):
+        return list(
+            self._matches(query, entity_types).annotate(rank=self._title_score(query))
+            .order_by('rank', '-updated_at', 'id').values_list('entity_type', 'object_id')[offset:offset + limit]
+        )
+
+    def count(self, query, entity_types=None):
+        return self._matches(query, entity_types).count()
+
+    def matches(self, query, entity_types=None):
+        if not tokenize(query):
+            return None
+        documents = self._matches(query, entity_types).annotate(score=self._title_score(query)).order_by().values(
+            'id', 'entity_type', 'object_id', 'title', 'score'
+        )
+        return documents.query.sql_with_params()
+
+
+class _SQLSearchBackend:
+    """Shared plumbing for the raw-SQL full-text backends"""
+
+    def prepare(self, query):
+        raise NotImplementedError
+
+    def _type_filter(self, entity_types):
+        if not entity_types:
+            return '', []
+        placeholders = ', '.join(['%s'] * len(entity_types))
+        return f' AND d.entity_type IN ({placeholders})', list(entity_types)
+
+    def _run(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def search(self, query, entity_types=None, offset=0, limit=20):
+        term = self.prepare(query)
+        if not term:
+            return []
+        type_sql, type_params = self._type_filter(entity_types)
+        rows = self._run(self.search_sql.format(types=type_sql), [term] + type_params + [limit, offset])
+        return [tuple(row) for row in rows]
+
+    def count(self, query, entity_types=None):
+        term = self.prepare(query)
+        if not term:
+            return 0
+        type_sql, type_params = self._type_filter(entity_types)
+        return self._run(self.count_sql.format(types=type_sql), [term] + type_params)[0][0]
+
+    def matches(self, query, entity_types=None):
+        term = self.prepare(query)
+        if not term:
+            return None
+        type_sql, type_params = self._type_filter(entity_types)
+        return self.matches_sql.format(types=type_sql), [term] + type_params
+
+
+class SQLiteSearchBackend(_SQLSearchBackend):
+    """FTS5 with prefix matching on every query word"""
+    search_sql = (
+        f'SELECT d.entity_type, d.object_id FROM {FTS_TABLE} '
+        f'JOIN search_searchdocument d ON d.id = {FTS_TABLE}.rowid '
+        f'WHERE {FTS_TABLE} MATCH %s{{types}} '
+        f'ORDER BY bm25({FTS_TABLE}, 10.0, 1.0), d.id LIMIT %s OFFSET %s'
+    )
+    count_sql = (
+        f'SELECT COUNT(*) FROM {FTS_TABLE} '
+        f'JOIN search_searchdocument d ON d.id = {FTS_TABLE}.rowid '
+        f'WHERE {FTS_TABLE} MATCH %s{{types}}'
+    )
+    matches_sql = (
+        f'SELECT d.id, d.entity_type, d.object_id, d.title, bm25({FTS_TABLE}, 10.0, 1.0) AS score '
+        f'FROM {FTS_TABLE} JOIN search_searchdocument d ON d.id = {FTS_TABLE}.rowid '
+        f'WHERE {FTS_TABLE} MATCH %s{{types}}'
+    )
+
+    def prepare(self, query):
+        # Quoted prefix terms, so user input never reaches the FTS5 query syntax
+        return ' '.join(f'"{token}"*' for token in tokenize(query))
+
+
+class PostgresSearchBackend(_SQLSearchBackend):
+    """tsvector/GIN with web-search style query parsing"""
+    search_sql = (
+        "SELECT d.entity_type, d.object_id FROM search_searchdocument d, "
+        "websearch_to_tsquery('english', %s) query "
+        "WHERE d.search_vector @@ query{types} "
+        "ORDER BY ts_rank_cd(d.search_vector, query) DESC, d.id LIMIT %s OFFSET %s"
+    )
+    count_sql = (
+        "SELECT COUNT(*) FROM search_searchdocument d "
+        "WHERE d.search_vector @@ websearch_to_tsquery('english', %s){types}"
+    )
+    matches_sql = (
+        "SELECT d.id, d.entity_type, d.object_id, d.title, -ts_rank_cd(d.search_vector, query) AS score "
+        "FROM search_searchdocument d, websearch_to_tsquery('english', %s) query "
+        "WHERE d.search_vector @@ query{types}"
+    )
+
+    def prepare(self, query):
+        return query.strip()
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgres': PostgresSearchBackend,
+    'basic': BasicSearchBackend,
+}
+VENDOR_BACKENDS = {'sqlite': 'sqlite', 'postgresql': 'postgres'}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = getattr(settings, 'SEARCH_BACKEND', 'auto')
+                if name == 'auto':
+                    name = VENDOR_BACKENDS.get(connection.vendor, 'basic')
+                _backend = BACKENDS[name]()
+    return _backend
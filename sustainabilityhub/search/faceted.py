@@ -0,0 +1,139 @@
+"""
+Faceted, cursor-paginated search over the whole index for the JSON API.
+
+The backend's ``matches`` SQL is wrapped in a CTE, narrowed by the selected
+facet values and then read twice: once for the facet counts of every facet
+(entity type included) in a single grouped query, and once for a page of
+hits ordered by (score, id). Pages continue from an opaque keyset cursor
+holding the last hit's score and id, so deep pages cost the same as the
+first. Both reads go through the search result cache.
+"""
+import base64
+import json
+
+from django.conf import settings
+from django.db import connection
+from django.urls import NoReverseMatch, reverse
+
+from .backends import get_backend
+from .models import SearchDocument
+from .result_cache import cached, normalize_query
+
+FACETS = ('category', 'event_type', 'resource_type', 'status', 'tag')
+DETAIL_URLS = {
+    'topic': 'forums:topic_detail',
+    'project': 'projects:detail',
+    'event': 'events:detail',
+    'resource': 'resources:detail',
+}
+
+_DEPENDS_ON = [SearchDocument._meta.label_lower]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(score, document_id):
+    raw = json.dumps([score, document_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (score, document_id) or raise InvalidCursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        score, document_id = json.loads(raw)
+        if not isinstance(score, (int, float)) or not isinstance(document_id, int):
+            raise ValueError(raw)
+        return score, document_id
+    except (ValueError, TypeError, UnicodeDecodeError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def _detail_url(entity_type, object_id, title):
+    try:
+        if entity_type == 'user':
+            return reverse('profiles:detail', args=[title])
+        return reverse(DETAIL_URLS[entity_type], args=[object_id])
+    except NoReverseMatch:
+        return ''
+
+
+def _run(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _filtered(matches, filters):
+    sql, params = matches
+    filter_sql = ''.join(
+        ' AND m.id IN (SELECT document_id FROM search_searchfacet WHERE name = %s AND value = %s)'
+        for _ in filters
+    )
+    filter_params = [part for pair in filters for part in pair]
+    return f'WITH m AS ({sql}), f AS (SELECT m.* FROM m WHERE 1 = 1{filter_sql}) ', list(params) + filter_params
+
+
+def _facet_counts(cte, params):
+    rows = _run(
+        cte + "SELECT 'type', entity_type, COUNT(*) FROM f GROUP BY entity_type "
+        'UNION ALL SELECT sf.name, sf.value, COUNT(*) FROM search_searchfacet sf '
+        'JOIN f ON sf.document_id = f.id GROUP BY sf.name, sf.value',
+        params,
+    )
+    limit = getattr(settings, 'SEARCH_FACET_LIMIT', 10)
+    facets = {name: [] for name in ('type',) + FACETS}
+    for name, value, count in rows:
+        if name in facets:
+            facets[name].append((value, count))
+    # Most common values first, capped so a long tail of tags stays out of the response
+    return {
+        name: dict(sorted(values, key=lambda item: (-item[1], item[0]))[:None if name == 'type' else limit])
+        for name, values in facets.items()
+    }
+
+
+def _page(cte, params, after, limit):
+    sql = cte + 'SELECT id, entity_type, object_id, title, score FROM f'
+    if after is not None:
+        sql += ' WHERE score > %s OR (score = %s AND id > %s)'
+        params = params + [after[0], after[0], after[1]]
+    return [tuple(row) for row in _run(sql + ' ORDER BY score, id LIMIT %s', params + [limit + 1])]
+
+
+def faceted_search(query, entity_types=None, filters=None, cursor=None, limit=20):
+    """
+    Return ``{'count', 'facets', 'results', 'next'}`` for ``query``.
+    ``filters`` maps facet names to the value every hit must carry.
+    Raises InvalidCursor for a cursor this function did not produce.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    query = normalize_query(query)
+    entity_types = sorted(entity_types) if entity_types else None
+    filters = sorted((name, str(value)) for name, value in (filters or {}).items() if name in FACETS)
+    matches = get_backend().matches(query, entity_types) if query else None
+    if matches is None:
+        return {'count': 0, 'facets': {name: {} for name in ('type',) + FACETS}, 'results': [], 'next': None}
+
+    cte, params = _filtered(matches, filters)
+    key = {'q': query, 'types': entity_types, 'filters': filters}
+    facets = cached('api', _DEPENDS_ON, dict(key, facets=True), lambda: _facet_counts(cte, params))
+    rows = cached('api', _DEPENDS_ON, dict(key, after=after, limit=limit), lambda: _page(cte, params, after, limit))
+
+    next_cursor = encode_cursor(rows[limit - 1][4], rows[limit - 1][0]) if len(rows) > limit else None
+    return {
+        'count': sum(facets['type'].values()),
+        'facets': facets,
+        'results': [
+            {
+                'type': entity_type,
+                'id': object_id,
+                'title': title,
+                'url': _detail_url(entity_type, object_id, title),
+            }
+            for _, entity_type, object_id, title, _ in rows[:limit]
+        ],
+        'next': next_cursor,
+    }
@@ -0,0 +1,151 @@
+"""
+What goes into the search index and how it gets there.
+
+``INDEXED`` maps each entity type to its model, the fields that feed the
+document, a function producing the document's (title, body) and one producing
+its facets as (name, value) pairs. Signal
+handlers in search.signals call ``index_objects`` (through a task) whenever
+an indexed object changes; ``rebuild_index`` repopulates everything.
+"""
+from django.apps import apps as global_apps
+from django.conf import settings
+
+from .models import SearchDocument, SearchFacet
+from .result_cache import bump_on_commit
+
+
+def _join(*parts):
+    return ' '.join(str(part) for part in parts if part)
+
+
+def _tags(tags):
+    return ' '.join(tags) if isinstance(tags, list) else (tags or '')
+
+
+def _tag_facets(tags):
+    tags = tags if isinstance(tags, list) else (tags or '').split(',')
+    return [('tag', str(tag).strip().lower()[:100]) for tag in tags if str(tag).strip()]
+
+
+def _category_facet(obj):
+    return [('category', obj.category.name)] if obj.category_id else []
+
+
+INDEXED = {
+    'topic': {
+        'model': 'forums.Topic',
+        'fields': {'title', 'content', 'category'},
+        'document': lambda topic: (topic.title, topic.content),
+        'facets': _category_facet,
+        'select_related': ('author', 'category'),
+    },
+    'project': {
+        'model': 'projects.Project',
+        'fields': {'title', 'description', 'tags', 'status'},
+        'document': lambda project: (project.title, _join(project.description, _tags(project.tags))),
+        'facets': lambda project: [('status', project.status)] + _tag_facets(project.tags),
+        'select_related': ('creator',),
+    },
+    'event': {
+        'model': 'events.Event',
+        'fields': {'title', 'description', 'location', 'event_type'},
+        'document': lambda event: (event.title, _join(event.description, event.location)),
+        'facets': lambda event: [('event_type', event.event_type)],
+        'select_related': ('organizer',),
+    },
+    'resource': {
+        'model': 'resources.Resource',
+        'fields': {'title', 'description', 'tags', 'resource_type', 'category'},
+        'document': lambda resource: (resource.title, _join(resource.description, _tags(resource.tags))),
+        'facets': lambda resource: (
+            [('resource_type', resource.resource_type)] + _category_facet(resource) + _tag_facets(resource.tags)
+        ),
+        'select_related': ('author', 'category'),
+    },
+    'user': {
+        'model': settings.AUTH_USER_MODEL,
+        'fields': {'username', 'first_name', 'last_name', 'is_active'},
+        'document': lambda user: (user.username, _join(user.first_name, user.last_name)),
+        'filter': {'is_active': True},
+        'select_related': (),
+    },
+}
+
+
+def facets_of(entity_type, obj):
+    """Distinct (name, value) facet pairs of an indexed object"""
+    facets = INDEXED[entity_type].get('facets')
+    return sorted(set(facets(obj))) if facets else []
+
+
+def get_model(entity_type):
+    return global_apps.get_model(INDEXED[entity_type]['model'])
+
+
+def indexable(entity_type):
+    """Queryset of the objects of ``entity_type`` that belong in the index"""
+    config = INDEXED[entity_type]
+    return get_model(entity_type)._default_manager.filter(**config.get('filter', {}))
+
+
+def index_objects(entity_type, object_ids):
+    """Create, refresh or drop the documents of the given objects"""
+    config = INDEXED[entity_type]
+    document = config['document']
+    found = set()
+    queryset = indexable(entity_type).select_related(*config['select_related'])
+    for obj in queryset.filter(pk__in=object_ids):
+        found.add(obj.pk)
+        title, body = document(obj)
+        search_document, _ = SearchDocument.objects.update_or_create(
+            entity_type=entity_type, object_id=obj.pk,
+            defaults={'title': title[:255], 'body': body},
+        )
+        search_document.facets.all().delete()
+        SearchFacet.objects.bulk_create([
+            SearchFacet(document=search_document, name=name, value=value)
+            for name, value in facets_of(entity_type, obj)
+        ])
+    missing = set(object_ids) - found
+    if missing:
+        SearchDocument.objects.filter(entity_type=entity_type, object_id__in=missing).delete()
+    bump_on_commit(SearchDocument._meta.label_lower)
+
+
+def _write_documents(entity_type, objects):
+    document = INDEXED[entity_type]['document']
+    documents = []
+    for obj in objects:
+        title, body = document(obj)
+        documents.append(SearchDocument(entity_type=entity_type, object_id=obj.pk, title=title[:255], body=body))
+    SearchDocument.objects.bulk_create(documents)
+    # Not every database hands back primary keys from a bulk insert
+    document_ids = dict(
+        SearchDocument.objects.filter(
+            entity_type=entity_type, object_id__in=[obj.pk for obj in objects]
+        ).values_list('object_id', 'id')
+    )
+    SearchFacet.objects.bulk_create([
+        SearchFacet(document_id=document_ids[obj.pk], name=name, value=value)
+        for obj in objects
+        for name, value in facets_of(entity_type, obj)
+    ])
+    return len(documents)
+
+
+def rebuild_index(entity_types=None, batch_size=500):
+    """Replace the documents of ``entity_types`` (default: all); returns documents written"""
+    written = 0
+    for entity_type in entity_types or INDEXED:
+        SearchDocument.objects.filter(entity_type=entity_type).delete()
+        objects = indexable(entity_type).select_related(*INDEXED[entity_type]['select_related'])
+        batch = []
+        for obj in objects.iterator(chunk_size=batch_size):
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                written += _write_documents(entity_type, batch)
+                batch = []
+        if batch:
+            written += _write_documents(entity_type, batch)
+    bump_on_commit(SearchDocument._meta.label_lower)
+    return written
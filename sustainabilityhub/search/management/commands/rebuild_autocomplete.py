@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+from search.autocomplete import SOURCES, rebuild_autocomplete
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the autocomplete prefix index for users, hashtags and topics'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'kinds', nargs='*',
+            help=f'Entry kinds to rebuild (default: all of {", ".join(SOURCES)})'
+        )
+
+    def handle(self, *args, **options):
+        kinds = options['kinds'] or None
+        unknown = set(kinds or ()) - set(SOURCES)
+        if unknown:
+            raise CommandError(f'Unknown kinds: {", ".join(sorted(unknown))}')
+        rebuild_autocomplete(kinds)
+        self.stdout.write(self.style.SUCCESS(f'[OK] Rebuilt autocomplete for {", ".join(kinds or SOURCES)}'))
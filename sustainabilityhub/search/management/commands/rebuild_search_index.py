@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+from search.indexing import INDEXED, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index from the indexed models'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'entity_types', nargs='*',
+            help=f'Entity types to rebuild (default: all of {", ".join(INDEXED)})'
+        )
+
+    def handle(self, *args, **options):
+        entity_types = options['entity_types'] or None
+        unknown = set(entity_types or ()) - set(INDEXED)
+        if unknown:
+            raise CommandError(f'Unknown entity types: {", ".join(sorted(unknown))}')
+        written = rebuild_index(entity_types)
+        self.stdout.write(self.style.SUCCESS(f'[OK] Indexed {written} documents'))
@@ -0,0 +1,117 @@
+from django.conf import settings
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    """CREATE VIRTUAL TABLE search_searchdocument_fts USING fts5(
+        title, body, content='search_searchdocument', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER search_searchdocument_ai AFTER INSERT ON search_searchdocument BEGIN
+        INSERT INTO search_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+    """CREATE TRIGGER search_searchdocument_ad AFTER DELETE ON search_searchdocument BEGIN
+        INSERT INTO search_searchdocument_fts(search_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END""",
+    """CREATE TRIGGER search_searchdocument_au AFTER UPDATE ON search_searchdocument BEGIN
+        INSERT INTO search_searchdocument_fts(search_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO search_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+]
+SQLITE_REVERSE = [
+    'DROP TRIGGER IF EXISTS search_searchdocument_au',
+    'DROP TRIGGER IF EXISTS search_searchdocument_ad',
+    'DROP TRIGGER IF EXISTS search_searchdocument_ai',
+    'DROP TABLE IF EXISTS search_searchdocument_fts',
+]
+
+POSTGRES_FORWARD = [
+    """ALTER TABLE search_searchdocument ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(body, '')), 'B')
+    ) STORED""",
+    'CREATE INDEX search_searchdocument_vector_gin ON search_searchdocument USING GIN (search_vector)',
+]
+POSTGRES_REVERSE = [
+    'DROP INDEX IF EXISTS search_searchdocument_vector_gin',
+    'ALTER TABLE search_searchdocument DROP COLUMN IF EXISTS search_vector',
+]
+
+STATEMENTS = {
+    'sqlite': (SQLITE_FORWARD, SQLITE_REVERSE),
+    'postgresql': (POSTGRES_FORWARD, POSTGRES_REVERSE),
+}
+
+
+def _execute(schema_editor, direction):
+    # Other databases fall back to the basic backend and need no extra schema
+    statements = STATEMENTS.get(schema_editor.connection.vendor)
+    if statements:
+        for sql in statements[direction]:
+            schema_editor.execute(sql)
+
+
+def create_fulltext_index(apps, schema_editor):
+    _execute(schema_editor, 0)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    _execute(schema_editor, 1)
+
+
+def _join(*parts):
+    return ' '.join(str(part) for part in parts if part)
+
+
+def _tags(tags):
+    return ' '.join(tags) if isinstance(tags, list) else (tags or '')
+
+
+# The documents as search.indexing built them when this migration was written
+DOCUMENTS = {
+    'topic': ('forums.Topic', {}, lambda topic: (topic.title, topic.content)),
+    'project': (
+        'projects.Project', {},
+        lambda project: (project.title, _join(project.description, _tags(project.tags))),
+    ),
+    'event': ('events.Event', {}, lambda event: (event.title, _join(event.description, event.location))),
+    'resource': (
+        'resources.Resource', {},
+        lambda resource: (resource.title, _join(resource.description, _tags(resource.tags))),
+    ),
+    'user': (
+        settings.AUTH_USER_MODEL, {'is_active': True},
+        lambda user: (user.username, _join(user.first_name, user.last_name)),
+    ),
+}
+
+
+def backfill_documents(apps, schema_editor):
+    SearchDocument = apps.get_model('search', 'SearchDocument')
+    for entity_type, (label, filters, document) in DOCUMENTS.items():
+        SearchDocument.objects.filter(entity_type=entity_type).delete()
+        batch = []
+        for obj in apps.get_model(label)._default_manager.filter(**filters).iterator(chunk_size=500):
+            title, body = document(obj)
+            batch.append(SearchDocument(entity_type=entity_type, object_id=obj.pk, title=title[:255], body=body))
+            if len(batch) >= 500:
+                SearchDocument.objects.bulk_create(batch)
+                batch = []
+        SearchDocument.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+        ('accounts', '0004_userwarning_justification_and_more'),
+        ('events', '0001_initial'),
+        ('forums', '0003_topic_trending'),
+        ('projects', '0003_projectchat_projectchatmessage'),
+        ('resources', '0002_alter_resource_url'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+        migrations.RunPython(backfill_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.30 on 2026-10-18 03:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def _tag_facets(tags):
+    tags = tags if isinstance(tags, list) else (tags or '').split(',')
+    return [('tag', str(tag).strip().lower()[:100]) for tag in tags if str(tag).strip()]
+
+
+def _category_facet(obj):
+    return [('category', obj.category.name)] if obj.category_id else []
+
+
+# The facets as search.indexing derived them when this migration was written
+FACETS = {
+    'topic': ('forums.Topic', ('category',), _category_facet),
+    'project': ('projects.Project', (), lambda project: [('status', project.status)] + _tag_facets(project.tags)),
+    'event': ('events.Event', (), lambda event: [('event_type', event.event_type)]),
+    'resource': ('resources.Resource', ('category',), lambda resource: (
+        [('resource_type', resource.resource_type)] + _category_facet(resource) + _tag_facets(resource.tags)
+    )),
+}
+
+
+def backfill_facets(apps, schema_editor):
+    SearchDocument = apps.get_model('search', 'SearchDocument')
+    SearchFacet = apps.get_model('search', 'SearchFacet')
+    for entity_type, (label, select_related, facets) in FACETS.items():
+        document_ids = dict(
+            SearchDocument.objects.filter(entity_type=entity_type).values_list('object_id', 'id')
+        )
+        objects = apps.get_model(label)._default_manager.select_related(*select_related)
+        SearchFacet.objects.bulk_create([
+            SearchFacet(document_id=document_ids[obj.pk], name=name, value=value)
+            for obj in objects.iterator(chunk_size=500) if obj.pk in document_ids
+            for name, value in sorted(set(facets(obj)))
+        ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0002_fulltext_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=30)),
+                ('value', models.CharField(max_length=100)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='facets', to='search.searchdocument')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['name', 'value'], name='search_facet_name_value')],
+                'unique_together': {('document', 'name', 'value')},
+            },
+        ),
+        migrations.RunPython(backfill_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+from django.db import models
+
+
+class SearchDocument(models.Model):
+    """One searchable row per indexed object, kept in sync by search.signals"""
+    ENTITY_TYPES = [
+        ('topic', 'Forum Topic'),
+        ('project', 'Project'),
+        ('event', 'Event'),
+        ('resource', 'Resource'),
+        ('user', 'User'),
+    ]
+    
+    entity_type = models.CharField(max_length=20, choices=ENTITY_TYPES)
+    object_id = models.PositiveIntegerField()
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['entity_type', 'object_id']
+    
+    def __str__(self):
+        return f'{self.entity_type} {self.object_id}: {self.title}'
+
+
+class SearchFacet(models.Model):
+    """A filterable attribute of a document (status, category, tag...), counted per query"""
+    document = models.ForeignKey(SearchDocument, on_delete=models.CASCADE, related_name='facets')
+    name = models.CharField(max_length=30)
+    value = models.CharField(max_length=100)
+    
+    class Meta:
+        unique_together = ['document', 'name', 'value']
+        indexes = [
+            models.Index(fields=['name', 'value'], name='search_facet_name_value'),
+        ]
+    
+    def __str__(self):
+        return f'{self.name}={self.value}'
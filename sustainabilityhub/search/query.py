@@ -0,0 +1,67 @@
+from .backends import get_backend
+from .indexing import INDEXED, get_model
+from .models import SearchDocument
+from .result_cache import cached, normalize_query
+
+_DEPENDS_ON = [SearchDocument._meta.label_lower]
+
+
+class SearchResults:
+    """
+    Lazily evaluated, relevance-ordered hits for one query. Slicing runs a
+    single ranked page query and loads the matching objects with one query
+    per entity type, so it can be handed straight to a Paginator. Counts and
+    pages of hits are cached until the index changes.
+    """
+
+    def __init__(self, query, entity_types=None):
+        self.query = normalize_query(query)
+        self.entity_types = sorted(entity_types) if entity_types else None
+        self._count = None
+
+    def _cached(self, params, compute):
+        params = dict(params, q=self.query, types=self.entity_types)
+        return cached('global', _DEPENDS_ON, params, compute)
+
+    def count(self):
+        if self._count is None:
+            self._count = self._cached(
+                {'count': True}, lambda: get_backend().count(self.query, self.entity_types)
+            )
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = self.count() if index.stop is None else index.stop
+        if stop <= start:
+            return []
+        hits = self._cached(
+            {'offset': start, 'limit': stop - start},
+            lambda: get_backend().search(self.query, self.entity_types, offset=start, limit=stop - start),
+        )
+        return load_hits(hits)
+
+
+def load_hits(hits):
+    """Turn (entity_type, object_id) pairs into (entity_type, object) pairs, keeping order"""
+    wanted = {}
+    for entity_type, object_id in hits:
+        wanted.setdefault(entity_type, []).append(object_id)
+    loaded = {}
+    for entity_type, object_ids in wanted.items():
+        queryset = get_model(entity_type)._default_manager.select_related(*INDEXED[entity_type]['select_related'])
+        loaded[entity_type] = queryset.in_bulk(object_ids)
+    return [
+        (entity_type, loaded[entity_type][object_id])
+        for entity_type, object_id in hits
+        if object_id in loaded[entity_type]
+    ]
+
+
+def search(query, entity_types=None):
+    return SearchResults(query, entity_types)
@@ -0,0 +1,130 @@
+"""
+Cached search results.
+
+Matching object ids are cached under a key built from the normalized query,
+the filters in effect and the current *generation* of every model the
+results depend on. Writes to those models bump their generation once the
+transaction commits (see search.signals), so older entries are simply never
+read again; SEARCH_CACHE_TIMEOUT only bounds how long they occupy the cache.
+Objects themselves are loaded fresh for each page, so cached ids never serve
+stale titles or authors.
+"""
+import hashlib
+import json
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+GENERATION_KEY = 'search:generation:{}'
+RESULT_KEY = 'search:results:{}:{}:{}'
+METRIC_KEY = 'search:metrics:{}:{}'
+NAMESPACES = ('global', 'api', 'projects', 'events', 'resources')
+
+
+def normalize_query(query):
+    """Case-fold and collapse whitespace so trivially different queries share an entry"""
+    return re.sub(r'\s+', ' ', (query or '').casefold()).strip()
+
+
+def _timeout():
+    return getattr(settings, 'SEARCH_CACHE_TIMEOUT', 600)
+
+
+def generation(label):
+    key = GENERATION_KEY.format(label)
+    value = cache.get(key)
+    if value is None:
+        # Seed from the clock so a lost generation never resurrects old entries
+        cache.add(key, int(time.time()), None)
+        value = cache.get(key)
+    return value
+
+
+def bump(*labels):
+    """Retire every cached result depending on the given model labels"""
+    for label in labels:
+        key = GENERATION_KEY.format(label)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, int(time.time()), None)
+
+
+def bump_on_commit(*labels):
+    transaction.on_commit(lambda: bump(*labels))
+
+
+def _record(namespace, outcome):
+    key = METRIC_KEY.format(namespace, outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+def metrics():
+    """Hit and miss counts per namespace, since the cache was last cleared"""
+    stats = {}
+    for namespace in NAMESPACES:
+        hits = cache.get(METRIC_KEY.format(namespace, 'hit'), 0)
+        misses = cache.get(METRIC_KEY.format(namespace, 'miss'), 0)
+        total = hits + misses
+        stats[namespace] = {'hits': hits, 'misses': misses, 'hit_rate': round(hits / total, 3) if total else None}
+    return stats
+
+
+def cached(namespace, depends_on, params, compute):
+    """Return ``compute()`` cached under ``params`` until a ``depends_on`` model changes"""
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    generations = '.'.join(str(generation(label)) for label in depends_on)
+    key = RESULT_KEY.format(namespace, digest, generations)
+    value = cache.get(key)
+    if value is not None:
+        _record(namespace, 'hit')
+        return value
+    _record(namespace, 'miss')
+    value = compute()
+    cache.set(key, value, _timeout())
+    return value
+
+
+class CachedQueryset:
+    """
+    Stand-in for a filtered queryset in a paginated ListView: the ordered
+    matching ids come from the cache and only the requested page is loaded.
+    """
+
+    def __init__(self, queryset, namespace, params):
+        self.queryset = queryset
+        self.namespace = namespace
+        self.params = params
+        self._ids = None
+
+    @property
+    def ids(self):
+        if self._ids is None:
+            self._ids = cached(
+                self.namespace, [self.queryset.model._meta.label_lower], self.params,
+                lambda: list(self.queryset.values_list('pk', flat=True)),
+            )
+        return self._ids
+
+    def count(self):
+        return len(self.ids)
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        ids = self.ids[index]
+        # A primary key lookup keeps the queryset's select_related
+        loaded = self.queryset.in_bulk(ids)
+        return [loaded[pk] for pk in ids if pk in loaded]
@@ -0,0 +1,88 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from community.models import Follow as CommunityFollow, HashTag
+from forums.models import Topic, TopicLike, TopicPost
+from sustainabilityhub.dispatch import enqueue
+from .indexing import INDEXED, get_model
+from .result_cache import bump_on_commit
+from .tasks import index_document, refresh_autocomplete
+
+_ENTITY_TYPES = {}
+
+
+def reindex_object(sender, instance, update_fields=None, **kwargs):
+    """Refresh the search document of a saved or deleted object after commit"""
+    entity_type = _ENTITY_TYPES[sender]
+    if update_fields and not set(update_fields) & INDEXED[entity_type]['fields']:
+        # e.g. last_login bumps on every sign-in
+        return
+    enqueue(index_document, entity_type, instance.pk)
+
+
+def retire_cached_results(sender, **kwargs):
+    """Cached list-view searches over this model go stale with any write"""
+    bump_on_commit(sender._meta.label_lower)
+
+
+for _label in ('projects.Project', 'events.Event', 'resources.Resource'):
+    post_save.connect(retire_cached_results, sender=_label, dispatch_uid=f'search_cache_save_{_label}')
+    post_delete.connect(retire_cached_results, sender=_label, dispatch_uid=f'search_cache_delete_{_label}')
+
+
+for _entity_type in INDEXED:
+    _model = get_model(_entity_type)
+    _ENTITY_TYPES[_model] = _entity_type
+    post_save.connect(reindex_object, sender=_model, dispatch_uid=f'search_save_{_entity_type}')
+    post_delete.connect(reindex_object, sender=_model, dispatch_uid=f'search_delete_{_entity_type}')
+
+
+# -------------------------
+# Autocomplete
+# -------------------------
+
+def _refresh_autocomplete(kind, ids):
+    enqueue(refresh_autocomplete, kind, sorted(ids))
+
+
+def refresh_user_entry(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not set(update_fields) & INDEXED['user']['fields']:
+        return
+    _refresh_autocomplete('user', [instance.pk])
+
+
+def refresh_followed_user_entry(sender, instance, **kwargs):
+    # Follower counts rank user suggestions
+    _refresh_autocomplete('user', [instance.following_id])
+
+
+def refresh_hashtag_entry(sender, instance, **kwargs):
+    _refresh_autocomplete('hashtag', [instance.pk])
+
+
+def refresh_tagged_hashtag_entries(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove') and pk_set:
+        _refresh_autocomplete('hashtag', pk_set if reverse else [instance.pk])
+
+
+def refresh_topic_entry(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not set(update_fields) & {'title', 'engagement_count'}:
+        return  # View flushes are picked up by the periodic rebuild
+    _refresh_autocomplete('topic', [instance.pk])
+
+
+def refresh_engaged_topic_entry(sender, instance, **kwargs):
+    _refresh_autocomplete('topic', [instance.topic_id])
+
+
+_user_model = get_model('user')
+post_save.connect(refresh_user_entry, sender=_user_model, dispatch_uid='autocomplete_save_user')
+post_delete.connect(refresh_user_entry, sender=_user_model, dispatch_uid='autocomplete_delete_user')
+post_save.connect(refresh_followed_user_entry, sender=CommunityFollow, dispatch_uid='autocomplete_follow')
+post_delete.connect(refresh_followed_user_entry, sender=CommunityFollow, dispatch_uid='autocomplete_unfollow')
+post_save.connect(refresh_hashtag_entry, sender=HashTag, dispatch_uid='autocomplete_save_hashtag')
+post_delete.connect(refresh_hashtag_entry, sender=HashTag, dispatch_uid='autocomplete_delete_hashtag')
+m2m_changed.connect(refresh_tagged_hashtag_entries, sender=HashTag.posts.through, dispatch_uid='autocomplete_tagging')
+post_save.connect(refresh_topic_entry, sender=Topic, dispatch_uid='autocomplete_save_topic')
+post_delete.connect(refresh_topic_entry, sender=Topic, dispatch_uid='autocomplete_delete_topic')
+for _model in (TopicPost, TopicLike):
+    post_save.connect(refresh_engaged_topic_entry, sender=_model, dispatch_uid=f'autocomplete_save_{_model.__name__}')
+    post_delete.connect(refresh_engaged_topic_entry, sender=_model, dispatch_uid=f'autocomplete_delete_{_model.__name__}')
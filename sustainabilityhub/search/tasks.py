@@ -0,0 +1,22 @@
+from celery import shared_task
+from sustainabilityhub.dispatch import IdempotentTask
+from .autocomplete import rebuild_autocomplete, refresh_entries
+from .indexing import index_objects
+
+
+@shared_task(base=IdempotentTask)
+def index_document(entity_type, object_id):
+    """Bring one object's search document up to date"""
+    index_objects(entity_type, [object_id])
+
+
+@shared_task(base=IdempotentTask)
+def refresh_autocomplete(kind, object_ids):
+    """Re-file autocomplete entries whose text or popularity changed"""
+    refresh_entries(kind, object_ids)
+
+
+@shared_task(base=IdempotentTask)
+def rebuild_autocomplete_index():
+    """Rebuild every autocomplete index, picking up changes no signal reports"""
+    rebuild_autocomplete()
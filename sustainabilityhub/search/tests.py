@@ -0,0 +1,220 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from community.models import Follow, HashTag, Post
+from events.models import Event
+from forums.models import Topic, TopicPost
+from projects.models import Project
+from .autocomplete import autocomplete, get_index
+from .backends import BasicSearchBackend
+from .faceted import faceted_search
+from .models import SearchDocument, SearchFacet
+from .query import search
+from .result_cache import metrics
+
+User = get_user_model()
+
+
+class SearchIndexTests(TestCase):
+    """Indexed objects are found by relevance and leave the index when deleted"""
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user = User.objects.create_user('gardener', 'gardener@example.com', 'pw', first_name='Rosa')
+            self.body_match = Topic.objects.create(
+                title='Weekend plans', content='Bring compost for the community garden', author=self.user
+            )
+            self.title_match = Topic.objects.create(title='Compost bins', content='Which ones work?', author=self.user)
+            self.project = Project.objects.create(
+                title='Rooftop garden', description='Growing food', creator=self.user, tags=['compost']
+            )
+
+    def test_ranked_by_relevance(self):
+        hits = search('compost')[0:10]
+        self.assertEqual(hits[0], ('topic', self.title_match))
+        self.assertCountEqual(hits, [('topic', self.title_match), ('topic', self.body_match), ('project', self.project)])
+        self.assertEqual(search('compost', ['project'])[0:10], [('project', self.project)])
+
+    def test_prefix_and_all_words_match(self):
+        self.assertEqual(search('garde rooft')[0:10], [('project', self.project)])
+        self.assertEqual(search('rosa').count(), 1)
+        self.assertEqual(search('"; DROP TABLE --').count(), 0)
+
+    def test_updates_and_deletes_follow_signals(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.title_match.title = 'Worm farms'
+            self.title_match.save()
+            self.project.delete()
+        self.assertEqual(search('compost')[0:10], [('topic', self.body_match)])
+        self.assertEqual(search('worm')[0:10], [('topic', self.title_match)])
+        self.assertFalse(SearchDocument.objects.filter(entity_type='project').exists())
+
+    def test_basic_backend_matches(self):
+        backend = BasicSearchBackend()
+        self.assertEqual(backend.search('compost', ['topic'])[0], ('topic', self.title_match.pk))
+        self.assertEqual(backend.count('compost'), 3)
+
+    def test_global_search_view(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/search/', {'q': 'compost'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['results']['topics'], [self.title_match, self.body_match])
+        self.assertEqual(response.context['page_obj'].paginator.count, 3)
+
+
+class AutocompleteTests(TestCase):
+    """Prefix suggestions are ranked by popularity and follow changes after commit"""
+
+    def setUp(self):
+        get_index().clear()
+        self.rosa = User.objects.create_user('rosa', 'rosa@example.com', 'pw', first_name='Rosa', last_name='Parks')
+        self.ross = User.objects.create_user('ross', 'ross@example.com', 'pw')
+        self.fan = User.objects.create_user('fan', 'fan@example.com', 'pw')
+        self.topic = Topic.objects.create(title='Solar roof ideas', content='...', author=self.rosa)
+
+    def labels(self, query, kind):
+        return [match['label'] for match in autocomplete(query, [kind])[kind]]
+
+    def test_prefix_matches_ranked_by_followers(self):
+        self.assertEqual(self.labels('ros', 'user'), ['rosa', 'ross'])
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(follower=self.fan, following=self.ross)
+        self.assertEqual(self.labels('ros', 'user'), ['ross', 'rosa'])
+        self.assertEqual(self.labels('park', 'user'), ['rosa'])
+
+    def test_warm_lookups_need_no_queries(self):
+        autocomplete('r')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.labels('roof', 'topic'), ['Solar roof ideas'])
+
+    def test_hashtags_follow_tagging(self):
+        self.assertEqual(self.labels('compost', 'hashtag'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            quiet = HashTag.objects.create(name='compostables')
+            busy = HashTag.objects.create(name='compost')
+            busy.posts.add(Post.objects.create(author=self.rosa, content='Turned the pile'))
+        self.assertEqual(self.labels('#comp', 'hashtag'), ['#compost', '#compostables'])
+        with self.captureOnCommitCallbacks(execute=True):
+            quiet.delete()
+        self.assertEqual(self.labels('comp', 'hashtag'), ['#compost'])
+
+    def test_renames_and_engagement_refresh_entries(self):
+        autocomplete('solar')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.topic.title = 'Heat pumps'
+            self.topic.save()
+            TopicPost.objects.create(topic=self.topic, author=self.fan, content='Agreed')
+            self.ross.is_active = False
+            self.ross.save()
+        self.assertEqual(self.labels('solar', 'topic'), [])
+        self.assertEqual(self.labels('pump', 'topic'), ['Heat pumps'])
+        self.assertEqual(self.labels('ros', 'user'), ['rosa'])
+
+    def test_api_endpoint(self):
+        response = self.client.get('/api/search/autocomplete/', {'q': 'Ro', 'types': 'user,bogus', 'limit': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.json()), ['user'])
+        self.assertEqual(len(response.json()['user']), 1)
+
+
+class ResultCacheTests(TestCase):
+    """Repeated searches are served from the cache until the searched model changes"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('planner', 'planner@example.com', 'pw', is_staff=True)
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project = Project.objects.create(title='Compost hub', description='d', creator=self.user)
+
+    def listed(self, search):
+        return list(self.client.get('/projects/', {'search': search}).context['projects'])
+
+    def test_list_view_reuses_ids_until_a_write(self):
+        self.assertEqual(self.listed('Compost'), [self.project])
+        self.assertEqual(self.listed('  compost '), [self.project])
+        self.assertEqual(metrics()['projects'], {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other = Project.objects.create(title='Compost school', description='d', creator=self.user)
+        self.assertCountEqual(self.listed('compost'), [self.project, other])
+        self.assertEqual(metrics()['projects']['misses'], 2)
+
+    def test_global_search_is_cached_until_reindexed(self):
+        self.client.get('/search/', {'q': 'compost'})
+        with self.assertNumQueries(2):  # the user and the page's projects; no FTS query
+            response = self.client.get('/search/', {'q': 'COMPOST'})
+        self.assertEqual(response.context['results']['projects'], [self.project])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.title = 'Worm hub'
+            self.project.save()
+        self.assertEqual(self.client.get('/search/', {'q': 'compost'}).context['page_obj'].paginator.count, 0)
+
+    def test_metrics_endpoint_is_staff_only(self):
+        self.assertEqual(self.client.get('/api/search/cache-metrics/').status_code, 200)
+        self.client.logout()
+        self.assertIn(self.client.get('/api/search/cache-metrics/').status_code, (401, 403))
+
+
+class FacetedSearchApiTests(TestCase):
+    """One request returns a page of hits, facet counts and a cursor to the next page"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('organizer', 'organizer@example.com', 'pw')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.projects = [
+                Project.objects.create(
+                    title=f'Solar project {i}', description='d', creator=self.user,
+                    status='active' if i % 2 else 'planning', tags=['solar', 'energy'] if i < 3 else ['solar'],
+                )
+                for i in range(5)
+            ]
+            self.event = Event.objects.create(
+                title='Solar workshop', description='d', organizer=self.user, event_type='workshop',
+                location='Hall', start_date=timezone.now(),
+            )
+
+    def test_facets_counted_in_one_pass(self):
+        result = faceted_search('solar')
+        self.assertEqual(result['count'], 6)
+        self.assertEqual(result['facets']['type'], {'project': 5, 'event': 1})
+        self.assertEqual(result['facets']['status'], {'planning': 3, 'active': 2})
+        self.assertEqual(result['facets']['tag'], {'solar': 5, 'energy': 3})
+        self.assertEqual(result['facets']['event_type'], {'workshop': 1})
+
+    def test_filters_narrow_hits_and_facets(self):
+        result = faceted_search('solar', ['project'], {'status': 'active', 'tag': 'energy'})
+        self.assertEqual(result['count'], 1)
+        self.assertEqual(result['results'][0]['id'], self.projects[1].pk)
+        self.assertEqual(result['results'][0]['url'], f'/projects/{self.projects[1].pk}/')
+
+    def test_cursor_walks_every_hit_once(self):
+        self.client.force_login(self.user)
+        seen, cursor = [], ''
+        while True:
+            data = self.client.get('/api/search/', {'q': 'solar', 'limit': 4, 'cursor': cursor}).json()
+            seen += [(hit['type'], hit['id']) for hit in data['results']]
+            cursor = data['next']
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 6)
+        self.assertEqual(len(set(seen)), 6)
+        self.assertEqual(self.client.get('/api/search/', {'q': 'solar', 'cursor': 'nonsense'}).status_code, 404)
+
+    def test_reindexing_replaces_facets(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.event_type = 'meetup'
+            self.event.save()
+        self.assertEqual(faceted_search('workshop', filters={'event_type': 'meetup'})['count'], 1)
+        self.assertEqual(SearchFacet.objects.filter(document__entity_type='event').count(), 1)
+
+    def test_basic_backend_matches_compose(self):
+        with patch('search.faceted.get_backend', BasicSearchBackend):
+            result = faceted_search('solar project', filters={'status': 'planning'}, limit=2)
+        self.assertEqual(result['count'], 3)
+        self.assertIsNotNone(result['next'])
@@ -13,4 +13,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sustainabilityhub.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up: the gateway loads rooms that use the ORM
+from sustainabilityhub.realtime import websocket_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    """WebSockets go to the chat gateway, everything else to Django"""
+    if scope['type'] == 'websocket':
+        await websocket_application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
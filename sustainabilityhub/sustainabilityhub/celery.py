@@ -0,0 +1,22 @@
+"""
+Celery application for background work.
+
+Signal handlers hand their side effects (notifications, timeline fan-out,
+activity logging) to tasks through ``sustainabilityhub.dispatch.enqueue`` so
+requests only pay for their own writes. Run a worker and the beat scheduler
+with::
+
+    celery -A sustainabilityhub worker -l info
+    celery -A sustainabilityhub beat -l info
+
+Development settings execute tasks eagerly in-process instead.
+"""
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sustainabilityhub.settings')
+
+app = Celery('sustainabilityhub')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -0,0 +1,151 @@
+"""
+In-memory comment trees for self-referential comment models.
+
+``community.Comment`` and ``forums.Comment`` both nest replies through a
+``parent`` foreign key. Instead of following ``comment.replies`` node by node,
+``attach_comment_trees`` loads every comment of a page of posts in one query
+and links the tree up in Python. Each comment gets:
+
+* ``tree_replies`` - the visible child comments, in creation order
+* ``hidden_replies`` - how many children were cut off by the depth or
+  breadth limit
+* ``replies_cursor`` - an opaque cursor for ``load_more_replies`` when
+  ``hidden_replies`` is non-zero
+
+Limits default to the COMMENT_TREE_MAX_DEPTH and COMMENT_TREE_MAX_CHILDREN
+settings. Roots are depth 0; a comment at ``max_depth`` shows no replies.
+"""
+import base64
+import json
+
+from django.conf import settings
+from django.db.models import prefetch_related_objects
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _limits(max_depth, max_children):
+    if max_depth is None:
+        max_depth = getattr(settings, 'COMMENT_TREE_MAX_DEPTH', 5)
+    if max_children is None:
+        max_children = getattr(settings, 'COMMENT_TREE_MAX_CHILDREN', 10)
+    return max_depth, max_children
+
+
+def encode_cursor(post_id, parent_id, after=None, before=None):
+    """
+    Cursor for the replies of ``parent_id`` (None for top-level comments of
+    ``post_id``) that come after the comment ``after``, or from ``before``
+    onwards when nothing of the list has been shown yet.
+    """
+    if after is not None:
+        position = [after.created_at.isoformat(), after.pk]
+    else:
+        position = [before.created_at.isoformat(), None]
+    raw = json.dumps([post_id, parent_id] + position)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (post_id, parent_id, created_at, pk) or raise InvalidCursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        post_id, parent_id, created_at, pk = json.loads(raw)
+        created_at = parse_datetime(created_at)
+        if created_at is None:
+            raise ValueError(created_at)
+        return (
+            int(post_id),
+            None if parent_id is None else int(parent_id),
+            created_at,
+            None if pk is None else int(pk),
+        )
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise InvalidCursor(cursor)
+
+
+def _remaining_cursor(post_id, parent_id, siblings, visible):
+    if len(siblings) == len(visible):
+        return None
+    if visible:
+        return encode_cursor(post_id, parent_id, after=visible[-1])
+    return encode_cursor(post_id, parent_id, before=siblings[0])
+
+
+def _load(comment_model, post_ids, select_related, prefetch):
+    comments = list(
+        comment_model.objects.filter(post_id__in=post_ids)
+        .select_related(*select_related).order_by('created_at', 'id')
+    )
+    if prefetch:
+        prefetch_related_objects(comments, *prefetch)
+    children = {}
+    for comment in comments:
+        children.setdefault((comment.post_id, comment.parent_id), []).append(comment)
+    return comments, children
+
+
+def _link(post_id, parent, siblings, children, depth, max_depth, max_children):
+    """Attach up to max_children of ``siblings`` below ``parent``; returns the visible ones"""
+    visible = siblings[:max_children] if depth <= max_depth else []
+    for comment in visible:
+        _link(post_id, comment, children.get((post_id, comment.pk), []), children,
+              depth + 1, max_depth, max_children)
+    if parent is not None:
+        parent.tree_replies = visible
+        parent.hidden_replies = len(siblings) - len(visible)
+        parent.replies_cursor = _remaining_cursor(post_id, parent.pk, siblings, visible)
+    return visible
+
+
+def attach_comment_trees(posts, comment_model, max_depth=None, max_children=None,
+                         select_related=('author',), prefetch=()):
+    """
+    Load the comments of ``posts`` with one query (plus one per ``prefetch``
+    lookup) and set ``comment_tree``, ``comment_total``, ``hidden_comments``
+    and ``comments_cursor`` on every post.
+    """
+    max_depth, max_children = _limits(max_depth, max_children)
+    posts = list(posts)
+    if not posts:
+        return posts
+    comments, children = _load(comment_model, [post.pk for post in posts], select_related, prefetch)
+
+    totals = {}
+    for comment in comments:
+        totals[comment.post_id] = totals.get(comment.post_id, 0) + 1
+
+    for post in posts:
+        roots = children.get((post.pk, None), [])
+        post.comment_tree = _link(post.pk, None, roots, children, 0, max_depth, max_children)
+        post.comment_total = totals.get(post.pk, 0)
+        post.hidden_comments = len(roots) - len(post.comment_tree)
+        post.comments_cursor = _remaining_cursor(post.pk, None, roots, post.comment_tree)
+    return posts
+
+
+def load_more_replies(comment_model, cursor, max_depth=None, max_children=None,
+                      select_related=('author',), prefetch=()):
+    """
+    Continue a truncated reply list. Returns ``(comments, next_cursor)``
+    where each comment carries its own subtree, built with the same limits
+    relative to the comments returned.
+    """
+    max_depth, max_children = _limits(max_depth, max_children)
+    post_id, parent_id, created_at, pk = decode_cursor(cursor)
+
+    _, children = _load(comment_model, [post_id], select_related, prefetch)
+    siblings = children.get((post_id, parent_id), [])
+    if pk is None:
+        siblings = [comment for comment in siblings if comment.created_at >= created_at]
+    else:
+        siblings = [
+            comment for comment in siblings
+            if (comment.created_at, comment.pk) > (created_at, pk)
+        ]
+
+    visible = _link(post_id, None, siblings, children, 0, max_depth, max_children)
+    return visible, _remaining_cursor(post_id, parent_id, siblings, visible)
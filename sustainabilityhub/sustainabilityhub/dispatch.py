@@ -0,0 +1,51 @@
+"""
+Helpers for handing work to Celery.
+
+``enqueue`` publishes a task once the surrounding transaction commits, so a
+worker never looks for rows that are not visible yet (or were rolled back).
+Tasks built on ``IdempotentTask`` accept an ``idempotency_key`` keyword; a
+key that already ran successfully within TASK_IDEMPOTENCY_TIMEOUT seconds is
+skipped, which makes redelivered or double-enqueued messages harmless.
+"""
+from celery import Task
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+
+KEY = 'tasks:idempotency:{}'
+
+
+class IdempotentTask(Task):
+    """Retrying task base that runs at most once per idempotency key"""
+    autoretry_for = (DatabaseError, ConnectionError)
+    retry_backoff = True
+    retry_kwargs = {'max_retries': 5}
+    # idempotency_key is consumed by __call__, not declared by the task functions
+    typing = False
+
+    def __call__(self, *args, idempotency_key=None, **kwargs):
+        if idempotency_key is None:
+            return super().__call__(*args, **kwargs)
+
+        key = KEY.format(idempotency_key)
+        timeout = getattr(settings, 'TASK_IDEMPOTENCY_TIMEOUT', 24 * 60 * 60)
+        # Retries keep the task id, so they may re-enter a key their first attempt claimed
+        owner = self.request.id or idempotency_key
+        if not cache.add(key, owner, timeout) and cache.get(key) != owner:
+            return None
+        try:
+            result = super().__call__(*args, **kwargs)
+        except BaseException:
+            # Release the key so a later redelivery can run, unless a retry already finished
+            if cache.get(key) == owner:
+                cache.delete(key)
+            raise
+        cache.set(key, 'done', timeout)
+        return result
+
+
+def enqueue(task, *args, idempotency_key=None, **kwargs):
+    """Send ``task`` after the current transaction commits"""
+    if idempotency_key is not None:
+        kwargs['idempotency_key'] = idempotency_key
+    transaction.on_commit(lambda: task.apply_async(args, kwargs))
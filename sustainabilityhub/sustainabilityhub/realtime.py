@@ -0,0 +1,419 @@
+"""
+WebSocket gateway for direct messages and project chat.
+
+sustainabilityhub.asgi hands ``/ws/<room>/<id>/`` WebSocket connections to
+``websocket_application`` and everything else to Django. A connection is
+authenticated from the session cookie, authorized by its room (see ROOMS)
+and subscribed to the room's pub/sub channel for as long as it stays open.
+Membership is checked again at least every REALTIME_AUTH_TTL seconds while
+the socket relays events, and for every message batch before it is saved;
+a user who left the room or was deactivated is closed with code 4403.
+Clients send JSON frames:
+
+* ``{"type": "message", "content": "...", "client_id": "..."}`` - queued and
+  saved in batches; the sender gets ``{"type": "ack", "client_id", "message"}``
+* ``{"type": "typing"}`` - relayed to the room, never stored
+* ``{"type": "read"}`` - moves the reader's watermark where the room has one
+
+and receive the ``message``, ``typing`` and ``read`` events of their room.
+Rooms publish new messages once they commit, whether they arrived over a
+socket or a form POST, so both paths reach every open connection. The
+pub/sub backend is chosen by the REALTIME_BACKEND setting:
+
+* ``memory`` - per-process queues, for development and tests.
+* ``redis`` - Redis pub/sub at REDIS_URL, shared by every ASGI worker.
+"""
+import asyncio
+import contextlib
+import json
+import logging
+import re
+import threading
+import time
+import weakref
+from importlib import import_module
+from types import SimpleNamespace
+from urllib.parse import urlparse
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.http import parse_cookie
+from django.http.request import validate_host
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+ROOMS = {
+    'messages': 'messaging.realtime.ConversationRoom',
+    'projects': 'projects.realtime.ProjectChatRoom',
+}
+ROUTE = re.compile(r'^/ws/(?P<kind>[a-z]+)/(?P<room_id>\d+)/$')
+CHANNEL_PREFIX = 'realtime:'
+TYPING_INTERVAL = 2  # Seconds between relayed typing events of one connection
+
+
+class Room:
+    """A kind of chat room; subclasses are listed in ROOMS"""
+    kind = None
+
+    @classmethod
+    def channel(cls, room_id):
+        return f'{cls.kind}:{room_id}'
+
+    def allowed(self, pairs):
+        """The (room_id, user_id) ``pairs`` whose active user belongs to the room"""
+        raise NotImplementedError
+
+    def authorize(self, user, room_id):
+        return (room_id, user.pk) in self.allowed({(room_id, user.pk)})
+
+    def persist(self, items):
+        """Save [(room_id, user_id, content)] in one transaction; returns the serialized messages"""
+        raise NotImplementedError
+
+    def read(self, user, room_id):
+        """Record that ``user`` read the room; returns the event to publish, if any"""
+        return None
+
+
+_rooms = {}
+
+
+def get_room(kind):
+    if kind not in ROOMS:
+        return None
+    if kind not in _rooms:
+        _rooms[kind] = import_string(ROOMS[kind])()
+    return _rooms[kind]
+
+
+# Pub/sub
+
+class MemoryPubSub:
+    """Queues of the subscribers in the current process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def publish(self, channel, event):
+        payload = json.dumps(event)
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            # Publishers may run in a worker thread, subscribers on the event loop
+            with contextlib.suppress(RuntimeError):
+                loop.call_soon_threadsafe(queue.put_nowait, payload)
+
+    async def apublish(self, channel, event):
+        self.publish(channel, event)
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, channel):
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscriber)
+
+        async def events():
+            while True:
+                yield json.loads(await subscriber[1].get())
+
+        try:
+            yield events()
+        finally:
+            with self._lock:
+                self._subscribers.get(channel, set()).discard(subscriber)
+
+
+class RedisPubSub:
+    """Redis pub/sub shared by every worker"""
+
+    def __init__(self, url):
+        import redis
+        self._url = url
+        self._redis = redis.Redis.from_url(url)
+        self._clients = weakref.WeakKeyDictionary()
+
+    def publish(self, channel, event):
+        self._redis.publish(CHANNEL_PREFIX + channel, json.dumps(event))
+
+    def _client(self):
+        import redis.asyncio
+        loop = asyncio.get_running_loop()
+        if loop not in self._clients:
+            self._clients[loop] = redis.asyncio.Redis.from_url(self._url)
+        return self._clients[loop]
+
+    async def apublish(self, channel, event):
+        await self._client().publish(CHANNEL_PREFIX + channel, json.dumps(event))
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, channel):
+        pubsub = self._client().pubsub()
+        await pubsub.subscribe(CHANNEL_PREFIX + channel)
+
+        async def events():
+            async for message in pubsub.listen():
+                if message['type'] == 'message':
+                    yield json.loads(message['data'])
+
+        try:
+            yield events()
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
+
+
+_pubsub = None
+_pubsub_lock = threading.Lock()
+
+
+def get_pubsub():
+    global _pubsub
+    if _pubsub is None:
+        with _pubsub_lock:
+            if _pubsub is None:
+                if getattr(settings, 'REALTIME_BACKEND', 'memory') == 'redis':
+                    _pubsub = RedisPubSub(settings.REDIS_URL)
+                else:
+                    _pubsub = MemoryPubSub()
+    return _pubsub
+
+
+def publish_on_commit(channel, event):
+    """Publish ``event`` to ``channel`` once the current transaction commits"""
+    def publish():
+        try:
+            get_pubsub().publish(channel, event)
+        except Exception:
+            # Sockets catch up on their next page load; never fail the write for them
+            logger.exception('Could not publish to %s', channel)
+    transaction.on_commit(publish)
+
+
+# Batched persistence
+
+class MessageBatcher:
+    """
+    Collects the messages sent over this event loop's sockets and saves them
+    REALTIME_BATCH_SIZE at a time, or REALTIME_FLUSH_INTERVAL seconds after
+    the first one arrived, whichever comes first.
+    """
+
+    def __init__(self, size, interval):
+        self.size, self.interval = size, interval
+        self._pending = []
+        self._timer = None
+        self._flushes = set()
+
+    async def submit(self, room, room_id, user_id, content):
+        """Queue a message and wait until it is saved; returns it serialized"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((room, room_id, user_id, content, future))
+        if len(self._pending) >= self.size:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.interval, self._flush_later)
+        return await future
+
+    def _flush_later(self):
+        self._timer = None
+        task = asyncio.ensure_future(self.flush())
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        by_room = {}
+        for room, room_id, user_id, content, future in batch:
+            by_room.setdefault(room, []).append(((room_id, user_id, content), future))
+        for room, entries in by_room.items():
+            try:
+                senders = {(room_id, user_id) for (room_id, user_id, _), _ in entries}
+                allowed = await sync_to_async(room.allowed)(senders)
+            except Exception as exc:
+                logger.exception('Could not check %s senders', room.kind)
+                self._fail(entries, exc)
+                continue
+            # Senders may have left the room since their socket connected
+            self._fail([entry for entry in entries if entry[0][:2] not in allowed], PermissionDenied())
+            entries = [entry for entry in entries if entry[0][:2] in allowed]
+            if not entries:
+                continue
+            try:
+                saved = await sync_to_async(room.persist)([item for item, _ in entries])
+            except Exception as exc:
+                logger.exception('Could not save %s %s messages', len(entries), room.kind)
+                self._fail(entries, exc)
+                continue
+            for (_, future), message in zip(entries, saved):
+                if not future.done():
+                    future.set_result(message)
+
+    @staticmethod
+    def _fail(entries, exc):
+        for _, future in entries:
+            if not future.done():
+                future.set_exception(exc)
+
+
+_batchers = weakref.WeakKeyDictionary()
+
+
+def get_batcher():
+    loop = asyncio.get_running_loop()
+    if loop not in _batchers:
+        _batchers[loop] = MessageBatcher(
+            getattr(settings, 'REALTIME_BATCH_SIZE', 100), getattr(settings, 'REALTIME_FLUSH_INTERVAL', 0.05)
+        )
+    return _batchers[loop]
+
+
+# Gateway
+
+def _header(scope, name):
+    for key, value in scope.get('headers', ()):
+        if key.decode('latin1').lower() == name:
+            return value.decode('latin1')
+    return None
+
+
+def _origin_allowed(scope):
+    origin = _header(scope, 'origin')
+    if origin is None:
+        return True
+    allowed = settings.ALLOWED_HOSTS
+    if settings.DEBUG and not allowed:
+        allowed = ['.localhost', '127.0.0.1', '[::1]']
+    return validate_host(urlparse(origin).hostname or '', allowed)
+
+
+def _authenticate(scope):
+    from django.contrib.auth import get_user
+    cookies = parse_cookie(_header(scope, 'cookie') or '')
+    session = import_module(settings.SESSION_ENGINE).SessionStore(cookies.get(settings.SESSION_COOKIE_NAME))
+    return get_user(SimpleNamespace(session=session))
+
+
+class Connection:
+    """One open socket of an authorized user in a room"""
+
+    def __init__(self, room, room_id, user, send):
+        self.room, self.room_id, self.user, self.send = room, room_id, user, send
+        self.channel = room.channel(room_id)
+        self.closed = False
+        self._last_typing = 0
+        self._authorized_at = time.monotonic()
+
+    async def send_event(self, event):
+        await self.send({'type': 'websocket.send', 'text': json.dumps(event)})
+
+    async def still_authorized(self):
+        """Re-check membership once REALTIME_AUTH_TTL has passed; closes the socket if it is gone"""
+        if self.closed:
+            return False
+        if time.monotonic() - self._authorized_at < getattr(settings, 'REALTIME_AUTH_TTL', 30):
+            return True
+        if await sync_to_async(self.room.authorize)(self.user, self.room_id):
+            self._authorized_at = time.monotonic()
+            return True
+        await self.revoke()
+        return False
+
+    async def revoke(self):
+        if not self.closed:
+            self.closed = True
+            await self.send({'type': 'websocket.close', 'code': 4403})
+
+    async def forward(self, events):
+        async for event in events:
+            if not await self.still_authorized():
+                return
+            await self.send_event(event)
+
+    async def run(self, receive):
+        async with get_pubsub().subscribe(self.channel) as events:
+            forwarding = asyncio.ensure_future(self.forward(events))
+            try:
+                while True:
+                    frame = await receive()
+                    if frame['type'] == 'websocket.disconnect':
+                        break
+                    if frame['type'] == 'websocket.receive':
+                        await self.handle(frame.get('text') or '')
+            finally:
+                forwarding.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await forwarding
+
+    async def handle(self, text):
+        if not await self.still_authorized():
+            return
+        try:
+            data = json.loads(text)
+            kind = data['type']
+        except (ValueError, TypeError, KeyError):
+            await self.send_event({'type': 'error', 'error': 'Frames must be JSON objects with a type'})
+            return
+        if kind == 'message':
+            await self.message(data)
+        elif kind == 'typing':
+            await self.typing()
+        elif kind == 'read':
+            event = await sync_to_async(self.room.read)(self.user, self.room_id)
+            if event:
+                await get_pubsub().apublish(self.channel, event)
+        else:
+            await self.send_event({'type': 'error', 'error': f'Unknown frame type: {kind}'})
+
+    async def message(self, data):
+        content = str(data.get('content') or '').strip()
+        max_length = getattr(settings, 'REALTIME_MAX_MESSAGE_LENGTH', 5000)
+        if not content or len(content) > max_length:
+            await self.send_event({
+                'type': 'error', 'client_id': data.get('client_id'),
+                'error': f'Messages must be 1 to {max_length} characters',
+            })
+            return
+        try:
+            message = await get_batcher().submit(self.room, self.room_id, self.user.pk, content)
+        except PermissionDenied:
+            await self.revoke()
+            return
+        except Exception:
+            await self.send_event({'type': 'error', 'client_id': data.get('client_id'), 'error': 'Message not sent'})
+            return
+        await self.send_event({'type': 'ack', 'client_id': data.get('client_id'), 'message': message})
+
+    async def typing(self):
+        now = time.monotonic()
+        if now - self._last_typing < TYPING_INTERVAL:
+            return
+        self._last_typing = now
+        await get_pubsub().apublish(self.channel, {
+            'type': 'typing', 'user_id': self.user.pk, 'username': self.user.get_username(),
+        })
+
+
+async def websocket_application(scope, receive, send):
+    """ASGI application for the ``websocket`` scope type"""
+    if (await receive())['type'] != 'websocket.connect':
+        return
+    match = ROUTE.match(scope['path'])
+    room = get_room(match['kind']) if match else None
+    if room is None or not _origin_allowed(scope):
+        await send({'type': 'websocket.close', 'code': 4404})
+        return
+    room_id = int(match['room_id'])
+    user = await sync_to_async(_authenticate)(scope)
+    if not user.is_authenticated or not await sync_to_async(room.authorize)(user, room_id):
+        await send({'type': 'websocket.close', 'code': 4403})
+        return
+    await send({'type': 'websocket.accept'})
+    await Connection(room, room_id, user, send).run(receive)
@@ -1,49 +1,29 @@
+from django.conf import settings
+from django.core.paginator import Paginator
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
-from forums.models import Topic
-from projects.models import Project
-from events.models import Event
-from resources.models import Resource
-from django.contrib.auth import get_user_model
+from search.query import search
+
+RESULT_GROUPS = {
+    'topic': 'topics',
+    'project': 'projects',
+    'event': 'events',
+    'resource': 'resources',
+    'user': 'users',
+}
 
-User = get_user_model()
 
 @login_required
 def global_search(request):
     query = request.GET.get('q', '').strip()
-    results = {
-        'topics': [],
-        'projects': [],
-        'events': [],
-        'resources': [],
-        'users': [],
-    }
+    results = {group: [] for group in RESULT_GROUPS.values()}
+    page_obj = None
     
     if query:
-        # Search topics
-        results['topics'] = Topic.objects.filter(
-            Q(title__icontains=query) | Q(content__icontains=query)
-        ).select_related('author', 'category')[:10]
-        
-        # Search projects
-        results['projects'] = Project.objects.filter(
-            Q(title__icontains=query) | Q(description__icontains=query) | Q(tags__icontains=query)
-        ).select_related('creator')[:10]
-        
-        # Search events
-        results['events'] = Event.objects.filter(
-            Q(title__icontains=query) | Q(description__icontains=query) | Q(location__icontains=query)
-        ).select_related('organizer')[:10]
-        
-        # Search resources
-        results['resources'] = Resource.objects.filter(
-            Q(title__icontains=query) | Q(description__icontains=query) | Q(tags__icontains=query)
-        ).select_related('author')[:10]
-        
-        # Search users
-        results['users'] = User.objects.filter(
-            Q(username__icontains=query) | Q(first_name__icontains=query) | Q(last_name__icontains=query)
-        ).filter(is_active=True)[:10]
+        # One ranked page across every content type, grouped for display
+        paginator = Paginator(search(query), getattr(settings, 'SEARCH_PAGE_SIZE', 20))
+        page_obj = paginator.get_page(request.GET.get('page'))
+        for entity_type, obj in page_obj.object_list:
+            results[RESULT_GROUPS[entity_type]].append(obj)
     
-    return render(request, 'search_results.html', {'query': query, 'results': results})
+    return render(request, 'search_results.html', {'query': query, 'results': results, 'page_obj': page_obj})
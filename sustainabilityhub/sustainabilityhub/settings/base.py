@@ -47,6 +47,8 @@ LOCAL_APPS = [
     'rms',
     'community',  # New app for community feed
     'activity_logs',  # New app for activity tracking
+    'search',  # Full-text search index
+    'tags',  # Normalized project and resource tags
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
@@ -135,11 +137,14 @@ LOGOUT_REDIRECT_URL = '/'
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Redis (cache and shared counters)
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1')
+
 # Caching
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
-        'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+        'LOCATION': REDIS_URL,
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
         },
@@ -148,6 +153,45 @@ CACHES = {
     }
 }
 
+# Background tasks (Celery)
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', REDIS_URL)
+CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER', 'False').lower() == 'true'
+CELERY_TASK_EAGER_PROPAGATES = True
+CELERY_TASK_ACKS_LATE = True  # Redeliver tasks whose worker died; idempotency keys absorb repeats
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    'flush-topic-views': {
+        'task': 'forums.tasks.flush_topic_views',
+        'schedule': 60.0,
+    },
+    'trim-timelines': {
+        'task': 'community.tasks.trim_timelines',
+        'schedule': 60.0 * 60,
+    },
+    'recompute-trending': {
+        'task': 'forums.tasks.recompute_trending',
+        'schedule': 60.0 * 60 * 24,
+    },
+    'reconcile-community-counters': {
+        'task': 'community.tasks.reconcile_counters',
+        'schedule': 60.0 * 60 * 24,
+    },
+    'purge-read-notifications': {
+        'task': 'notifications.tasks.purge_read_notifications',
+        'schedule': 60.0 * 60 * 24,
+    },
+    'rebuild-leaderboards': {
+        'task': 'community.tasks.rebuild_leaderboards',
+        'schedule': 60.0 * 60 * 24,
+    },
+    'rebuild-autocomplete': {
+        'task': 'search.tasks.rebuild_autocomplete_index',
+        'schedule': 60.0 * 60,
+    },
+}
+
 # Session configuration
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 SESSION_CACHE_ALIAS = 'default'
@@ -249,4 +293,35 @@ LOGGING = {
 # Custom settings
 ACTIVITY_LOG_ENABLED = True
 NOTIFICATION_BATCH_SIZE = 50
-COMMUNITY_FEED_PAGE_SIZE = 20
\ No newline at end of file
+COMMUNITY_FEED_PAGE_SIZE = 20
+DASHBOARD_CACHE_TIMEOUT = 300  # Seconds between home page statistics refreshes
+TRENDING_HALF_LIFE_HOURS = 168  # Trending topic engagement loses half its weight per week
+TRENDING_EPOCH_CACHE_TIMEOUT = 60  # Seconds a worker may keep scoring against the epoch before a rebase
+TOPIC_VIEW_BUFFER = 'redis'  # Where topic views accumulate before flushing: 'redis' or 'memory'
+TOPIC_VIEW_FLUSH_INTERVAL = 60  # Seconds between in-process flushes of the memory buffer
+FEED_FANOUT_MAX_FOLLOWERS = 5000  # Authors above this are merged into feeds at read time
+FEED_FANOUT_BATCH_SIZE = 1000
+TIMELINE_MAX_ENTRIES = 800  # Newest posts kept per user timeline
+TIMELINE_FOLLOW_BACKFILL = 50  # Recent posts copied into a timeline on follow
+COMMENT_TREE_MAX_DEPTH = 5  # Deeper replies are reached through "load more" cursors
+COMMENT_TREE_MAX_CHILDREN = 10  # Replies shown per comment before a cursor
+UNREAD_COUNT_TIMEOUT = 3600  # Upper bound on how long a cached unread badge count can drift
+NOTIFICATION_TASK_CHUNK_SIZE = 1000  # Recipients per background notification task
+NOTIFICATION_RETENTION_DAYS = 90  # Read notifications older than this are purged
+TASK_IDEMPOTENCY_TIMEOUT = 86400  # Seconds a finished task's idempotency key is remembered
+SEARCH_BACKEND = 'auto'  # 'sqlite' (FTS5), 'postgres' (tsvector) or 'basic'; 'auto' follows the database
+SEARCH_PAGE_SIZE = 20
+LEADERBOARD_BACKEND = 'redis'  # Where impact leaderboards live: 'redis' or 'memory' (per process)
+LEADERBOARD_SIZE = 10
+BADGE_BACKFILL_CHUNK_SIZE = 500  # Users per badge backfill task
+SEARCH_FACET_LIMIT = 10  # Values returned per facet by the search API
+SEARCH_CACHE_TIMEOUT = 600  # Upper bound on cached search results; writes retire them sooner
+AUTOCOMPLETE_BACKEND = 'redis'  # Where the typeahead prefix index lives: 'redis' or 'memory' (per process)
+AUTOCOMPLETE_MAX_PREFIX = 20  # Longer queries are filtered from this prefix's matches
+AUTOCOMPLETE_LIMIT = 8  # Suggestions returned per entity type
+MESSAGE_HISTORY_PAGE_SIZE = 50  # Messages per conversation window; older ones load by cursor
+REALTIME_BACKEND = 'redis'  # Chat socket pub/sub: 'redis' (shared by every ASGI worker) or 'memory' (per process)
+REALTIME_BATCH_SIZE = 100  # Socket messages saved per INSERT
+REALTIME_FLUSH_INTERVAL = 0.05  # Longest a socket message waits in the batch, in seconds
+REALTIME_MAX_MESSAGE_LENGTH = 5000
+REALTIME_AUTH_TTL = 30  # Seconds an open socket trusts its room membership before checking again
@@ -26,6 +26,18 @@ CACHES = {
     }
 }
 
+# Count topic views in-process during development
+TOPIC_VIEW_BUFFER = 'memory'
+
+# Keep the autocomplete index in-process; tasks run eagerly so it stays current
+AUTOCOMPLETE_BACKEND = 'memory'
+LEADERBOARD_BACKEND = 'memory'
+REALTIME_BACKEND = 'memory'
+
+# Run background tasks in-process; the memory broker stands in for Redis
+CELERY_BROKER_URL = 'memory://'
+CELERY_TASK_ALWAYS_EAGER = True
+
 # Debug toolbar
 if DEBUG:
     try:
@@ -40,6 +40,7 @@ urlpatterns = [
     
     # API endpoints
     path('api/auth/', include('accounts.api_urls')),
+    path('api/search/', include('search.api_urls')),
 ]
 
 
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from tags.tagging import rebuild_tags
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the tag index and tag counters from the project and resource tag lists'
+
+    def handle(self, *args, **options):
+        written = rebuild_tags()
+        self.stdout.write(self.style.SUCCESS(f'[OK] Indexed {written} tag links'))
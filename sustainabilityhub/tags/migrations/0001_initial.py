@@ -0,0 +1,95 @@
+# Generated by Django 4.2.30 on 2026-10-18 03:51
+
+import re
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+TAGGED = [
+    ('projects', 'Project', 'ProjectTag', 'project', 'project_count'),
+    ('resources', 'Resource', 'ResourceTag', 'resource', 'resource_count'),
+]
+
+
+def _normalize(raw):
+    if isinstance(raw, str):
+        raw = raw.split(',')
+    names = []
+    for item in raw or ():
+        name = re.sub(r'\s+', ' ', str(item)).strip().lstrip('#').lower()[:50]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def backfill_tags(apps, schema_editor):
+    Tag = apps.get_model('tags', 'Tag')
+    for app_label, model_name, through_name, field, counter in TAGGED:
+        through = apps.get_model('tags', through_name)
+        names = {
+            pk: _normalize(tags)
+            for pk, tags in apps.get_model(app_label, model_name).objects.values_list('id', 'tags').iterator()
+        }
+        all_names = sorted({name for tag_names in names.values() for name in tag_names})
+        Tag.objects.bulk_create([Tag(name=name) for name in all_names], batch_size=500, ignore_conflicts=True)
+        tag_ids = dict(Tag.objects.values_list('name', 'id'))
+        through.objects.bulk_create([
+            through(**{f'{field}_id': object_id, 'tag_id': tag_ids[name]})
+            for object_id, tag_names in names.items()
+            for name in tag_names
+        ], batch_size=500)
+        counts = dict(through.objects.values('tag_id').annotate(total=Count('id')).values_list('tag_id', 'total'))
+        tags = [Tag(pk=tag_id, **{counter: total}) for tag_id, total in counts.items()]
+        Tag.objects.bulk_update(tags, [counter], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('resources', '0002_alter_resource_url'),
+        ('projects', '0003_projectchat_projectchatmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('project_count', models.PositiveIntegerField(default=0)),
+                ('resource_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['name'],
+                'indexes': [models.Index(fields=['-project_count'], name='tags_tag_project_count'), models.Index(fields=['-resource_count'], name='tags_tag_resource_count')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResourceTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='resources.resource')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resource_links', to='tags.tag')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tag', 'resource'], name='tags_resourcetag_tag_resource')],
+                'unique_together': {('resource', 'tag')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ProjectTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='projects.project')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='project_links', to='tags.tag')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tag', 'project'], name='tags_projecttag_tag_project')],
+                'unique_together': {('project', 'tag')},
+            },
+        ),
+        migrations.RunPython(backfill_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+from django.db import models
+
+
+class Tag(models.Model):
+    """A normalized tag shared by projects and resources"""
+    name = models.CharField(max_length=50, unique=True)
+    project_count = models.PositiveIntegerField(default=0)
+    resource_count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['name']
+        indexes = [
+            models.Index(fields=['-project_count'], name='tags_tag_project_count'),
+            models.Index(fields=['-resource_count'], name='tags_tag_resource_count'),
+        ]
+    
+    def __str__(self):
+        return self.name
+
+
+class ProjectTag(models.Model):
+    project = models.ForeignKey('projects.Project', on_delete=models.CASCADE, related_name='tag_links')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='project_links')
+    
+    class Meta:
+        unique_together = ['project', 'tag']
+        indexes = [
+            # Tag-filtered listings and "related by shared tags" start from the tag
+            models.Index(fields=['tag', 'project'], name='tags_projecttag_tag_project'),
+        ]
+    
+    def __str__(self):
+        return f'{self.project_id} #{self.tag_id}'
+
+
+class ResourceTag(models.Model):
+    resource = models.ForeignKey('resources.Resource', on_delete=models.CASCADE, related_name='tag_links')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='resource_links')
+    
+    class Meta:
+        unique_together = ['resource', 'tag']
+        indexes = [
+            models.Index(fields=['tag', 'resource'], name='tags_resourcetag_tag_resource'),
+        ]
+    
+    def __str__(self):
+        return f'{self.resource_id} #{self.tag_id}'
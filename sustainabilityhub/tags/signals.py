@@ -0,0 +1,19 @@
+from django.db.models.signals import post_save, pre_delete
+from .tagging import TAGGED, release_tags, sync_tags
+
+
+def sync_saved_tags(sender, instance, update_fields=None, **kwargs):
+    """Mirror the JSON tag list into the tag index"""
+    if update_fields and 'tags' not in update_fields:
+        return
+    sync_tags(instance)
+
+
+def release_deleted_tags(sender, instance, **kwargs):
+    # The through rows cascade without signals, so uncount them first
+    release_tags(instance)
+
+
+for _label in TAGGED:
+    post_save.connect(sync_saved_tags, sender=_label, dispatch_uid=f'tags_sync_{_label}')
+    pre_delete.connect(release_deleted_tags, sender=_label, dispatch_uid=f'tags_release_{_label}')
@@ -0,0 +1,149 @@
+"""
+Normalized tags for the ``tags`` JSON lists of projects and resources.
+
+The JSON list stays what forms edit; tags.signals mirrors it into the Tag
+table and a through table after every save, keeping Tag.project_count and
+Tag.resource_count in step with F() updates. Listings filter, tag clouds
+rank and related-item lookups join on the (tag, object) indexes instead of
+matching substrings of serialized JSON.
+"""
+import re
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Count, F
+
+TAGGED = {
+    'projects.project': {'through': 'tags.ProjectTag', 'field': 'project', 'counter': 'project_count'},
+    'resources.resource': {'through': 'tags.ResourceTag', 'field': 'resource', 'counter': 'resource_count'},
+}
+MAX_LENGTH = 50
+
+
+def normalize_tags(raw):
+    """Lower-cased, de-duplicated tag names from a JSON list or a comma-separated string"""
+    if isinstance(raw, str):
+        raw = raw.split(',')
+    names = []
+    for item in raw or ():
+        name = re.sub(r'\s+', ' ', str(item)).strip().lstrip('#').lower()[:MAX_LENGTH]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def _config(model):
+    config = TAGGED[model._meta.label_lower]
+    return global_apps.get_model(config['through']), config['field'], config['counter']
+
+
+def _tag_ids(names):
+    Tag = global_apps.get_model('tags', 'Tag')
+    Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+    return dict(Tag.objects.filter(name__in=names).values_list('name', 'id'))
+
+
+def sync_tags(obj):
+    """Mirror ``obj.tags`` into the through table, adjusting tag counters by the difference"""
+    through, field, counter = _config(type(obj))
+    Tag = global_apps.get_model('tags', 'Tag')
+    with transaction.atomic():
+        current = set(through.objects.filter(**{field: obj}).values_list('tag_id', flat=True))
+        names = normalize_tags(obj.tags)
+        wanted = set(_tag_ids(names).values()) if names else set()
+        removed, added = current - wanted, wanted - current
+        if removed:
+            through.objects.filter(**{field: obj, 'tag_id__in': removed}).delete()
+            Tag.objects.filter(pk__in=removed).update(**{counter: F(counter) - 1})
+        if added:
+            through.objects.bulk_create([through(**{field: obj, 'tag_id': tag_id}) for tag_id in added])
+            Tag.objects.filter(pk__in=added).update(**{counter: F(counter) + 1})
+
+
+def release_tags(obj):
+    """Decrement the counters of a tagged object about to be deleted"""
+    through, field, counter = _config(type(obj))
+    global_apps.get_model('tags', 'Tag').objects.filter(
+        pk__in=through.objects.filter(**{field: obj}).values('tag_id')
+    ).update(**{counter: F(counter) - 1})
+
+
+def tagged_ids(model, name):
+    """Subquery of the ids of ``model`` objects carrying the tag ``name``"""
+    through, field, _ = _config(model)
+    names = normalize_tags([name]) or ['']
+    return through.objects.filter(tag__name=names[0]).values(field)
+
+
+def tagged(queryset, name):
+    """Narrow a project or resource queryset to objects carrying the tag ``name``"""
+    return queryset.filter(pk__in=tagged_ids(queryset.model, name))
+
+
+def tag_cloud(model, limit=30):
+    """The most used tags of ``model`` with their counts, read from the counter index"""
+    _, _, counter = _config(model)
+    Tag = global_apps.get_model('tags', 'Tag')
+    return list(
+        Tag.objects.filter(**{f'{counter}__gt': 0}).order_by(f'-{counter}', 'name')
+        .annotate(count=F(counter))[:limit]
+    )
+
+
+def tags_of(obj):
+    through, field, _ = _config(type(obj))
+    return through.objects.filter(**{field: obj}).values('tag_id')
+
+
+def related(obj, limit=5):
+    """Objects of the same kind sharing the most tags with ``obj``, most shared first"""
+    through, field, _ = _config(type(obj))
+    ranked = list(
+        through.objects.filter(tag_id__in=tags_of(obj)).exclude(**{field: obj})
+        .values(f'{field}_id').annotate(shared=Count('id')).order_by('-shared', f'-{field}_id')
+        .values_list(f'{field}_id', 'shared')[:limit]
+    )
+    loaded = type(obj)._default_manager.in_bulk([object_id for object_id, _ in ranked])
+    return [loaded[object_id] for object_id, _ in ranked if object_id in loaded]
+
+
+def rebuild_tags(batch_size=500):
+    """Recreate every through row and counter from the JSON lists; returns links written"""
+    Tag = global_apps.get_model('tags', 'Tag')
+    written = 0
+    for label, config in TAGGED.items():
+        model = global_apps.get_model(label)
+        through = global_apps.get_model(config['through'])
+        field = config['field']
+        through.objects.all().delete()
+        batch = []
+        for obj in model._default_manager.only('id', 'tags').iterator(chunk_size=batch_size):
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                written += _link_batch(batch, through, field)
+                batch = []
+        if batch:
+            written += _link_batch(batch, through, field)
+    for config in TAGGED.values():
+        counter = config['counter']
+        counts = dict(
+            global_apps.get_model(config['through']).objects.values('tag_id').annotate(total=Count('id'))
+            .values_list('tag_id', 'total')
+        )
+        tags = list(Tag.objects.only('id'))
+        for tag in tags:
+            setattr(tag, counter, counts.get(tag.pk, 0))
+        Tag.objects.bulk_update(tags, [counter], batch_size=batch_size)
+    return written
+
+
+def _link_batch(objects, through, field):
+    names = {obj.pk: normalize_tags(obj.tags) for obj in objects}
+    tag_ids = _tag_ids(sorted({name for tag_names in names.values() for name in tag_names}))
+    links = [
+        through(**{f'{field}_id': object_id, 'tag_id': tag_ids[name]})
+        for object_id, tag_names in names.items()
+        for name in tag_names
+    ]
+    through.objects.bulk_create(links)
+    return len(links)
@@ -0,0 +1,52 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from projects.models import Project
+from resources.models import Resource
+from .models import ProjectTag, Tag
+from .tagging import rebuild_tags, related, tag_cloud, tagged
+
+User = get_user_model()
+
+
+class TagIndexTests(TestCase):
+    """JSON tag lists are mirrored into indexed tag links and counters"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('grower', 'grower@example.com', 'pw')
+        self.solar = Project.objects.create(title='Roof', description='d', creator=self.user, tags=['Solar', 'energy'])
+        self.wind = Project.objects.create(title='Turbine', description='d', creator=self.user, tags=['energy', 'wind'])
+        self.garden = Project.objects.create(title='Garden', description='d', creator=self.user, tags=['solar power'])
+
+    def counts(self):
+        return {tag.name: tag.count for tag in tag_cloud(Project)}
+
+    def test_exact_tag_filter_has_no_substring_false_positives(self):
+        self.assertEqual(list(tagged(Project.objects.all(), 'solar')), [self.solar])
+        self.assertEqual(list(tagged(Project.objects.all(), ' SOLAR ')), [self.solar])
+        self.assertCountEqual(tagged(Project.objects.all(), 'energy'), [self.solar, self.wind])
+
+    def test_counters_follow_edits_and_deletes(self):
+        self.assertEqual(self.counts(), {'energy': 2, 'solar': 1, 'solar power': 1, 'wind': 1})
+        self.wind.tags = ['wind', 'wind']
+        self.wind.save()
+        self.garden.delete()
+        self.assertEqual(self.counts(), {'energy': 1, 'solar': 1, 'wind': 1})
+        self.assertEqual(ProjectTag.objects.filter(project=self.wind).count(), 1)
+
+    def test_related_by_shared_tags(self):
+        self.garden.tags = ['solar', 'energy']
+        self.garden.save()
+        self.assertEqual(related(self.solar), [self.garden, self.wind])
+
+    def test_rebuild_repairs_links_and_counters(self):
+        Project.objects.filter(pk=self.wind.pk).update(tags=['hydro'])
+        Tag.objects.update(project_count=7)
+        Resource.objects.create(title='Guide', description='d', author=self.user, tags='solar, guides')
+        self.assertEqual(rebuild_tags(), 6)
+        self.assertEqual(self.counts(), {'energy': 1, 'hydro': 1, 'solar': 1, 'solar power': 1})
+        self.assertEqual({tag.name: tag.count for tag in tag_cloud(Resource)}, {'guides': 1, 'solar': 1})
+
+    def test_list_view_filters_by_tag(self):
+        response = self.client.get('/projects/', {'tag': 'energy'})
+        self.assertCountEqual(response.context['projects'], [self.solar, self.wind])
+        self.assertEqual(response.context['tag_cloud'][0].name, 'energy')